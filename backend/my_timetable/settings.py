@@ -112,4 +112,59 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 # Authentication settings
 LOGIN_URL = 'login'
 LOGIN_REDIRECT_URL = 'dashboard'
-LOGOUT_REDIRECT_URL = 'login' 
\ No newline at end of file
+LOGOUT_REDIRECT_URL = 'login' 
+
+# Timetable generation engine: 'solver' (constraint solver) or 'heuristic'
+# (the original random-restart generator, kept for comparison)
+TIMETABLE_ENGINE = 'solver'
+
+# Run generation in `manage.py run_generation_worker` instead of the request
+# and cap how many generations may run at the same time
+TIMETABLE_BACKGROUND_JOBS = False
+TIMETABLE_MAX_CONCURRENT_JOBS = 2
+
+# Worker processes for the parallel portfolio search and an optional fixed
+# seed; a given seed yields the same timetable for any number of workers
+TIMETABLE_WORKERS = 1
+TIMETABLE_SEED = None
+
+# Patch the saved timetable when availability or subjects change instead of
+# leaving it stale; the repair may move lessons up to this many levels deep
+TIMETABLE_AUTO_REPAIR = True
+TIMETABLE_REPAIR_DEPTH = 2
+
+# Generated timetables kept per user (least recently used are evicted) and
+# alternative variants kept per set of unchanged inputs
+TIMETABLE_CACHE_SIZE = 20
+TIMETABLE_CACHE_VARIANTS = 5
+
+# Timetable snapshots (immutable versions served to the timetable views)
+# kept per user
+TIMETABLE_SNAPSHOT_HISTORY = 10
+
+# Seconds spent improving each new timetable (users may ask for up to the
+# maximum), the weights of the quality penalties (see
+# timetable/solver/optimize.py) and the longest run of classes a faculty
+# member should teach without a break
+TIMETABLE_OPTIMIZE_SECONDS = 2
+TIMETABLE_MAX_OPTIMIZE_SECONDS = 30
+# With TIMETABLE_SEED set, a second of optimisation is this many moves
+# instead, so seeded runs give the same timetable on any machine
+TIMETABLE_OPTIMIZE_MOVES_PER_SECOND = 100000
+TIMETABLE_OBJECTIVE = {
+    'spread': 10,
+    'gaps': 3,
+    'consecutive': 5,
+}
+TIMETABLE_MAX_CONSECUTIVE = 3
+
+# Rendered timetable grids are cached (see timetable/grid.py). The cache has
+# to be shared by the web server and the generation worker, so it lives on
+# disk rather than in each process's memory.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': BASE_DIR / '.django_cache',
+        'OPTIONS': {'MAX_ENTRIES': 5000},
+    }
+}
@@ -171,3 +171,15 @@ SECURE_SSL_REDIRECT = False
 SECURE_HSTS_SECONDS = 0
 SECURE_HSTS_INCLUDE_SUBDOMAINS = False
 SECURE_HSTS_PRELOAD = False
+
+# The timetable settings and the grid cache are defined once, in
+# settings.py; only what differs in production is set here
+from . import settings as _base  # noqa: E402
+
+for _name in dir(_base):
+    if _name.startswith('TIMETABLE_'):
+        globals()[_name] = getattr(_base, _name)
+CACHES = _base.CACHES
+
+# Generation runs in `manage.py run_generation_worker` (see start_render.sh)
+TIMETABLE_BACKGROUND_JOBS = True
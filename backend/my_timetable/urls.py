@@ -2,6 +2,7 @@ from django.contrib import admin
 from django.urls import path
 from timetable import views
 from timetable import attendance_views
+from timetable import api_views
 from django.contrib.auth import views as auth_views
 
 urlpatterns = [
@@ -14,21 +15,36 @@ urlpatterns = [
     path('faculty/add/', views.add_faculty_view, name='add_faculty'),
     path('faculty/delete/<int:faculty_id>/', views.delete_faculty_view, name='delete_faculty'),
     path('faculty/availability/<int:faculty_id>/', views.availability_view, name='faculty_availability'),
+    path('faculty/timetable/<int:faculty_id>/', views.faculty_timetable_view, name='faculty_timetable'),
+    path('faculty/timetable/<int:faculty_id>/json/', views.faculty_timetable_json_view, name='faculty_timetable_json'),
     path('subjects/', views.subject_list_view, name='subject_list'),
     path('subjects/add/', views.add_subject_view, name='add_subject'),
     path('subjects/delete/<int:subject_id>/', views.delete_subject_view, name='delete_subject'),
+    path('sections/', views.section_list_view, name='section_list'),
+    path('sections/delete/<int:section_id>/', views.delete_section_view, name='delete_section'),
     path('timetable/generate/', views.generate_timetable_view, name='generate_timetable'),
     path('timetable/view/', views.view_timetable_view, name='view_timetable'),
+    path('timetable/view/json/', views.view_timetable_json_view, name='view_timetable_json'),
+    path('timetable/export/<str:fmt>/', views.export_timetable_view, name='export_timetable'),
+    path('timetable/repair/', views.repair_timetable_view, name='repair_timetable'),
+    path('timetable/jobs/<int:job_id>/status/', views.generation_job_status_view, name='generation_job_status'),
     path('logout/', views.logout_view, name='logout'),
     
     # Student and Attendance URLs
     path('students/', attendance_views.student_list_view, name='student_list'),
     path('students/add/', attendance_views.add_student_view, name='add_student'),
+    path('students/import/', attendance_views.import_students_view, name='import_students'),
     path('students/delete/<int:student_id>/', attendance_views.delete_student_view, name='delete_student'),
     path('attendance/mark/', attendance_views.mark_attendance_view, name='mark_attendance'),
     path('attendance/report/<int:subject_id>/', attendance_views.attendance_report_view, name='attendance_report'),
     path('lecture/add/', attendance_views.add_lecture_content_view, name='add_lecture_content'),
     path('lecture/list/', attendance_views.lecture_content_list_view, name='lecture_content_list'),
+    path('lecture/search/', attendance_views.lecture_search_view, name='lecture_search'),
+
+    # JSON API
+    path('api/v1/', api_views.api_index_view, name='api_index'),
+    path('api/v1/<str:resource>/', api_views.api_list_view, name='api_list'),
+    path('api/v1/<str:resource>/<int:pk>/', api_views.api_detail_view, name='api_detail'),
     
     # Password Reset URLs
     path('password-reset/', 
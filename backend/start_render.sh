@@ -14,6 +14,17 @@ python manage.py migrate --settings=my_timetable.settings_render 2>&1 || {
     echo "This is OK if using SQLite or if database is not yet configured."
 }
 
+# Start the timetable generation worker in the background, restarting it
+# whenever it exits so queued jobs are never left without a worker
+echo "Starting generation worker..."
+(
+    while true; do
+        python manage.py run_generation_worker --settings=my_timetable.settings_render
+        echo "Warning: Generation worker exited with status $?, restarting in 5 seconds..."
+        sleep 5
+    done
+) &
+
 # Start gunicorn
 echo "Starting gunicorn..."
 exec gunicorn my_timetable.wsgi:application --bind 0.0.0.0:$PORT
@@ -1,7 +1,11 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
 from django.contrib.auth.models import User, Group
-from .models import Faculty, Subject, TimeSlot, Availability, Timetable
+from .models import Faculty, Subject, TimeSlot, Availability, Timetable, Section
+from .availability import refresh_availability_masks
+from .persistence import snapshot_after_delete, snapshot_saved_timetable
+from .sections import section_in_use
+from .week import WEEK
 
 # Customize User Admin
 class CustomUserAdmin(UserAdmin):
@@ -53,6 +57,17 @@ class TimetableAdmin(admin.ModelAdmin):
         if not obj.user_id:  # If creating new timetable entry
             obj.user = request.user
         super().save_model(request, obj, form, change)
+        snapshot_saved_timetable(obj.user)
+    
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        snapshot_saved_timetable(obj.user)
+    
+    def delete_queryset(self, request, queryset):
+        users = {entry.user for entry in queryset.select_related('user')}
+        super().delete_queryset(request, queryset)
+        for user in users:
+            snapshot_saved_timetable(user)
     
     def has_change_permission(self, request, obj=None):
         if not obj or request.user.is_superuser:
@@ -64,7 +79,20 @@ class TimetableAdmin(admin.ModelAdmin):
             return True
         return obj.user == request.user
 
-class FacultyAdmin(admin.ModelAdmin):
+class SnapshotDeletesMixin:
+    # Deleting faculty or subjects removes their lessons too; snapshot what is left
+    def delete_model(self, request, obj):
+        deleted = obj.delete()
+        if obj.user_id:
+            snapshot_after_delete(obj.user, deleted)
+
+    def delete_queryset(self, request, queryset):
+        # Each user's snapshot depends only on that user's deleted rows
+        for user in User.objects.filter(id__in=queryset.values('user_id')):
+            snapshot_after_delete(user, queryset.filter(user=user).delete())
+        queryset.filter(user__isnull=True).delete()
+
+class FacultyAdmin(SnapshotDeletesMixin, admin.ModelAdmin):
     list_display = ('name', 'email', 'department', 'created_at')
     search_fields = ('name', 'email', 'department')
     list_filter = ('department', 'created_at')
@@ -90,7 +118,7 @@ class FacultyAdmin(admin.ModelAdmin):
             return True
         return obj.user == request.user
 
-class SubjectAdmin(admin.ModelAdmin):
+class SubjectAdmin(SnapshotDeletesMixin, admin.ModelAdmin):
     list_display = ('name', 'faculty', 'credits', 'is_lab', 'classes_per_week', 'created_at')
     search_fields = ('name', 'faculty__name')
     list_filter = ('is_lab', 'credits', 'faculty', 'created_at')
@@ -116,16 +144,47 @@ class SubjectAdmin(admin.ModelAdmin):
             return True
         return obj.user == request.user
 
+class SectionAdmin(admin.ModelAdmin):
+    list_display = ('name', 'user', 'created_at')
+    search_fields = ('name', 'user__username')
+    
+    def get_queryset(self, request):
+        qs = super().get_queryset(request)
+        if request.user.is_superuser:
+            return qs
+        return qs.filter(user=request.user)
+    
+    def get_readonly_fields(self, request, obj=None):
+        # Rows store the section's name, so renaming would orphan them
+        if obj is not None:
+            return ('name',)
+        return ()
+
+    def has_delete_permission(self, request, obj=None):
+        if obj is not None and section_in_use(obj):
+            return False
+        return super().has_delete_permission(request, obj)
+
+    def save_model(self, request, obj, form, change):
+        if not obj.user_id:  # If creating new section
+            obj.user = request.user
+        super().save_model(request, obj, form, change)
+
+    def delete_model(self, request, obj):
+        deleted = Timetable.objects.filter(user_id=obj.user_id, section=obj.name).delete()
+        obj.delete()
+        snapshot_after_delete(obj.user, deleted)
+
+    def delete_queryset(self, request, queryset):
+        for section in queryset.select_related('user'):
+            self.delete_model(request, section)
+
 class TimeSlotAdmin(admin.ModelAdmin):
     list_display = ('slot_number', 'get_display_time')
     ordering = ['slot_number']
 
     def get_display_time(self, obj):
-        try:
-            slots = dict(obj.SLOTS)
-            return slots.get(obj.slot_number, '')
-        except (AttributeError, TypeError):
-            return ''
+        return WEEK.slot_times.get(obj.slot_number, '')
     get_display_time.short_description = 'Time'
 
 class AvailabilityAdmin(admin.ModelAdmin):
@@ -154,6 +213,23 @@ class AvailabilityAdmin(admin.ModelAdmin):
             return True
         return obj.faculty.user == request.user
 
+    # Keep the faculty masks in step with the rows, once per faculty member
+    def save_model(self, request, obj, form, change):
+        faculty_ids = {obj.faculty_id}
+        if change:
+            faculty_ids.update(Availability.objects.filter(pk=obj.pk).values_list('faculty_id', flat=True))
+        super().save_model(request, obj, form, change)
+        refresh_availability_masks(faculty_ids)
+
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        refresh_availability_masks([obj.faculty_id])
+
+    def delete_queryset(self, request, queryset):
+        faculty_ids = set(queryset.values_list('faculty_id', flat=True))
+        super().delete_queryset(request, queryset)
+        refresh_availability_masks(faculty_ids)
+
 def register_if_not_registered(model, admin_class):
     try:
         admin.site.register(model, admin_class)
@@ -176,6 +252,7 @@ except admin.sites.NotRegistered:
 register_if_not_registered(User, CustomUserAdmin)
 register_if_not_registered(Faculty, FacultyAdmin)
 register_if_not_registered(Subject, SubjectAdmin)
+register_if_not_registered(Section, SectionAdmin)
 register_if_not_registered(TimeSlot, TimeSlotAdmin)
 register_if_not_registered(Availability, AvailabilityAdmin)
 register_if_not_registered(Timetable, TimetableAdmin) 
\ No newline at end of file
@@ -0,0 +1,258 @@
+"""
+Read-only JSON API (version 1) over the timetable and attendance models.
+
+Each resource declares its output fields together with the columns, joins
+and prefetches every field needs, so ?fields=name,faculty_name loads only
+what those two fields read. Lists are paginated with an opaque cursor on
+the primary key: a page costs the same query however deep it is.
+"""
+from django.db.models import Prefetch
+from django.utils.dateparse import parse_date
+
+from .models import Attendance, Availability, Faculty, LectureContent, Section, Student, Subject, Timetable
+from .pagination import DEFAULT_PAGE_SIZE, InvalidCursor, keyset_page
+from .week import WEEK
+
+API_VERSION = 1
+
+
+class ApiError(Exception):
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+class Field:
+    """One output field: how to read it from an object and what the query must load for it."""
+
+    def __init__(self, value, only=(), select=(), prefetch=()):
+        self.value = value
+        self.only = only
+        self.select = select
+        self.prefetch = prefetch
+
+
+def column(name):
+    return Field(lambda obj: getattr(obj, name), only=(name,))
+
+
+def foreign_key(name):
+    """The id of a related object, read without joining it."""
+    return Field(lambda obj: getattr(obj, f'{name}_id'), only=(name,))
+
+
+def related(path):
+    """A column of a related object, e.g. 'faculty__name', loaded with a join."""
+    *relations, attribute = path.split('__')
+
+    def value(obj):
+        for relation in relations:
+            obj = getattr(obj, relation)
+            if obj is None:
+                return None
+        return getattr(obj, attribute)
+    return Field(value, only=(path,), select=('__'.join(relations),))
+
+
+def _integer(value):
+    try:
+        return int(value)
+    except ValueError:
+        raise ApiError(f'{value!r} is not a number')
+
+
+def _boolean(value):
+    if value.lower() in ('1', 'true', 'yes'):
+        return True
+    if value.lower() in ('0', 'false', 'no'):
+        return False
+    raise ApiError(f'{value!r} is not true or false')
+
+
+def _date(value):
+    try:
+        date = parse_date(value)
+    except ValueError:
+        date = None
+    if date is None:
+        raise ApiError(f'{value!r} is not a date (YYYY-MM-DD)')
+    return date
+
+
+class Resource:
+    def __init__(self, queryset, fields, filters=None):
+        # queryset(user) returns everything the user may read
+        self.queryset = queryset
+        self.fields = fields
+        # query parameter -> (lookup, converter)
+        self.filters = filters or {}
+
+    def select_fields(self, requested):
+        """Names of the fields asked for with ?fields= (all of them by default)."""
+        if not requested:
+            return list(self.fields)
+        names = [name.strip() for name in requested.split(',') if name.strip()]
+        unknown = [name for name in names if name not in self.fields]
+        if unknown:
+            raise ApiError(f'Unknown field(s): {", ".join(unknown)}')
+        return names
+
+    def query(self, user, names, params=None):
+        """The user's objects, filtered by params and loading only what names need."""
+        queryset = self.queryset(user)
+        for param, (lookup, convert) in self.filters.items():
+            if params and params.get(param):
+                queryset = queryset.filter(**{lookup: convert(params[param])})
+
+        only = {'id'}
+        select = set()
+        prefetch = []
+        for name in names:
+            field = self.fields[name]
+            only.update(field.only)
+            select.update(field.select)
+            prefetch.extend(field.prefetch)
+        if select:
+            queryset = queryset.select_related(*sorted(select))
+        if prefetch:
+            queryset = queryset.prefetch_related(*prefetch)
+        return queryset.only(*sorted(only))
+
+    def serialize(self, obj, names):
+        return {name: self.fields[name].value(obj) for name in names}
+
+
+def paginate(queryset, cursor=None, limit=DEFAULT_PAGE_SIZE):
+    """Return (objects, next cursor or None) for the page after cursor, in primary key order."""
+    try:
+        return keyset_page(queryset, ('pk',), cursor, limit)
+    except InvalidCursor:
+        raise ApiError('Invalid cursor')
+
+
+RESOURCES = {
+    'faculty': Resource(
+        lambda user: Faculty.objects.filter(user=user),
+        {
+            'id': column('id'),
+            'name': column('name'),
+            'email': column('email'),
+            'department': column('department'),
+            'subjects': Field(
+                lambda obj: [subject.id for subject in obj.subject_set.all()],
+                prefetch=(Prefetch('subject_set', queryset=Subject.objects.only('id', 'faculty')),)
+            ),
+            'created_at': column('created_at'),
+        },
+        {'department': ('department', str)}
+    ),
+    'subjects': Resource(
+        lambda user: Subject.objects.filter(user=user),
+        {
+            'id': column('id'),
+            'name': column('name'),
+            'faculty': foreign_key('faculty'),
+            'faculty_name': related('faculty__name'),
+            'credits': column('credits'),
+            'is_lab': column('is_lab'),
+            'classes_per_week': column('classes_per_week'),
+            # Empty means taught to every section
+            'sections': Field(
+                lambda obj: [section.name for section in obj.sections.all()],
+                prefetch=(Prefetch('sections', queryset=Section.objects.only('id', 'name')),)
+            ),
+            'created_at': column('created_at'),
+        },
+        {'faculty': ('faculty_id', _integer), 'is_lab': ('is_lab', _boolean)}
+    ),
+    'availability': Resource(
+        lambda user: Availability.objects.filter(faculty__user=user),
+        {
+            'id': column('id'),
+            'faculty': foreign_key('faculty'),
+            'day': column('day'),
+            'slot': related('time_slot__slot_number'),
+            'is_available': column('is_available'),
+        },
+        {'faculty': ('faculty_id', _integer), 'day': ('day', str), 'is_available': ('is_available', _boolean)}
+    ),
+    'timetable': Resource(
+        lambda user: Timetable.objects.filter(user=user),
+        {
+            'id': column('id'),
+            'section': column('section'),
+            'day': column('day'),
+            'slot': related('time_slot__slot_number'),
+            'time': Field(lambda obj: WEEK.slot_times.get(obj.time_slot.slot_number),
+                          only=('time_slot__slot_number',), select=('time_slot',)),
+            'subject': foreign_key('subject'),
+            'subject_name': related('subject__name'),
+            'faculty': foreign_key('faculty'),
+            'faculty_name': related('faculty__name'),
+            'is_lunch_break': column('is_lunch_break'),
+        },
+        {
+            'section': ('section', str),
+            'day': ('day', str),
+            'faculty': ('faculty_id', _integer),
+            'subject': ('subject_id', _integer),
+        }
+    ),
+    'students': Resource(
+        lambda user: Student.objects.filter(user=user),
+        {
+            'id': column('id'),
+            'name': column('name'),
+            'roll_number': column('roll_number'),
+            'section': column('section'),
+            'created_at': column('created_at'),
+        },
+        {'section': ('section', str)}
+    ),
+    'attendance': Resource(
+        lambda user: Attendance.objects.filter(subject__user=user),
+        {
+            'id': column('id'),
+            'subject': foreign_key('subject'),
+            'subject_name': related('subject__name'),
+            'student': foreign_key('student'),
+            'student_name': related('student__name'),
+            'roll_number': related('student__roll_number'),
+            'date': column('date'),
+            'is_present': column('is_present'),
+            'marked_by': foreign_key('marked_by'),
+            'updated_at': column('updated_at'),
+        },
+        {
+            'subject': ('subject_id', _integer),
+            'student': ('student_id', _integer),
+            'date': ('date', _date),
+            'from': ('date__gte', _date),
+            'to': ('date__lte', _date),
+        }
+    ),
+    'lectures': Resource(
+        lambda user: LectureContent.objects.filter(subject__user=user),
+        {
+            'id': column('id'),
+            'subject': foreign_key('subject'),
+            'subject_name': related('subject__name'),
+            'faculty': foreign_key('faculty'),
+            'faculty_name': related('faculty__name'),
+            'section': column('section'),
+            'date': column('date'),
+            'topic_covered': column('topic_covered'),
+            'resources': column('resources'),
+            'remarks': column('remarks'),
+            'updated_at': column('updated_at'),
+        },
+        {
+            'subject': ('subject_id', _integer),
+            'faculty': ('faculty_id', _integer),
+            'section': ('section', str),
+            'date': ('date', _date),
+            'from': ('date__gte', _date),
+            'to': ('date__lte', _date),
+        }
+    ),
+}
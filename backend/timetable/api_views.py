@@ -0,0 +1,67 @@
+from functools import wraps
+
+from django.http import JsonResponse
+from django.urls import reverse
+from django.views.decorators.http import require_GET
+
+from .api import API_VERSION, RESOURCES, ApiError, paginate
+from .pagination import page_size
+
+def api_view(view):
+    # JSON errors instead of login redirects and error pages
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if not request.user.is_authenticated:
+            return JsonResponse({'error': 'Authentication required.'}, status=401)
+        try:
+            return view(request, *args, **kwargs)
+        except ApiError as e:
+            return JsonResponse({'error': str(e)}, status=e.status)
+    return require_GET(wrapper)
+
+def _resource(name):
+    if name not in RESOURCES:
+        raise ApiError(f'Unknown resource {name!r}.', status=404)
+    return RESOURCES[name]
+
+@api_view
+def api_index_view(request):
+    return JsonResponse({
+        'version': API_VERSION,
+        'resources': {
+            name: {
+                'url': request.build_absolute_uri(reverse('api_list', args=[name])),
+                'fields': list(resource.fields),
+                'filters': list(resource.filters),
+            }
+            for name, resource in RESOURCES.items()
+        }
+    })
+
+@api_view
+def api_list_view(request, resource):
+    # ?fields=a,b picks the fields, ?limit= the page size (as for the HTML lists) and ?cursor= the page
+    endpoint = _resource(resource)
+    names = endpoint.select_fields(request.GET.get('fields'))
+    limit = page_size(request.GET.get('limit'))
+    objects, cursor = paginate(endpoint.query(request.user, names, request.GET), request.GET.get('cursor'), limit)
+
+    next_url = None
+    if cursor:
+        params = request.GET.copy()
+        params['cursor'] = cursor
+        next_url = request.build_absolute_uri(f'{request.path}?{params.urlencode()}')
+    return JsonResponse({
+        'results': [endpoint.serialize(obj, names) for obj in objects],
+        'next_cursor': cursor,
+        'next': next_url,
+    })
+
+@api_view
+def api_detail_view(request, resource, pk):
+    endpoint = _resource(resource)
+    names = endpoint.select_fields(request.GET.get('fields'))
+    obj = endpoint.query(request.user, names).filter(pk=pk).first()
+    if obj is None:
+        raise ApiError('Not found.', status=404)
+    return JsonResponse(endpoint.serialize(obj, names))
@@ -0,0 +1,12 @@
+from django.apps import AppConfig
+
+
+class TimetableConfig(AppConfig):
+    name = 'timetable'
+
+    def ready(self):
+        # Connect the cache invalidation receivers
+        from . import signals  # noqa: F401
+        # Fail at startup, not in a view, if the days or time slots are unusable
+        from .week import WEEK
+        WEEK.check()
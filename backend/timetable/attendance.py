@@ -0,0 +1,324 @@
+"""
+Writing attendance and computing statistics from it.
+
+A class is saved with bulk queries, and the same transaction adjusts the
+weekly AttendanceRollup counts of every student whose record was added or
+flipped. Reports and the student list read those rollups, so their cost
+follows the number of students rather than the number of attendance rows;
+only the days of partial weeks at the edges of a report's date range are
+counted from Attendance itself. `manage.py rebuild_attendance_rollups`
+recomputes (or verifies) the rollups for data written any other way.
+"""
+import datetime
+from collections import defaultdict
+
+from django.db import connection, transaction
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import Coalesce, TruncWeek
+from django.utils import timezone
+
+from .models import Attendance, AttendanceRollup
+
+
+def percentage(present, total, ndigits=1):
+    return round(present / total * 100, ndigits) if total else 0
+
+
+def rollup_period(date):
+    """The AttendanceRollup period (Monday of the week) a date belongs to."""
+    return date - datetime.timedelta(days=date.weekday())
+
+
+def marked_attendance(subject, date, student_ids):
+    """(student id, is_present) of the students already marked for subject on date."""
+    return Attendance.objects.filter(subject=subject, date=date, student_id__in=student_ids).values_list(
+        'student_id', 'is_present'
+    )
+
+
+def save_attendance(subject, date, presence, marked_by, upsert=None, skip_unchanged=False, keep_present=False):
+    """
+    Record one class: presence maps student ids to whether they were there.
+
+    Everything is written in one transaction. Where the database can
+    update rows on conflict (PostgreSQL, SQLite, MySQL/MariaDB) this is a
+    single bulk upsert; elsewhere, or with upsert=False, the existing rows
+    are updated with one UPDATE for the present and one for the absent
+    students, and the rest inserted with bulk_create. The week's rollups
+    are then adjusted with at most five more queries. With
+    skip_unchanged=True records that already hold the same value are left
+    alone (keeping their marked_by and updated_at). With keep_present=True
+    students already recorded as present stay present. Returns the number
+    of records written.
+    """
+    if upsert is None:
+        upsert = connection.features.supports_update_conflicts
+    with transaction.atomic():
+        previous = dict(marked_attendance(subject, date, list(presence)).select_for_update())
+        if keep_present:
+            presence = {
+                student_id: is_present or previous.get(student_id, False)
+                for student_id, is_present in presence.items()
+            }
+        if skip_unchanged:
+            presence = {
+                student_id: is_present for student_id, is_present in presence.items()
+                if previous.get(student_id) != is_present
+            }
+        if upsert:
+            _upsert_attendance(subject, date, presence, marked_by)
+        else:
+            _update_then_insert_attendance(subject, date, presence, marked_by, previous)
+        _update_rollups(subject, date, presence, previous)
+    return len(presence)
+
+
+def _attendance_rows(subject, date, presence, marked_by):
+    return [
+        Attendance(subject=subject, student_id=student_id, date=date, is_present=is_present, marked_by=marked_by)
+        for student_id, is_present in presence.items()
+    ]
+
+
+def _upsert_attendance(subject, date, presence, marked_by):
+    options = {}
+    # MySQL resolves conflicts on any unique key and takes no target
+    if connection.features.supports_update_conflicts_with_target:
+        options['unique_fields'] = ['subject', 'student', 'date']
+    Attendance.objects.bulk_create(
+        _attendance_rows(subject, date, presence, marked_by),
+        update_conflicts=True,
+        update_fields=['is_present', 'marked_by', 'updated_at'],
+        **options
+    )
+
+
+def _update_then_insert_attendance(subject, date, presence, marked_by, previous):
+    for is_present in (True, False):
+        student_ids = [
+            student_id for student_id, present in presence.items()
+            if present == is_present and student_id in previous
+        ]
+        if student_ids:
+            Attendance.objects.filter(subject=subject, date=date, student_id__in=student_ids).update(
+                is_present=is_present, marked_by=marked_by, updated_at=timezone.now()
+            )
+    Attendance.objects.bulk_create(_attendance_rows(
+        subject, date, {student_id: present for student_id, present in presence.items() if student_id not in previous},
+        marked_by
+    ))
+
+
+def _update_rollups(subject, date, presence, previous):
+    """Move the week's rollups from the previous records to presence."""
+    period = rollup_period(date)
+    # (total change, present change) -> student ids
+    changes = defaultdict(list)
+    for student_id, is_present in presence.items():
+        if student_id not in previous:
+            changes[(1, int(is_present))].append(student_id)
+        elif previous[student_id] != is_present:
+            changes[(0, 1 if is_present else -1)].append(student_id)
+
+    new = changes.get((1, 0), []) + changes.get((1, 1), [])
+    if new:
+        rows = AttendanceRollup.objects.filter(subject=subject, period=period)
+        if connection.features.supports_ignore_conflicts:
+            missing = new
+        else:
+            existing = set(rows.filter(student_id__in=new).values_list('student_id', flat=True))
+            missing = [student_id for student_id in new if student_id not in existing]
+        AttendanceRollup.objects.bulk_create([
+            AttendanceRollup(student_id=student_id, subject=subject, period=period) for student_id in missing
+        ], ignore_conflicts=connection.features.supports_ignore_conflicts)
+    for (total, present), student_ids in changes.items():
+        AttendanceRollup.objects.filter(subject=subject, period=period, student_id__in=student_ids).update(
+            total=F('total') + total, present=F('present') + present
+        )
+
+
+def compute_rollups(attendance):
+    """(student id, subject id, period) -> (total, present), counted from an Attendance queryset."""
+    rows = attendance.annotate(period=TruncWeek('date')).values('student_id', 'subject_id', 'period').annotate(
+        total=Count('id'),
+        present=Count('id', filter=Q(is_present=True))
+    ).order_by()
+    return {
+        (row['student_id'], row['subject_id'], row['period']): (row['total'], row['present'])
+        for row in rows
+    }
+
+
+def rollup_differences(attendance, rollups):
+    """
+    Keys whose stored rollup differs from the attendance it summarises.
+
+    Returns (key, stored (total, present) or None, expected or None) for
+    every mismatch between the rollups queryset and compute_rollups(attendance).
+    """
+    expected = compute_rollups(attendance)
+    stored = {
+        (student_id, subject_id, period): (total, present)
+        for student_id, subject_id, period, total, present in rollups.values_list(
+            'student_id', 'subject_id', 'period', 'total', 'present'
+        )
+    }
+    return [
+        (key, stored.get(key), expected.get(key))
+        for key in sorted(set(stored) | set(expected))
+        if stored.get(key, (0, 0)) != expected.get(key, (0, 0))
+    ]
+
+
+def rebuild_rollups(attendance, rollups):
+    """Replace the rollups queryset with counts from the attendance queryset; returns the rows written."""
+    counts = compute_rollups(attendance)
+    with transaction.atomic():
+        rollups.delete()
+        AttendanceRollup.objects.bulk_create([
+            AttendanceRollup(student_id=student_id, subject_id=subject_id, period=period, total=total, present=present)
+            for (student_id, subject_id, period), (total, present) in counts.items()
+        ], batch_size=1000)
+    return len(counts)
+
+
+def annotate_attendance(students, subjects=()):
+    """students with the attendance_* (and subject_*) sums with_attendance reads."""
+    annotations = {
+        'attendance_total': Coalesce(Sum('attendance_rollups__total'), 0),
+        'attendance_present': Coalesce(Sum('attendance_rollups__present'), 0),
+    }
+    for subject in subjects:
+        of_subject = Q(attendance_rollups__subject=subject)
+        annotations[f'subject_{subject.id}_total'] = Coalesce(Sum('attendance_rollups__total', filter=of_subject), 0)
+        annotations[f'subject_{subject.id}_present'] = Coalesce(
+            Sum('attendance_rollups__present', filter=of_subject), 0
+        )
+    return students.annotate(**annotations)
+
+
+def with_attendance(students, subjects=None):
+    """
+    Annotate a Student queryset with attendance counts, all in one query.
+
+    Every student gets attendance_total, attendance_present and
+    attendance_percentage, summed from their rollups. If subjects are
+    given, attendance_by_subject lists (subject, present, total,
+    percentage) for each of them, from the same query.
+    """
+    subjects = list(subjects or [])
+    students = list(annotate_attendance(students, subjects))
+    for student in students:
+        student.attendance_percentage = percentage(student.attendance_present, student.attendance_total)
+        if subjects:
+            student.attendance_by_subject = []
+            for subject in subjects:
+                total = getattr(student, f'subject_{subject.id}_total')
+                present = getattr(student, f'subject_{subject.id}_present')
+                student.attendance_by_subject.append((subject, present, total, percentage(present, total)))
+    return students
+
+
+def report_weeks(start, end):
+    """Mondays of the weeks that overlap start..end."""
+    week = rollup_period(start)
+    weeks = []
+    while week <= end:
+        weeks.append(week)
+        week += datetime.timedelta(weeks=1)
+    return weeks
+
+
+def per_student(rows, aggregates):
+    """(student id, *aggregates) for each student in rows."""
+    return rows.values('student_id').annotate(**aggregates).order_by().values_list('student_id', *aggregates)
+
+
+def report_rollups(subject, student_ids, periods):
+    return AttendanceRollup.objects.filter(subject=subject, student__in=student_ids, period__in=periods)
+
+
+def report_days(subject, student_ids, start, end, whole_weeks=()):
+    """The Attendance rows of start..end outside whole_weeks (consecutive Mondays), which rollups cover."""
+    rows = Attendance.objects.filter(subject=subject, student__in=student_ids, date__range=(start, end))
+    if whole_weeks:
+        rows = rows.exclude(date__gte=whole_weeks[0], date__lt=whole_weeks[-1] + datetime.timedelta(weeks=1))
+    return rows
+
+
+def attendance_report(subject, students, start, end, weekly=False):
+    """
+    Attendance in subject between start and end (inclusive) of a Student queryset.
+
+    Weeks lying wholly inside the range are summed from the rollups; the
+    days of the (at most two) weeks cut by the range are counted from
+    Attendance. Both are aggregated per student in the database, so with
+    the students themselves the report takes three queries and reads one
+    row per student from each. Every student gets a record (with the
+    student's id, name and roll_number as a dict), with or without
+    attendance; with weekly=True each record also lists (present, total)
+    for each week of report_weeks(start, end).
+    """
+    weeks = report_weeks(start, end)
+    whole = [index for index, monday in enumerate(weeks)
+             if monday >= start and monday + datetime.timedelta(days=6) <= end]
+    partial = [index for index in range(len(weeks)) if index not in whole]
+    student_ids = students.values('id')
+
+    # student id -> week index (None for the whole range) -> (present, total)
+    counts = defaultdict(dict)
+
+    def add(rows, columns):
+        # columns maps a week index (or None) to its (present, total) aggregates
+        names = {}
+        for week, (present, total) in columns.items():
+            names[f'week_{week}_present'] = present
+            names[f'week_{week}_total'] = total
+        for student_id, *values in per_student(rows, names):
+            student_counts = counts[student_id]
+            for position, week in enumerate(columns):
+                present, total = student_counts.get(week, (0, 0))
+                # A filtered Sum is NULL when no row matched
+                student_counts[week] = (
+                    present + (values[2 * position] or 0), total + (values[2 * position + 1] or 0)
+                )
+
+    if whole:
+        rollups = report_rollups(subject, student_ids, [weeks[index] for index in whole])
+        if weekly:
+            add(rollups, {
+                index: (Sum('present', filter=Q(period=weeks[index])), Sum('total', filter=Q(period=weeks[index])))
+                for index in whole
+            })
+        else:
+            add(rollups, {None: (Sum('present'), Sum('total'))})
+    if partial:
+        rows = report_days(subject, student_ids, start, end, [weeks[index] for index in whole])
+        if weekly:
+            columns = {}
+            for index in partial:
+                week = Q(date__gte=weeks[index], date__lt=weeks[index] + datetime.timedelta(weeks=1))
+                columns[index] = (Count('id', filter=week & Q(is_present=True)), Count('id', filter=week))
+            add(rows, columns)
+        else:
+            add(rows, {None: (Count('id', filter=Q(is_present=True)), Count('id'))})
+
+    records = []
+    for student in students.values('id', 'name', 'roll_number'):
+        student_counts = counts.get(student['id'], {})
+        if weekly:
+            by_week = [student_counts.get(index, (0, 0)) for index in range(len(weeks))]
+            present = sum(present for present, _ in by_week)
+            total = sum(total for _, total in by_week)
+        else:
+            present, total = student_counts.get(None, (0, 0))
+        record = {
+            'student': student,
+            'total_classes': total,
+            'present_count': present,
+            'percentage': percentage(present, total, 2)
+        }
+        if weekly:
+            record['weeks'] = by_week
+        records.append(record)
+    return records
@@ -2,10 +2,36 @@ from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.utils import timezone
-from django.db.models import Count, Q
-from .models import Student, Attendance, LectureContent, Subject, Faculty
+from django.utils.dateparse import parse_date
+from .models import Student, LectureContent, Subject
+from .attendance import attendance_report, report_weeks, save_attendance, with_attendance
+from .pagination import InvalidCursor, keyset_page, page_query, page_size
+from .roster import RosterError, import_students, read_roster
+from .search import search_lectures
+from .sections import section_names, selected_section
 from datetime import datetime, timedelta
 
+# Keyset orderings of the paginated lists (see pagination.py)
+STUDENT_ORDER = ('roll_number', 'id')
+LECTURE_ORDER = ('-date', '-id')
+
+
+# The lists' queries, shared with the plan checks in query_plans.py
+def section_students(user, section):
+    return Student.objects.filter(user=user, section=section)
+
+
+def lecture_contents(user, section, subject_id=None):
+    query = LectureContent.objects.filter(subject__user=user, section=section)
+    if subject_id:
+        query = query.filter(subject_id=subject_id)
+    return query.select_related('subject', 'faculty')
+
+
+def students_by_id(student_ids):
+    return Student.objects.filter(id__in=student_ids).order_by(*STUDENT_ORDER)
+
+
 @login_required
 def add_student_view(request):
     if request.method == 'POST':
@@ -16,6 +42,10 @@ def add_student_view(request):
         if not name or not roll_number or not section:
             messages.error(request, 'All fields are required.')
             return redirect('add_student')
+
+        if section not in section_names(request.user):
+            messages.error(request, 'Please choose one of your sections.')
+            return redirect('add_student')
         
         try:
             # Check if roll number already exists
@@ -34,7 +64,36 @@ def add_student_view(request):
         except Exception as e:
             messages.error(request, f'Error adding student: {str(e)}')
     
-    return render(request, 'attendance/add_student.html')
+    return render(request, 'attendance/add_student.html', {'sections': section_names(request.user)})
+
+@login_required
+def import_students_view(request):
+    sections = section_names(request.user)
+    context = {'sections': sections}
+    if request.method == 'POST':
+        upload = request.FILES.get('file')
+        if not upload:
+            messages.error(request, 'Please choose a CSV or Excel file.')
+            return redirect('import_students')
+
+        try:
+            created, errors = import_students(
+                request.user, read_roster(upload, upload.name), request.POST.get('section') or None
+            )
+        except RosterError as e:
+            messages.error(request, f'Could not import {upload.name}: {e}')
+            return redirect('import_students')
+        except Exception as e:
+            messages.error(request, f'Error importing students: {str(e)}')
+            return redirect('import_students')
+
+        if created:
+            messages.success(request, f'{created} students imported from {upload.name}.')
+        if errors:
+            messages.error(request, f'{len(errors)} rows were skipped; see below.')
+        context.update({'errors': errors, 'filename': upload.name})
+
+    return render(request, 'attendance/import_students.html', context)
 
 @login_required
 def delete_student_view(request, student_id):
@@ -49,20 +108,34 @@ def delete_student_view(request, student_id):
 
 @login_required
 def student_list_view(request):
-    section = request.GET.get('section', 'A')
-    students = Student.objects.filter(user=request.user, section=section).order_by('roll_number')
-    subjects = Subject.objects.filter(user=request.user)
-    
-    # Get attendance statistics for each student
-    for student in students:
-        total_attendance = Attendance.objects.filter(student=student).count()
-        present_count = Attendance.objects.filter(student=student, is_present=True).count()
-        student.attendance_percentage = (present_count / total_attendance * 100) if total_attendance > 0 else 0
+    sections = section_names(request.user)
+    section = selected_section(request, sections)
+    students = section_students(request.user, section)
+    subjects = list(Subject.objects.filter(user=request.user).order_by('name'))
+    breakdown = request.GET.get('breakdown') == '1'
+
+    # One page of students, found through the (user, section, roll_number) index
+    cursor = request.GET.get('after')
+    try:
+        page, next_cursor = keyset_page(students, STUDENT_ORDER, cursor, page_size(request.GET.get('per_page')))
+    except InvalidCursor:
+        messages.error(request, 'That page no longer exists; showing the first page.')
+        return redirect(f"{request.path}?{page_query(request.GET, None)}")
+
+    # Attendance statistics for the page's students (and subjects) in one query
+    students = with_attendance(
+        students_by_id([student.id for student in page]),
+        subjects if breakdown else None
+    )
     
     return render(request, 'attendance/student_list.html', {
         'students': students,
         'subjects': subjects,
-        'current_section': section
+        'sections': sections,
+        'current_section': section,
+        'breakdown': breakdown,
+        'first_page': page_query(request.GET, None) if cursor else None,
+        'next_page': page_query(request.GET, next_cursor) if next_cursor else None
     })
 
 @login_required
@@ -73,22 +146,13 @@ def mark_attendance_view(request):
         date_str = request.POST.get('date')
         
         try:
-            subject = Subject.objects.get(id=subject_id, user=request.user)
-            faculty = subject.faculty
+            subject = Subject.objects.select_related('faculty').get(id=subject_id, user=request.user)
             date = datetime.strptime(date_str, '%Y-%m-%d').date()
             
-            students = Student.objects.filter(user=request.user, section=section)
-            for student in students:
-                is_present = request.POST.get(f'student_{student.id}') == 'on'
-                Attendance.objects.update_or_create(
-                    subject=subject,
-                    student=student,
-                    date=date,
-                    defaults={
-                        'is_present': is_present,
-                        'marked_by': faculty
-                    }
-                )
+            # Save the whole class at once
+            students = section_students(request.user, section).values_list('id', flat=True)
+            presence = {student_id: request.POST.get(f'student_{student_id}') == 'on' for student_id in students}
+            save_attendance(subject, date, presence, subject.faculty)
             
             messages.success(request, 'Attendance marked successfully.')
             return redirect('attendance_report', subject_id=subject_id)
@@ -96,13 +160,15 @@ def mark_attendance_view(request):
             messages.error(request, f'Error marking attendance: {str(e)}')
     
     subjects = Subject.objects.filter(user=request.user)
-    section = request.GET.get('section', 'A')
+    sections = section_names(request.user)
+    section = selected_section(request, sections)
     date = request.GET.get('date', timezone.now().date().strftime('%Y-%m-%d'))
-    students = Student.objects.filter(user=request.user, section=section).order_by('roll_number')
+    students = section_students(request.user, section).order_by('roll_number')
     
     return render(request, 'attendance/mark_attendance.html', {
         'subjects': subjects,
         'students': students,
+        'sections': sections,
         'current_section': section,
         'date': date
     })
@@ -110,42 +176,45 @@ def mark_attendance_view(request):
 @login_required
 def attendance_report_view(request, subject_id):
     subject = get_object_or_404(Subject, id=subject_id, user=request.user)
-    section = request.GET.get('section', 'A')
+    sections = section_names(request.user)
+    section = selected_section(request, sections)
     student_id = request.GET.get('student_id')
-    start_date = request.GET.get('start_date', (timezone.now() - timedelta(days=30)).strftime('%Y-%m-%d'))
-    end_date = request.GET.get('end_date', timezone.now().strftime('%Y-%m-%d'))
+    weekly = request.GET.get('weekly') == '1'
+
+    # Date range (default: the last 30 days)
+    today = timezone.localdate()
+    try:
+        start_date = parse_date(request.GET.get('start_date') or '') or today - timedelta(days=30)
+        end_date = parse_date(request.GET.get('end_date') or '') or today
+    except ValueError:
+        messages.error(request, 'Please enter valid dates.')
+        start_date, end_date = today - timedelta(days=30), today
+    if end_date < start_date:
+        messages.error(request, 'The end date must not be before the start date.')
+        start_date, end_date = end_date, start_date
     
+    # Only ever the user's own students
+    student = None
     if student_id:
-        students = Student.objects.filter(id=student_id)
+        student = get_object_or_404(Student, id=student_id, user=request.user)
+        students = Student.objects.filter(id=student.id)
     else:
-        students = Student.objects.filter(section=section)
-    
-    attendance_records = []
+        students = section_students(request.user, section)
+    students = students.order_by('roll_number')
     
-    for student in students:
-        attendance = Attendance.objects.filter(
-            subject=subject,
-            student=student,
-            date__range=[start_date, end_date]
-        )
-        total_classes = attendance.count()
-        present_count = attendance.filter(is_present=True).count()
-        percentage = (present_count / total_classes * 100) if total_classes > 0 else 0
-        
-        attendance_records.append({
-            'student': student,
-            'total_classes': total_classes,
-            'present_count': present_count,
-            'percentage': round(percentage, 2)
-        })
+    attendance_records = attendance_report(subject, students, start_date, end_date, weekly)
     
     return render(request, 'attendance/attendance_report.html', {
         'subject': subject,
         'attendance_records': attendance_records,
+        'sections': sections,
         'current_section': section,
-        'start_date': start_date,
-        'end_date': end_date,
-        'selected_student_id': student_id
+        'start_date': start_date.strftime('%Y-%m-%d'),
+        'end_date': end_date.strftime('%Y-%m-%d'),
+        'selected_student_id': student_id,
+        'student': student,
+        'weekly': weekly,
+        'weeks': report_weeks(start_date, end_date) if weekly else []
     })
 
 @login_required
@@ -181,24 +250,58 @@ def add_lecture_content_view(request):
     subjects = Subject.objects.filter(user=request.user)
     return render(request, 'attendance/add_lecture_content.html', {
         'subjects': subjects,
+        'sections': section_names(request.user),
         'date': timezone.now().date().strftime('%Y-%m-%d')
     })
 
 @login_required
 def lecture_content_list_view(request):
     subject_id = request.GET.get('subject')
-    section = request.GET.get('section', 'A')
+    sections = section_names(request.user)
+    section = selected_section(request, sections)
     
-    query = LectureContent.objects.filter(subject__user=request.user, section=section)
-    if subject_id:
-        query = query.filter(subject_id=subject_id)
-    
-    lecture_contents = query.order_by('-date')
+    # Newest first, one page at a time
+    cursor = request.GET.get('after')
+    try:
+        page, next_cursor = keyset_page(
+            lecture_contents(request.user, section, subject_id), LECTURE_ORDER, cursor,
+            page_size(request.GET.get('per_page'))
+        )
+    except InvalidCursor:
+        messages.error(request, 'That page no longer exists; showing the first page.')
+        return redirect(f"{request.path}?{page_query(request.GET, None)}")
     subjects = Subject.objects.filter(user=request.user)
     
     return render(request, 'attendance/lecture_content_list.html', {
-        'lecture_contents': lecture_contents,
+        'lecture_contents': page,
         'subjects': subjects,
+        'sections': sections,
+        'current_section': section,
+        'current_subject': subject_id,
+        'first_page': page_query(request.GET, None) if cursor else None,
+        'next_page': page_query(request.GET, next_cursor) if next_cursor else None
+    }) 
+
+@login_required
+def lecture_search_view(request):
+    query = request.GET.get('q', '').strip()
+    section = request.GET.get('section') or None
+    subject_id = request.GET.get('subject') or None
+    sections = section_names(request.user)
+    subjects = Subject.objects.filter(user=request.user)
+    if section not in sections:
+        section = None
+    if subject_id and not subject_id.isdigit():
+        subject_id = None
+
+    # Ranked matches from the full-text index, with the matches highlighted
+    results = search_lectures(request.user, query, section, subject_id) if query else []
+
+    return render(request, 'attendance/lecture_search.html', {
+        'query': query,
+        'results': results,
+        'subjects': subjects,
+        'sections': sections,
         'current_section': section,
         'current_subject': subject_id
-    }) 
\ No newline at end of file
+    })
@@ -0,0 +1,115 @@
+"""
+Faculty availability as a weekly bitmask.
+
+Faculty.availability_mask has bit day_index * len(SLOTS) + slot_index set
+for every (day, slot) the faculty member is free in, the same layout the
+solver uses (Problem.position), so build_problem reads it as it is. The
+Availability rows stay the record the admin and the API work with:
+save_availability writes the rows and the mask together. Code that writes
+the rows any other way (the admin, create_timeslots) calls
+refresh_availability_masks once for the faculty members it touched; there
+is no per-row signal, so cascade deletes do not recompute a mask per row.
+"""
+from django.db import transaction
+
+from .models import Availability, Faculty
+from .week import WEEK, slot_ids
+
+DAYS = WEEK.day_codes
+SLOTS = WEEK.slot_numbers
+
+
+def slot_bit(day, slot_number):
+    """The mask bit of a day code and slot number; 0 for ones outside the week."""
+    if day not in DAYS or slot_number not in SLOTS:
+        return 0
+    return 1 << (DAYS.index(day) * len(SLOTS) + SLOTS.index(slot_number))
+
+
+def mask_of(slots):
+    """The mask of (day, slot number) pairs."""
+    mask = 0
+    for day, slot_number in slots:
+        mask |= slot_bit(day, slot_number)
+    return mask
+
+
+def available_slots(mask):
+    """The (day, slot number) pairs set in mask, day by day."""
+    return [
+        (day, slot_number)
+        for d, day in enumerate(DAYS)
+        for s, slot_number in enumerate(SLOTS)
+        if (mask >> (d * len(SLOTS) + s)) & 1
+    ]
+
+
+def matrix_of(mask):
+    """day -> slot number -> whether the bit is set, for the availability page."""
+    return {
+        day: {slot_number: bool((mask >> (d * len(SLOTS) + s)) & 1) for s, slot_number in enumerate(SLOTS)}
+        for d, day in enumerate(DAYS)
+    }
+
+
+def availability_rows(faculty):
+    return Availability.objects.filter(faculty=faculty).values_list(
+        'id', 'day', 'time_slot__slot_number', 'is_available'
+    )
+
+
+def save_availability(faculty, mask):
+    """
+    Make faculty available exactly in the slots of mask.
+
+    Only the rows that differ are written: rows whose slot left or joined
+    mask are switched off or on in one update each and rows for new slots
+    are created in bulk, so a save takes at most five queries whatever
+    changed. Rows are switched off rather than deleted, which sends no
+    post_delete signal per row. Returns the number of slots that changed.
+    """
+    wanted = set(available_slots(mask))
+    with transaction.atomic():
+        # Updating the faculty row first also locks it, so two saves for the
+        # same faculty member cannot both create the same rows
+        Faculty.objects.filter(id=faculty.id).update(availability_mask=mask)
+        faculty.availability_mask = mask
+
+        switch = {True: [], False: []}
+        for row_id, day, slot_number, is_available in availability_rows(faculty):
+            available = (day, slot_number) in wanted
+            wanted.discard((day, slot_number))
+            if available != is_available:
+                switch[available].append(row_id)
+
+        for available, row_ids in switch.items():
+            if row_ids:
+                Availability.objects.filter(id__in=row_ids).update(is_available=available)
+        if wanted:
+            time_slots = slot_ids()
+            Availability.objects.bulk_create([
+                Availability(faculty=faculty, day=day, time_slot_id=time_slots[slot_number], is_available=True)
+                for day, slot_number in sorted(wanted)
+            ])
+    return len(switch[True]) + len(switch[False]) + len(wanted)
+
+
+def refresh_availability_masks(faculty_ids):
+    """
+    Recompute the masks of faculty_ids from their Availability rows.
+
+    One query reads the rows of them all and one update is made per
+    faculty member. Returns faculty id -> mask.
+    """
+    masks = dict.fromkeys(faculty_ids, 0)
+    if not masks:
+        return masks
+    rows = Availability.objects.filter(faculty_id__in=masks, is_available=True).values_list(
+        'faculty_id', 'day', 'time_slot__slot_number'
+    )
+    for faculty_id, day, slot_number in rows:
+        masks[faculty_id] |= slot_bit(day, slot_number)
+    with transaction.atomic():
+        for faculty_id, mask in masks.items():
+            Faculty.objects.filter(id=faculty_id).update(availability_mask=mask)
+    return masks
@@ -0,0 +1,11 @@
+"""
+Benchmarks for the timetable generator and attendance writes.
+
+Instances are synthetic. `manage.py bench_generator` runs them through
+each engine and the full database-backed generator and prints a JSON
+report; `manage.py bench_sections` shows how the engines scale with the
+number of sections. `manage.py bench_attendance` times saving a class of
+attendance (see attendance.py).
+"""
+from .instances import synthetic_problem
+from .scaling import section_scaling, time_generation
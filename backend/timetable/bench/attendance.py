@@ -0,0 +1,72 @@
+import time
+import uuid
+
+from django.contrib.auth.models import User
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from ..attendance import save_attendance
+from ..models import Attendance, Faculty, Student, Subject
+
+METHODS = ('upsert', 'fallback', 'per-row')
+
+
+def _per_row(subject, date, presence, marked_by):
+    # What mark_attendance_view used to do
+    for student_id, is_present in presence.items():
+        Attendance.objects.update_or_create(
+            subject=subject,
+            student_id=student_id,
+            date=date,
+            defaults={'is_present': is_present, 'marked_by': marked_by}
+        )
+
+
+_WRITERS = {
+    'upsert': lambda *args: save_attendance(*args, upsert=True),
+    'fallback': lambda *args: save_attendance(*args, upsert=False),
+    'per-row': _per_row,
+}
+
+
+def attendance_throughput(student_counts, methods=METHODS):
+    """
+    Time saving one class of attendance for growing class sizes.
+
+    Each method writes the class twice, first inserting every row and then
+    updating them all, inside a transaction that is rolled back. upsert and
+    fallback are save_attendance with its rollup maintenance included;
+    per-row is the update_or_create loop it replaced. Returns
+    one dict per (class size, method, phase) with seconds, rows per second
+    and queries issued.
+    """
+    rows = []
+    for count in student_counts:
+        for method in methods:
+            with transaction.atomic():
+                user = User.objects.create_user(f'bench-{uuid.uuid4().hex[:12]}')
+                faculty = Faculty.objects.create(user=user, name='Faculty', email='faculty@example.com',
+                                                 department='Benchmark')
+                subject = Subject.objects.create(user=user, name='Subject', faculty=faculty, credits=3)
+                students = Student.objects.bulk_create([
+                    Student(user=user, name=f'Student {i}', roll_number=f'{user.username}-{i}', section='A')
+                    for i in range(count)
+                ])
+                date = subject.created_at.date()
+                for phase, present in (('insert', True), ('update', False)):
+                    presence = {student.id: present for student in students}
+                    with CaptureQueriesContext(connection) as queries:
+                        start = time.perf_counter()
+                        with transaction.atomic():
+                            _WRITERS[method](subject, date, presence, faculty)
+                        seconds = time.perf_counter() - start
+                    rows.append({
+                        'students': count,
+                        'method': method,
+                        'phase': phase,
+                        'seconds': seconds,
+                        'rows_per_second': count / seconds if seconds else float('inf'),
+                        'queries': len(queries),
+                    })
+                transaction.set_rollback(True)
+    return rows
@@ -0,0 +1,57 @@
+import uuid
+
+from django.contrib.auth.models import User
+
+from ..models import Availability, Faculty, Section, Subject
+from ..week import slot_ids
+
+
+def load_instance(problem):
+    """
+    Store a synthetic Problem as a new user's data and return the user.
+
+    Meant to run inside a transaction that is rolled back afterwards.
+    """
+    user = User.objects.create_user(f'bench-{uuid.uuid4().hex[:12]}')
+    slots = slot_ids()
+
+    sections = {name: Section.objects.create(user=user, name=name) for name in problem.sections}
+    faculty_ids = sorted({subject.faculty_id for subject in problem.subjects.values()})
+    faculty = {
+        faculty_id: Faculty.objects.create(
+            user=user,
+            name=f'Faculty {faculty_id}',
+            email=f'faculty{faculty_id}@example.com',
+            department='Benchmark',
+            # Problem.position is the layout of the mask too
+            availability_mask=problem.availability.get(faculty_id, 0)
+        )
+        for faculty_id in faculty_ids
+    }
+
+    rows = []
+    for faculty_id, member in faculty.items():
+        mask = problem.availability.get(faculty_id, 0)
+        for d, day in enumerate(problem.days):
+            for s, number in enumerate(problem.slots):
+                if (mask >> problem.position(d, s)) & 1:
+                    rows.append(Availability(faculty=member, day=day, time_slot_id=slots[number], is_available=True))
+    Availability.objects.bulk_create(rows)
+
+    taught_by = {}
+    for section in problem.sections:
+        for subject in problem.curriculum(section):
+            taught_by.setdefault(subject.id, []).append(sections[section])
+    for subject in problem.subjects.values():
+        created = Subject.objects.create(
+            user=user,
+            name=subject.name,
+            faculty=faculty[subject.faculty_id],
+            credits=subject.credits,
+            is_lab=subject.is_lab,
+            classes_per_week=subject.credits
+        )
+        # Subjects taught to every section keep an empty list, as in the app
+        if len(taught_by.get(subject.id, [])) < len(problem.sections):
+            created.sections.set(taught_by.get(subject.id, []))
+    return user
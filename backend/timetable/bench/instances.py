@@ -0,0 +1,55 @@
+import math
+import random
+
+from ..solver import Problem, SubjectInfo
+
+DAYS = ['MON', 'TUE', 'WED', 'THU', 'FRI']
+SLOTS = list(range(1, 11))
+
+
+def synthetic_problem(sections, subjects=7, lab_ratio=0.15, faculty=None,
+                      availability=0.7, credits=(3, 4), seed=0):
+    """
+    Build a random Problem with the given number of sections.
+
+    Every section gets its own `subjects` subjects, round(subjects *
+    lab_ratio) of them labs, taught by a shared pool of faculty members (by
+    default one per three subjects, so each section shares faculty with
+    several others). availability is the share of the week each faculty
+    member is available for.
+    """
+    rng = random.Random(seed)
+    names = [f'S{i + 1}' for i in range(sections)]
+    labs = round(subjects * lab_ratio)
+    if faculty is None:
+        faculty = max(1, math.ceil(sections * subjects / 3))
+    n_positions = len(DAYS) * len(SLOTS)
+
+    # Hand subjects out round-robin over a shuffled pool so loads stay even
+    pool = list(range(1, faculty + 1))
+    rng.shuffle(pool)
+    infos = []
+    curricula = {}
+    for index, section in enumerate(names):
+        ids = []
+        for j in range(subjects):
+            subject_id = len(infos) + 1
+            faculty_id = pool[(index * subjects + j) % faculty]
+            is_lab = j >= subjects - labs
+            infos.append(SubjectInfo(
+                id=subject_id,
+                name=f'{section}-{"Lab" if is_lab else "Subject"} {j + 1}',
+                faculty_id=faculty_id,
+                faculty_name=f'Faculty {faculty_id}',
+                is_lab=is_lab,
+                credits=1 if is_lab else rng.randint(*credits),
+            ))
+            ids.append(subject_id)
+        curricula[section] = ids
+
+    masks = {}
+    for faculty_id in range(1, faculty + 1):
+        positions = rng.sample(range(n_positions), round(n_positions * availability))
+        masks[faculty_id] = sum(1 << position for position in positions)
+
+    return Problem(DAYS, SLOTS, names, infos, masks, curricula=curricula)
@@ -0,0 +1,134 @@
+"""
+Run synthetic instances through the engines and the full generator.
+
+Each instance is measured twice: the engine alone on the in-memory
+Problem (wall time, attempts, success and peak memory), then the whole
+generate_timetable pipeline on a copy of the instance stored in the
+database (wall time and query count). Database changes are rolled back.
+"""
+import statistics
+import time
+import tracemalloc
+
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext, override_settings
+
+from ..solver import ENGINES, SolverError
+from .database import load_instance
+from .instances import synthetic_problem
+
+
+class _Rollback(Exception):
+    pass
+
+
+def run_engine(problem, engine, seed=0):
+    """Time one engine run; attempts is what the engine reports (heuristic attempts, solver restarts + 1)."""
+    stats = {}
+    start = time.perf_counter()
+    try:
+        ENGINES[engine](problem, seed=seed, stats=stats)
+        error = None
+    except SolverError as e:
+        error = f'{type(e).__name__}: {e}'
+    wall = time.perf_counter() - start
+
+    # Measured separately, tracemalloc slows the run down
+    tracemalloc.start()
+    try:
+        ENGINES[engine](problem, seed=seed)
+    except SolverError:
+        pass
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        'wall_seconds': round(wall, 6),
+        'attempts': stats.get('attempts', 0),
+        'success': error is None,
+        'error': error,
+        'peak_memory_bytes': peak,
+    }
+
+
+def run_pipeline(problem, engine, seed=0, workers=1, optimize_seconds=0):
+    """Time generate_timetable on the instance stored in the database; nothing is kept."""
+    from ..generator import generate_timetable
+
+    result = {}
+    overrides = {
+        'TIMETABLE_ENGINE': engine,
+        'TIMETABLE_WORKERS': workers,
+        'TIMETABLE_SEED': seed,
+        'TIMETABLE_OPTIMIZE_SECONDS': optimize_seconds,
+    }
+    try:
+        with transaction.atomic(), override_settings(**overrides):
+            user = load_instance(problem)
+            with CaptureQueriesContext(connection) as queries:
+                start = time.perf_counter()
+                try:
+                    generate_timetable(user)
+                    result['success'] = True
+                except SolverError:
+                    result['success'] = False
+                result['wall_seconds'] = round(time.perf_counter() - start, 6)
+            result['queries'] = len(queries)
+            raise _Rollback()
+    except _Rollback:
+        pass
+    return result
+
+
+def run_benchmark(sections=2, subjects=7, lab_ratio=0.15, faculty=None, availability=0.7,
+                  instances=5, engines=('solver', 'heuristic'), seed=0, workers=1,
+                  optimize_seconds=0, database=True):
+    """Return a JSON-serialisable report for `instances` random instances per engine."""
+    config = {
+        'sections': sections,
+        'subjects': subjects,
+        'lab_ratio': lab_ratio,
+        'faculty': faculty,
+        'availability': availability,
+        'instances': instances,
+        'engines': list(engines),
+        'seed': seed,
+        'workers': workers,
+        'optimize_seconds': optimize_seconds,
+        'database': database,
+    }
+    results = []
+    for index in range(instances):
+        instance_seed = seed + index
+        problem = synthetic_problem(
+            sections,
+            subjects=subjects,
+            lab_ratio=lab_ratio,
+            faculty=faculty,
+            availability=availability,
+            seed=instance_seed
+        )
+        for engine in engines:
+            result = {'engine': engine, 'seed': instance_seed}
+            result.update(run_engine(problem, engine, seed=instance_seed))
+            if database:
+                result['pipeline'] = run_pipeline(problem, engine, instance_seed, workers, optimize_seconds)
+            results.append(result)
+
+    summary = {}
+    for engine in engines:
+        runs = [result for result in results if result['engine'] == engine]
+        summary[engine] = {
+            'success_rate': sum(result['success'] for result in runs) / len(runs),
+            'median_wall_seconds': statistics.median(result['wall_seconds'] for result in runs),
+            'median_attempts': statistics.median(result['attempts'] for result in runs),
+            'max_peak_memory_bytes': max(result['peak_memory_bytes'] for result in runs),
+        }
+        if database:
+            summary[engine]['median_pipeline_seconds'] = statistics.median(
+                result['pipeline']['wall_seconds'] for result in runs
+            )
+            summary[engine]['median_queries'] = statistics.median(
+                result['pipeline']['queries'] for result in runs
+            )
+    return {'config': config, 'summary': summary, 'results': results}
@@ -0,0 +1,43 @@
+import time
+
+from ..solver import ENGINES
+from .instances import synthetic_problem
+
+
+def time_generation(problem, engine='solver', seed=0):
+    """Return (seconds, error class name or None) for one run of an engine."""
+    start = time.perf_counter()
+    try:
+        ENGINES[engine](problem, seed=seed)
+        error = None
+    except Exception as e:
+        error = type(e).__name__
+    return time.perf_counter() - start, error
+
+
+def section_scaling(section_counts, engine='solver', repeats=3, seed=0):
+    """
+    Time generation for growing numbers of sections.
+
+    Returns one dict per section count with the median time over `repeats`
+    random instances and the time per section, which stays roughly flat
+    when generation scales linearly.
+    """
+    rows = []
+    for sections in section_counts:
+        times = []
+        failures = 0
+        for repeat in range(repeats):
+            problem = synthetic_problem(sections, seed=seed + repeat)
+            seconds, error = time_generation(problem, engine, seed=seed + repeat)
+            times.append(seconds)
+            if error is not None:
+                failures += 1
+        median = sorted(times)[len(times) // 2]
+        rows.append({
+            'sections': sections,
+            'median_seconds': median,
+            'seconds_per_section': median / sections,
+            'failures': failures,
+        })
+    return rows
@@ -0,0 +1,317 @@
+"""
+Streaming timetable exports: iCalendar, CSV and printable PDF.
+
+Rows are read from the database in chunks, ordered by section (or by
+faculty member), and only one section's or faculty member's week is held
+in memory at a time. Every writer is a generator of bytes, so exports of
+any size can be passed to a StreamingHttpResponse or written to a file
+without building the whole document first.
+"""
+import csv
+import datetime
+from collections import namedtuple
+
+from django.utils import timezone
+from django.utils.text import slugify
+
+from .models import Timetable
+from .week import WEEK
+
+# Rows fetched from the database at a time
+CHUNK_SIZE = 2000
+
+# Length of the term exported to iCalendar when no end date is given
+DEFAULT_TERM_WEEKS = 15
+
+SCOPES = ('section', 'faculty')
+
+Lesson = namedtuple('Lesson', 'section day slot subject faculty_id faculty is_lunch_break')
+
+_DAY_INDEX = {code: index for index, code in enumerate(WEEK.day_codes)}
+
+
+def slot_times(slot_number):
+    """Start and end time of a slot; '1:10 - 2:00' is read as an afternoon slot."""
+    times = []
+    for text in WEEK.slot_times[slot_number].split('-'):
+        hour, minute = (int(part) for part in text.strip().split(':'))
+        if hour < 8:
+            hour += 12
+        times.append(datetime.time(hour, minute))
+    return times[0], times[1]
+
+
+def default_term(start=None, end=None):
+    """Fill in a missing term start (Monday of this week) or end (DEFAULT_TERM_WEEKS later)."""
+    if start is None:
+        today = timezone.localdate()
+        start = today - datetime.timedelta(days=today.weekday())
+    if end is None:
+        end = start + datetime.timedelta(weeks=DEFAULT_TERM_WEEKS, days=-1)
+    return start, end
+
+
+def timetable_rows(user, scope='section', key=None):
+    """The Lesson columns of the user's rows, grouped by section or faculty member."""
+    rows = Timetable.objects.filter(user=user)
+    if scope == 'faculty':
+        rows = rows.filter(faculty__isnull=False)
+        if key is not None:
+            rows = rows.filter(faculty_id=key)
+        rows = rows.order_by('faculty__name', 'faculty_id')
+    else:
+        if key is not None:
+            rows = rows.filter(section=key)
+        rows = rows.order_by('section')
+    return rows.values_list(
+        'section', 'day', 'time_slot__slot_number', 'subject__name', 'faculty_id', 'faculty__name',
+        'is_lunch_break'
+    )
+
+
+def timetable_groups(user, scope='section', key=None):
+    """
+    Yield (title, lessons) for every section, or every faculty member.
+
+    key limits the export to one section name or faculty id. Lessons are
+    sorted by day and slot; faculty schedules leave out lunch breaks.
+    """
+    rows = timetable_rows(user, scope, key).iterator(chunk_size=CHUNK_SIZE)
+
+    current = None
+    title = None
+    lessons = []
+    for row in rows:
+        lesson = Lesson(*row)
+        group = lesson.faculty_id if scope == 'faculty' else lesson.section
+        if group != current:
+            if lessons:
+                yield title, sorted(lessons, key=_lesson_order)
+            current = group
+            title = lesson.faculty if scope == 'faculty' else f'Section {lesson.section}'
+            lessons = []
+        lessons.append(lesson)
+    if lessons:
+        yield title, sorted(lessons, key=_lesson_order)
+
+
+def _lesson_order(lesson):
+    return _DAY_INDEX.get(lesson.day, len(_DAY_INDEX)), lesson.slot, lesson.section
+
+
+class _Echo:
+    """File-like object handing back what csv.writer writes to it."""
+
+    def write(self, value):
+        return value
+
+
+def csv_chunks(groups, scope='section'):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(['Section', 'Day', 'Slot', 'Start', 'End', 'Subject', 'Faculty']).encode()
+    for _, lessons in groups:
+        for lesson in lessons:
+            start, end = slot_times(lesson.slot)
+            yield writer.writerow([
+                lesson.section,
+                lesson.day,
+                lesson.slot,
+                start.strftime('%H:%M'),
+                end.strftime('%H:%M'),
+                'Lunch Break' if lesson.is_lunch_break else lesson.subject,
+                lesson.faculty or '',
+            ]).encode()
+
+
+def _ics_text(value):
+    return (value.replace('\\', '\\\\').replace(';', '\\;').replace(',', '\\,')
+            .replace('\n', '\\n'))
+
+
+def _ics_line(line):
+    """Fold a content line to at most 75 octets per physical line."""
+    data = line.encode()
+    parts = []
+    while len(data) > 75:
+        cut = 75 if not parts else 74
+        # Never split a UTF-8 sequence
+        while data[cut] & 0xC0 == 0x80:
+            cut -= 1
+        parts.append(data[:cut])
+        data = data[cut:]
+    parts.append(data)
+    return b'\r\n '.join(parts) + b'\r\n'
+
+
+def ics_chunks(groups, scope='section', start=None, end=None):
+    """One weekly recurring event per class between the term start and end dates."""
+    start, end = default_term(start, end)
+    stamp = timezone.now().strftime('%Y%m%dT%H%M%SZ')
+    until = datetime.datetime.combine(end, datetime.time(23, 59, 59)).strftime('%Y%m%dT%H%M%S')
+    for line in ('BEGIN:VCALENDAR', 'VERSION:2.0', 'PRODID:-//MY_TIMETABLE//Timetable export//EN',
+                 'CALSCALE:GREGORIAN', 'METHOD:PUBLISH'):
+        yield _ics_line(line)
+    for title, lessons in groups:
+        for lesson in lessons:
+            if lesson.is_lunch_break:
+                continue
+            # First occurrence on the lesson's weekday on or after the term start
+            date = start + datetime.timedelta(days=(_DAY_INDEX[lesson.day] - start.weekday()) % 7)
+            if date > end:
+                continue
+            begins, ends = slot_times(lesson.slot)
+            if scope == 'faculty':
+                summary = f'{lesson.subject} (Section {lesson.section})'
+            else:
+                summary = f'{lesson.subject} ({lesson.faculty})'
+            lines = [
+                'BEGIN:VEVENT',
+                f'UID:{scope}-{lesson.faculty_id if scope == "faculty" else lesson.section}-'
+                f'{lesson.section}-{lesson.day}-{lesson.slot}@my-timetable',
+                f'DTSTAMP:{stamp}',
+                f'DTSTART:{datetime.datetime.combine(date, begins):%Y%m%dT%H%M%S}',
+                f'DTEND:{datetime.datetime.combine(date, ends):%Y%m%dT%H%M%S}',
+                f'RRULE:FREQ=WEEKLY;UNTIL={until}',
+                f'SUMMARY:{_ics_text(summary)}',
+                f'DESCRIPTION:{_ics_text(f"{lesson.subject}, Section {lesson.section}, {lesson.faculty}")}',
+                f'CATEGORIES:{_ics_text(title)}',
+                'END:VEVENT',
+            ]
+            yield b''.join(_ics_line(line) for line in lines)
+    yield _ics_line('END:VCALENDAR')
+
+
+# A4 landscape, in points
+_PAGE_WIDTH = 842
+_PAGE_HEIGHT = 595
+_MARGIN = 36
+_TIME_COLUMN = 70
+
+
+def _pdf_text(value):
+    value = value.encode('cp1252', 'replace').decode('latin-1')
+    return value.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)')
+
+
+def _pdf_page(title, lessons, scope):
+    """Content stream drawing one week as a table."""
+    days = WEEK.days
+    slots = WEEK.slots
+    column = (_PAGE_WIDTH - 2 * _MARGIN - _TIME_COLUMN) / len(days)
+    top = _PAGE_HEIGHT - _MARGIN - 30
+    row = (top - _MARGIN) / (len(slots) + 1)
+    fits = int(column / 3.6)
+
+    ops = [f'BT /F2 16 Tf {_MARGIN} {_PAGE_HEIGHT - _MARGIN - 12} Td ({_pdf_text(title)}) Tj ET', '0.5 w']
+    # Grid lines
+    for i in range(len(slots) + 2):
+        y = top - i * row
+        ops.append(f'{_MARGIN} {y:.2f} m {_PAGE_WIDTH - _MARGIN} {y:.2f} l S')
+    for i in range(len(days) + 2):
+        x = _MARGIN + (_TIME_COLUMN + (i - 1) * column if i else 0)
+        ops.append(f'{x:.2f} {top:.2f} m {x:.2f} {top - (len(slots) + 1) * row:.2f} l S')
+
+    def text(x, y, value, font='F1', size=8):
+        ops.append(f'BT /{font} {size} Tf {x + 4:.2f} {y:.2f} Td ({_pdf_text(value[:fits])}) Tj ET')
+
+    for d, (_, day_name) in enumerate(days):
+        text(_MARGIN + _TIME_COLUMN + d * column, top - row + 8, day_name, 'F2', 9)
+    for s, (_, time) in enumerate(slots):
+        text(_MARGIN, top - (s + 2) * row + 8, time)
+
+    slot_index = {number: s for s, (number, _) in enumerate(slots)}
+    for lesson in lessons:
+        if lesson.day not in _DAY_INDEX or lesson.slot not in slot_index:
+            continue
+        x = _MARGIN + _TIME_COLUMN + _DAY_INDEX[lesson.day] * column
+        y = top - (slot_index[lesson.slot] + 2) * row
+        if lesson.is_lunch_break:
+            text(x, y + row / 2 - 3, 'Lunch Break')
+            continue
+        text(x, y + row / 2 + 2, lesson.subject, 'F2')
+        text(x, y + row / 2 - 8, f'Section {lesson.section}' if scope == 'faculty' else lesson.faculty)
+    return '\n'.join(ops).encode('latin-1')
+
+
+def pdf_chunks(groups, scope='section'):
+    """
+    A PDF with one page per section or faculty member, written as it goes.
+
+    Objects 1 to 4 are the catalog, page tree and two fonts; the page tree
+    is written last, once every page (and its byte offset) is known.
+    """
+    offsets = {}
+    written = 0
+
+    def pdf_object(number, body):
+        offsets[number] = written
+        return f'{number} 0 obj\n'.encode() + body + b'\nendobj\n'
+
+    chunk = b'%PDF-1.4\n%\xe2\xe3\xcf\xd3\n'
+    yield chunk
+    written += len(chunk)
+    for number, font in ((3, 'Helvetica'), (4, 'Helvetica-Bold')):
+        chunk = pdf_object(number, f'<< /Type /Font /Subtype /Type1 /BaseFont /{font} '
+                                   f'/Encoding /WinAnsiEncoding >>'.encode())
+        yield chunk
+        written += len(chunk)
+
+    pages = []
+    number = 5
+    for title, lessons in _pdf_groups(groups):
+        content = _pdf_page(title, lessons, scope)
+        chunk = pdf_object(number, f'<< /Length {len(content)} >>\nstream\n'.encode() + content + b'\nendstream')
+        yield chunk
+        written += len(chunk)
+        chunk = pdf_object(number + 1, (
+            f'<< /Type /Page /Parent 2 0 R /MediaBox [0 0 {_PAGE_WIDTH} {_PAGE_HEIGHT}] '
+            f'/Resources << /Font << /F1 3 0 R /F2 4 0 R >> >> /Contents {number} 0 R >>'
+        ).encode())
+        yield chunk
+        written += len(chunk)
+        pages.append(number + 1)
+        number += 2
+
+    kids = ' '.join(f'{page} 0 R' for page in pages)
+    for obj, body in ((2, f'<< /Type /Pages /Kids [{kids}] /Count {len(pages)} >>'.encode()),
+                          (1, b'<< /Type /Catalog /Pages 2 0 R >>')):
+        chunk = pdf_object(obj, body)
+        yield chunk
+        written += len(chunk)
+
+    xref = [f'xref\n0 {number}\n', '0000000000 65535 f \n']
+    xref.extend(f'{offsets[i]:010d} 00000 n \n' for i in range(1, number))
+    xref.append(f'trailer\n<< /Size {number} /Root 1 0 R >>\nstartxref\n{written}\n%%EOF\n')
+    yield ''.join(xref).encode()
+
+
+def _pdf_groups(groups):
+    """groups, or a single empty page when there is nothing to print."""
+    empty = True
+    for group in groups:
+        empty = False
+        yield group
+    if empty:
+        yield 'No timetable has been generated yet', []
+
+
+FORMATS = {
+    'ics': ('text/calendar; charset=utf-8', ics_chunks),
+    'csv': ('text/csv; charset=utf-8', csv_chunks),
+    'pdf': ('application/pdf', pdf_chunks),
+}
+
+
+def export_timetable(user, fmt, scope='section', key=None, start=None, end=None):
+    """Return (content type, filename, iterator of bytes) for an export."""
+    content_type, writer = FORMATS[fmt]
+    groups = timetable_groups(user, scope, key)
+    if fmt == 'ics':
+        chunks = writer(groups, scope, start, end)
+    else:
+        chunks = writer(groups, scope)
+    name = 'faculty' if scope == 'faculty' else 'sections'
+    if key is not None:
+        # key comes from the query string; only a slug of it is safe in a filename
+        name = f'{scope}-{slugify(str(key)) or "export"}'
+    return content_type, f'timetable-{name}.{fmt}', chunks
@@ -0,0 +1,103 @@
+"""
+Timetable generation and repair shared by the views and the background worker.
+"""
+from django.conf import settings
+
+from . import solution_cache
+from .persistence import load_grid, save_grid
+from .solver import build_problem, optimize, repair, solve_portfolio
+
+
+def optimize_budget(seconds=None):
+    """Seconds to spend improving a new timetable, capped by TIMETABLE_MAX_OPTIMIZE_SECONDS."""
+    if seconds is None:
+        seconds = getattr(settings, 'TIMETABLE_OPTIMIZE_SECONDS', 2)
+    return max(0, min(seconds, getattr(settings, 'TIMETABLE_MAX_OPTIMIZE_SECONDS', 30)))
+
+
+def optimize_moves(seconds):
+    """The move budget standing in for seconds of optimisation in seeded runs."""
+    return int(seconds * getattr(settings, 'TIMETABLE_OPTIMIZE_MOVES_PER_SECOND', 100000))
+
+
+def _optimize(problem, grid, seconds, seed, progress):
+    # A time limit depends on the speed of the machine, so seeded runs stop
+    # after a fixed number of moves to give the same timetable everywhere
+    return optimize(
+        problem,
+        grid,
+        seconds,
+        weights=getattr(settings, 'TIMETABLE_OBJECTIVE', None),
+        max_consecutive=getattr(settings, 'TIMETABLE_MAX_CONSECUTIVE', 3),
+        seed=seed,
+        progress=progress,
+        max_moves=optimize_moves(seconds) if seed is not None else None
+    )
+
+
+def generate_timetable(user, progress=None, new_variant=False, optimize_seconds=None):
+    """
+    Generate and save a timetable for the user.
+
+    Unchanged inputs restore the cached solution instead of searching again;
+    new_variant asks for the next cached alternative or a freshly generated
+    one. New timetables are then improved for optimize_seconds (default
+    TIMETABLE_OPTIMIZE_SECONDS); passing it explicitly also improves a
+    cached timetable further. With TIMETABLE_SEED set the improvement runs
+    for optimize_moves(optimize_seconds) moves rather than for a time, so
+    the same inputs give the same timetable on any machine. progress is an optional callable(done, total)
+    forwarded to the engine. Raises SolverError (Infeasible or
+    SearchLimitExceeded) on failure, in which case the existing timetable
+    is left untouched.
+    """
+    problem = build_problem(user)
+    seconds = optimize_budget(optimize_seconds)
+    fingerprint = problem.fingerprint()
+    if new_variant:
+        entry = solution_cache.next_variant(user, fingerprint)
+    else:
+        entry = solution_cache.lookup(user, fingerprint)
+
+    if entry is not None:
+        grid = entry.grid
+        if optimize_seconds is not None and seconds > 0:
+            grid = _optimize(problem, grid, seconds, getattr(settings, 'TIMETABLE_SEED', None), progress)
+            entry.grid = grid
+            entry.save(update_fields=['grid', 'last_used_at'])
+    else:
+        seed = getattr(settings, 'TIMETABLE_SEED', None)
+        if seed is not None:
+            # Keep variants reproducible without repeating the first one
+            seed += solution_cache.variant_count(user, fingerprint)
+        grid = solve_portfolio(
+            problem,
+            getattr(settings, 'TIMETABLE_ENGINE', 'solver'),
+            workers=getattr(settings, 'TIMETABLE_WORKERS', 1),
+            seed=seed,
+            progress=progress
+        )
+        if seconds > 0:
+            grid = _optimize(problem, grid, seconds, seed, progress)
+        solution_cache.store(user, fingerprint, grid)
+    save_grid(user, problem, grid)
+    return grid
+
+
+def repair_timetable(user):
+    """
+    Repair the user's saved timetable in place after an input change.
+
+    Returns the number of cells that changed, or None when the user has no
+    timetable yet. Raises RepairFailed when a local repair is not possible.
+    """
+    problem = build_problem(user)
+    old_grid = load_grid(user, problem)
+    if old_grid is None:
+        return None
+    new_grid = repair(
+        problem,
+        old_grid,
+        max_depth=getattr(settings, 'TIMETABLE_REPAIR_DEPTH', 2),
+        seed=getattr(settings, 'TIMETABLE_SEED', None)
+    )
+    return save_grid(user, problem, new_grid, diff=True)
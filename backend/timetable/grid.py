@@ -0,0 +1,152 @@
+"""
+Timetable grids for display, cached per (user, section, timetable version).
+
+The version is a token kept in the cache itself and replaced whenever the
+user's timetable or the data it shows changes, so stale grids are never
+read again and a repeat view needs no database query at all. The cache
+must be shared between the web and worker processes (see CACHES).
+"""
+import uuid
+
+from django.core.cache import cache
+from django.db import transaction
+
+from .models import Timetable, TimetableSnapshot
+from .sections import section_names
+from .week import WEEK
+
+# Seconds cached grids (and the version token) are kept
+CACHE_TIMEOUT = 24 * 60 * 60
+
+
+def _version_key(user_id):
+    return f'timetable:{user_id}:version'
+
+
+def timetable_version(user):
+    """Current version token of the user's timetable."""
+    key = _version_key(user.id)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, uuid.uuid4().hex, CACHE_TIMEOUT)
+        version = cache.get(key)
+    return version
+
+
+def invalidate_timetable(user_id):
+    """Start a new timetable version for the user once the current transaction commits."""
+    transaction.on_commit(lambda: cache.delete(_version_key(user_id)))
+
+
+def cached_section_names(user, version=None):
+    version = version or timetable_version(user)
+    key = f'timetable:{user.id}:{version}:sections'
+    names = cache.get(key)
+    if names is None:
+        names = section_names(user)
+        cache.set(key, names, CACHE_TIMEOUT)
+    return names
+
+
+def section_entries(user, section):
+    return Timetable.objects.filter(user=user, section=section).select_related('subject', 'faculty', 'time_slot')
+
+
+def build_grid(user, section):
+    """Rows of display cells for one section, from a single query."""
+    entries = section_entries(user, section)
+    by_cell = {(entry.day, entry.time_slot.slot_number): entry for entry in entries}
+
+    rows = []
+    for slot_number, time in WEEK.slots:
+        row = {'time': time, 'cells': []}
+        for day_code in WEEK.day_codes:
+            entry = by_cell.get((day_code, slot_number))
+            if entry is None:
+                cell = {'type': 'free', 'content': 'Free'}
+            elif entry.is_lunch_break:
+                cell = {'type': 'lunch', 'content': 'Lunch Break'}
+            else:
+                cell = {'type': 'class', 'content': f"{entry.subject.name}\n{entry.faculty.name}"}
+            row['cells'].append(cell)
+        rows.append(row)
+    return rows
+
+
+def section_grid(user, section, version=None):
+    """build_grid, served from the cache while the timetable version is unchanged."""
+    version = version or timetable_version(user)
+    key = f'timetable:{user.id}:{version}:grid:{section}'
+    rows = cache.get(key)
+    if rows is None:
+        rows = build_grid(user, section)
+        cache.set(key, rows, CACHE_TIMEOUT)
+    return rows
+
+
+def faculty_entries(faculty):
+    return Timetable.objects.filter(faculty=faculty).select_related('subject', 'time_slot')
+
+
+def build_faculty_grid(faculty):
+    """
+    Rows of display cells for one faculty member's week across all sections.
+
+    A single query on the (faculty, day, time_slot) index, so the cost does
+    not grow with the number of sections.
+    """
+    entries = faculty_entries(faculty)
+    by_cell = {}
+    for entry in entries:
+        by_cell.setdefault((entry.day, entry.time_slot.slot_number), []).append(entry)
+
+    rows = []
+    for slot_number, time in WEEK.slots:
+        row = {'slot': slot_number, 'time': time, 'cells': []}
+        for day_code in WEEK.day_codes:
+            classes = [
+                {'subject': entry.subject.name, 'section': entry.section}
+                for entry in sorted(by_cell.get((day_code, slot_number), []), key=lambda entry: entry.section)
+            ]
+            if classes:
+                cell = {
+                    'type': 'class',
+                    'classes': classes,
+                    'content': '\n'.join(f"{c['subject']}\nSection {c['section']}" for c in classes),
+                }
+            else:
+                cell = {'type': 'free', 'content': 'Free'}
+            row['cells'].append(cell)
+        rows.append(row)
+    return rows
+
+
+def faculty_grid(user, faculty, version=None):
+    """build_faculty_grid, served from the cache while the timetable version is unchanged."""
+    version = version or timetable_version(user)
+    key = f'timetable:{user.id}:{version}:faculty:{faculty.id}'
+    rows = cache.get(key)
+    if rows is None:
+        rows = build_faculty_grid(faculty)
+        cache.set(key, rows, CACHE_TIMEOUT)
+    return rows
+
+
+def latest_snapshot(user, version=None):
+    """The user's newest TimetableSnapshot as a dict, or None; cached like the grids."""
+    version = version or timetable_version(user)
+    key = f'timetable:{user.id}:{version}:snapshot'
+    snapshot = cache.get(key)
+    if snapshot is None:
+        latest = TimetableSnapshot.objects.filter(user=user).first()
+        # Cache the absence of a snapshot too, so it is not looked up again
+        snapshot = {'version': 0, 'created_at': None, 'grid': {}, 'subjects': {}}
+        if latest is not None:
+            snapshot = {
+                'version': latest.version,
+                'created_at': latest.created_at,
+                'grid': latest.grid,
+                'subjects': latest.subjects,
+            }
+        cache.set(key, snapshot, CACHE_TIMEOUT)
+    return snapshot if snapshot['version'] else None
@@ -0,0 +1,242 @@
+"""
+Ingesting attendance from the CSV exports of biometric and RFID readers.
+
+A dump has one row per reading: a roll number, a subject (id or name), a
+date or timestamp and, optionally, whether the student was present (a
+reading on its own means present). Rows are read in chunks; roll numbers
+and subjects are resolved through dictionaries built once per run, and
+each chunk is saved class by class with save_attendance, so the upserts
+and rollups behave exactly as when attendance is marked by hand and
+running the same dump again writes nothing. A student counts as present
+in a class if any reading says so: save_attendance keeps students it has
+already recorded as present, so this holds whichever chunks the readings
+fall in. Once the whole dump is saved, the students of a class's section
+with no reading at all are recorded as absent (readers only log the
+students who were there), so attendance percentages count them. Memory
+depends on the chunk size, the roster and the number of classes in the
+dump, not on the number of readings.
+"""
+import csv
+import gzip
+import time
+from collections import defaultdict
+
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from .attendance import save_attendance
+from .models import Student, Subject
+
+CHUNK_SIZE = 5000
+# Skipped rows listed in the report; the rest are only counted
+MAX_REPORTED_ERRORS = 20
+
+# Accepted headings -> column
+HEADINGS = {
+    'roll_number': 'roll_number',
+    'roll': 'roll_number',
+    'roll_no': 'roll_number',
+    'student': 'roll_number',
+    'subject': 'subject',
+    'subject_id': 'subject',
+    'course': 'subject',
+    'date': 'date',
+    'timestamp': 'date',
+    'datetime': 'date',
+    'time': 'date',
+    'present': 'present',
+    'is_present': 'present',
+    'status': 'present',
+}
+PRESENT = {'', '1', 'true', 'yes', 'y', 'p', 'present', 'in'}
+ABSENT = {'0', 'false', 'no', 'n', 'a', 'absent'}
+
+
+class IngestError(Exception):
+    """The dump as a whole cannot be read."""
+
+
+def open_dump(path):
+    """Open a dump (optionally gzipped) as text for read_dump."""
+    if path.endswith('.gz'):
+        return gzip.open(path, 'rt', encoding='utf-8-sig', newline='')
+    return open(path, encoding='utf-8-sig', newline='')
+
+
+def read_dump(file, default_subject=None):
+    """Yield (line number, roll number, subject, date text, present text) for each reading."""
+    reader = csv.reader(file)
+    try:
+        headings = next(reader, None)
+        if headings is None:
+            raise IngestError('The file is empty')
+        columns = ['_'.join(heading.strip().lower().split()) for heading in headings]
+        columns = [HEADINGS.get(column, column) for column in columns]
+        required = ['roll_number', 'date'] + ([] if default_subject else ['subject'])
+        missing = [column for column in required if column not in columns]
+        if missing:
+            raise IngestError(f'The file has no {" or ".join(missing)} column (found: {", ".join(headings)})')
+        positions = {column: columns.index(column) for column in HEADINGS.values() if column in columns}
+
+        def cell(values, column):
+            position = positions.get(column)
+            return values[position].strip() if position is not None and position < len(values) else ''
+
+        for values in reader:
+            if not any(value.strip() for value in values):
+                continue
+            yield (
+                reader.line_num,
+                cell(values, 'roll_number'),
+                cell(values, 'subject') or default_subject,
+                cell(values, 'date'),
+                cell(values, 'present').lower()
+            )
+    except UnicodeDecodeError:
+        raise IngestError('The file is not UTF-8 text')
+    except csv.Error as e:
+        raise IngestError(f'Line {reader.line_num}: {e}')
+
+
+def _reading_date(text):
+    try:
+        date = parse_date(text)
+        if date is None:
+            moment = parse_datetime(text)
+            if moment is None:
+                return None
+            # Readers that log UTC timestamps count in the local day
+            date = timezone.localtime(moment).date() if timezone.is_aware(moment) else moment.date()
+        return date
+    except ValueError:
+        return None
+
+
+class Lookups:
+    """The user's students and subjects, loaded once per run."""
+
+    def __init__(self, user):
+        # roll number -> (student id, section)
+        self.students = {}
+        # section -> student ids
+        self.roster = defaultdict(list)
+        for student_id, roll_number, section in Student.objects.filter(user=user).values_list(
+            'id', 'roll_number', 'section'
+        ):
+            self.students[roll_number] = (student_id, section)
+            self.roster[section].append(student_id)
+        subjects = list(Subject.objects.filter(user=user).select_related('faculty').prefetch_related('sections'))
+        self.subjects = {str(subject.id): subject for subject in subjects}
+        names = defaultdict(list)
+        for subject in subjects:
+            names[subject.name.strip().lower()].append(subject)
+        # Names shared by several subjects resolve to None
+        self.names = {name: found[0] if len(found) == 1 else None for name, found in names.items()}
+        # Sections each subject is taught to; empty means all of them
+        self.sections = {subject.id: {section.name for section in subject.sections.all()} for subject in subjects}
+
+    def subject(self, text):
+        if text in self.subjects:
+            return self.subjects[text]
+        return self.names.get(text.lower())
+
+
+def _resolve(lookups, reading):
+    """(subject, date, student id, section, present) for a reading, or an error message."""
+    line, roll_number, subject_text, date_text, present_text = reading
+    student = lookups.students.get(roll_number)
+    if student is None:
+        return f'Unknown roll number {roll_number!r}'
+    subject = lookups.subject(subject_text or '')
+    if subject is None:
+        if subject_text and subject_text.lower() in lookups.names:
+            return f'More than one subject is called {subject_text!r}; use its id'
+        return f'Unknown subject {subject_text!r}'
+    student_id, section = student
+    if lookups.sections[subject.id] and section not in lookups.sections[subject.id]:
+        return f'{subject.name} is not taught to section {section}'
+    date = _reading_date(date_text)
+    if date is None:
+        return f'Invalid date {date_text!r}'
+    if present_text in PRESENT:
+        present = True
+    elif present_text in ABSENT:
+        present = False
+    else:
+        return f'Invalid status {present_text!r}'
+    return subject, date, student_id, section, present
+
+
+def _chunks(readings, size):
+    chunk = []
+    for reading in readings:
+        chunk.append(reading)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def ingest_attendance(user, readings, chunk_size=CHUNK_SIZE, progress=None):
+    """
+    Save readings (from read_dump) as the user's attendance.
+
+    A student counts as present in a class if any of their readings says
+    so, so the result does not depend on chunk_size, and students of the
+    class's section without a reading are then recorded as absent. Returns
+    a report: rows read, records saved (new or changed, the absent
+    students' included), rows skipped, the first MAX_REPORTED_ERRORS
+    skipped rows as (line, error), classes read (once per chunk they appear
+    in), seconds and rows per second. progress, if given, is called with
+    the report so far after each chunk.
+    """
+    started = time.perf_counter()
+    lookups = Lookups(user)
+    report = {'rows': 0, 'saved': 0, 'skipped': 0, 'errors': [], 'classes': 0}
+    # (subject id, date) -> the sections with readings in that class
+    sections = defaultdict(set)
+    subjects = {}
+    for chunk in _chunks(readings, chunk_size):
+        # (subject id, date) -> student id -> present
+        classes = defaultdict(dict)
+        for reading in chunk:
+            resolved = _resolve(lookups, reading)
+            if isinstance(resolved, str):
+                report['skipped'] += 1
+                if len(report['errors']) < MAX_REPORTED_ERRORS:
+                    report['errors'].append((reading[0], resolved))
+                continue
+            subject, date, student_id, section, present = resolved
+            subjects[subject.id] = subject
+            sections[(subject.id, date)].add(section)
+            presence = classes[(subject.id, date)]
+            presence[student_id] = presence.get(student_id, False) or present
+
+        for (subject_id, date), presence in sorted(classes.items()):
+            subject = subjects[subject_id]
+            # Readings already recorded are not written again, and never make
+            # a student recorded as present (in an earlier chunk) absent
+            report['saved'] += save_attendance(
+                subject, date, presence, subject.faculty, skip_unchanged=True, keep_present=True
+            )
+        report['classes'] += len(classes)
+        report['rows'] += len(chunk)
+        _time(report, started)
+        if progress:
+            progress(report)
+
+    # Whoever in a class's sections has no record by now had no reading
+    for (subject_id, date), class_sections in sorted(sections.items()):
+        subject = subjects[subject_id]
+        absent = {student_id: False for section in sorted(class_sections) for student_id in lookups.roster[section]}
+        report['saved'] += save_attendance(
+            subject, date, absent, subject.faculty, skip_unchanged=True, keep_present=True
+        )
+    return _time(report, started)
+
+
+def _time(report, started):
+    report['seconds'] = time.perf_counter() - started
+    report['rows_per_second'] = report['rows'] / report['seconds'] if report['seconds'] else 0
+    return report
@@ -0,0 +1,150 @@
+"""
+Database-backed queue for running timetable generation out of band.
+
+The web process only enqueues GenerationJob rows; `manage.py
+run_generation_worker` claims them, runs the generator and records
+progress on the row so the generate page can poll it.
+"""
+import logging
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+from .generator import generate_timetable
+from .models import GenerationJob
+from .solver import SolverError
+
+logger = logging.getLogger(__name__)
+
+# Minimum number of seconds between two progress writes for one job
+PROGRESS_INTERVAL = 0.5
+# Running jobs older than this many seconds are taken to have lost their worker
+STALE_AFTER = 600
+
+
+def max_concurrent_jobs():
+    return getattr(settings, 'TIMETABLE_MAX_CONCURRENT_JOBS', 2)
+
+
+def enqueue_generation(user, new_variant=False, optimize_seconds=None):
+    """
+    Queue a generation for the user and return its job.
+
+    A user has at most one queued job: a request made while one is queued
+    replaces its options with the new ones. A running job that was asked
+    for the same options is returned as it is; otherwise the request is
+    queued behind it, so a "new variant" click is never answered with the
+    result of an earlier request.
+    """
+    with transaction.atomic():
+        # Locking the user's row makes concurrent requests queue one job
+        User.objects.select_for_update().filter(id=user.id).exists()
+        jobs = {
+            job.status: job for job in GenerationJob.objects.filter(
+                user=user,
+                status__in=[GenerationJob.QUEUED, GenerationJob.RUNNING]
+            )
+        }
+        queued = jobs.get(GenerationJob.QUEUED)
+        running = jobs.get(GenerationJob.RUNNING)
+        if queued is not None:
+            queued.new_variant = new_variant
+            queued.optimize_seconds = optimize_seconds
+            queued.save(update_fields=['new_variant', 'optimize_seconds'])
+            return queued
+        if running is not None and (running.new_variant, running.optimize_seconds) == (new_variant, optimize_seconds):
+            return running
+        return GenerationJob.objects.create(
+            user=user,
+            new_variant=new_variant,
+            optimize_seconds=optimize_seconds
+        )
+
+
+def claim_next_job(stale_after=STALE_AFTER):
+    """
+    Mark the oldest queued job as running and return it, or None.
+
+    Running jobs older than stale_after seconds are failed first (their
+    worker died), so they neither block their user nor count against
+    TIMETABLE_MAX_CONCURRENT_JOBS. Nothing is claimed while that many jobs
+    are running, and no job is claimed for a user whose previous job is
+    still running. Every queued and running job is locked while the
+    running ones are counted, so two workers cannot both pass the cap, nor
+    claim the same job.
+    """
+    with transaction.atomic():
+        fail_stale_jobs(stale_after)
+        jobs = list(GenerationJob.objects.select_for_update().filter(
+            status__in=[GenerationJob.QUEUED, GenerationJob.RUNNING]
+        ).order_by('created_at', 'id').values_list('id', 'user_id', 'status'))
+        busy = {user_id for _, user_id, status in jobs if status == GenerationJob.RUNNING}
+        running = sum(1 for _, _, status in jobs if status == GenerationJob.RUNNING)
+        # One job per user at a time: two would overwrite each other's timetable
+        queued = [job_id for job_id, user_id, status in jobs if status == GenerationJob.QUEUED and user_id not in busy]
+        if not queued or running >= max_concurrent_jobs():
+            return None
+        GenerationJob.objects.filter(id=queued[0]).update(
+            status=GenerationJob.RUNNING,
+            started_at=timezone.now()
+        )
+    return GenerationJob.objects.select_related('user').get(id=queued[0])
+
+
+def run_job(job):
+    last_write = [0.0]
+
+    def progress(done, total):
+        now = time.monotonic()
+        if now - last_write[0] >= PROGRESS_INTERVAL:
+            last_write[0] = now
+            GenerationJob.objects.filter(id=job.id).update(progress=done, total=total)
+
+    try:
+        generate_timetable(
+            job.user,
+            progress=progress,
+            new_variant=job.new_variant,
+            optimize_seconds=job.optimize_seconds
+        )
+    except SolverError as e:
+        _finish(job, GenerationJob.FAILED, str(e))
+    except Exception as e:
+        logger.exception('Timetable generation job %s crashed', job.id)
+        _finish(job, GenerationJob.FAILED, f'Generation failed: {str(e)}')
+    else:
+        _finish(job, GenerationJob.SUCCEEDED, 'Timetable generated successfully.')
+
+
+def _finish(job, status, message):
+    job.status = status
+    job.message = message
+    job.finished_at = timezone.now()
+    job.save(update_fields=['status', 'message', 'finished_at'])
+
+
+def fail_stale_jobs(max_age_seconds):
+    """Fail running jobs whose worker died before finishing them."""
+    cutoff = timezone.now() - timedelta(seconds=max_age_seconds)
+    return GenerationJob.objects.filter(status=GenerationJob.RUNNING, started_at__lt=cutoff).update(
+        status=GenerationJob.FAILED,
+        message='Generation was interrupted. Please try again.',
+        finished_at=timezone.now()
+    )
+
+
+def run_worker(poll_interval=1.0, once=False, stale_after=STALE_AFTER):
+    """Process queued jobs until interrupted (or until the queue is empty when once=True)."""
+    while True:
+        close_old_connections()
+        job = claim_next_job(stale_after)
+        if job is not None:
+            run_job(job)
+            continue
+        if once:
+            return
+        time.sleep(poll_interval)
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand, CommandError
+from timetable.bench.attendance import METHODS, attendance_throughput
+
+class Command(BaseCommand):
+    help = 'Measures how fast one class of attendance is saved for growing class sizes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--students', default='50,500,5000',
+                            help='Comma-separated class sizes to time')
+        parser.add_argument('--methods', default='upsert,fallback',
+                            help=f'Comma-separated writers to compare ({", ".join(METHODS)}); '
+                                 f'per-row is the old update_or_create loop')
+
+    def handle(self, *args, **options):
+        counts = [int(count) for count in options['students'].split(',') if count.strip()]
+        methods = [method.strip() for method in options['methods'].split(',') if method.strip()]
+        unknown = [method for method in methods if method not in METHODS]
+        if unknown:
+            raise CommandError(f'Unknown method(s): {", ".join(unknown)}')
+
+        self.stdout.write(f"{'students':>8}  {'method':<9}  {'phase':<6}  {'seconds':>8}  {'rows/s':>9}  queries")
+        for row in attendance_throughput(counts, methods):
+            self.stdout.write(
+                f"{row['students']:>8}  {row['method']:<9}  {row['phase']:<6}  {row['seconds']:>8.3f}  "
+                f"{row['rows_per_second']:>9.0f}  {row['queries']}"
+            )
@@ -0,0 +1,56 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from timetable.bench.runner import run_benchmark
+from timetable.solver import ENGINES
+
+class Command(BaseCommand):
+    help = 'Runs synthetic timetable instances through the generator and prints a JSON report'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sections', type=int, default=2)
+        parser.add_argument('--subjects', type=int, default=7, help='Subjects per section')
+        parser.add_argument('--lab-ratio', type=float, default=0.15, help='Share of subjects that are labs')
+        parser.add_argument('--faculty', type=int, default=None,
+                            help='Faculty members shared by all sections (default: one per three subjects)')
+        parser.add_argument('--availability', type=float, default=0.7,
+                            help='Share of the week each faculty member is available for')
+        parser.add_argument('--instances', type=int, default=5, help='Random instances per engine')
+        parser.add_argument('--engines', default='solver,heuristic',
+                            help=f'Comma-separated engines to compare ({", ".join(sorted(ENGINES))})')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--workers', type=int, default=1, help='Processes for the generator run')
+        parser.add_argument('--optimize', type=float, default=0,
+                            help='Seconds of quality optimisation in the generator run')
+        parser.add_argument('--no-db', action='store_true',
+                            help='Only time the engines, skip the database-backed generator run')
+        parser.add_argument('--output', help='Write the report to this file instead of stdout')
+
+    def handle(self, *args, **options):
+        engines = [engine.strip() for engine in options['engines'].split(',') if engine.strip()]
+        unknown = [engine for engine in engines if engine not in ENGINES]
+        if unknown:
+            raise CommandError(f'Unknown engine(s): {", ".join(unknown)}')
+        if options['instances'] < 1 or options['sections'] < 1:
+            raise CommandError('--instances and --sections must be at least 1')
+
+        report = run_benchmark(
+            sections=options['sections'],
+            subjects=options['subjects'],
+            lab_ratio=options['lab_ratio'],
+            faculty=options['faculty'],
+            availability=options['availability'],
+            instances=options['instances'],
+            engines=engines,
+            seed=options['seed'],
+            workers=options['workers'],
+            optimize_seconds=options['optimize'],
+            database=not options['no_db']
+        )
+        output = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                f.write(output + '\n')
+            self.stdout.write(self.style.SUCCESS(f"Report written to {options['output']}"))
+        else:
+            self.stdout.write(output)
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+from timetable.bench import section_scaling
+from timetable.solver import ENGINES
+
+class Command(BaseCommand):
+    help = 'Measures how generation time grows with the number of sections'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sections', default='1,5,10,20,30,40,50',
+                            help='Comma-separated section counts to time')
+        parser.add_argument('--engine', choices=sorted(ENGINES), default='solver')
+        parser.add_argument('--repeats', type=int, default=3,
+                            help='Random instances per section count (the median is reported)')
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        counts = [int(count) for count in options['sections'].split(',') if count.strip()]
+        self.stdout.write(f"{'sections':>8}  {'median s':>9}  {'ms/section':>10}  failures")
+        for row in section_scaling(counts, options['engine'], options['repeats'], options['seed']):
+            self.stdout.write(
+                f"{row['sections']:>8}  {row['median_seconds']:>9.3f}  "
+                f"{row['seconds_per_section'] * 1000:>10.2f}  {row['failures']}"
+            )
@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand, CommandError
+from timetable.query_plans import VIEW_QUERIES, check_query_plans
+
+class Command(BaseCommand):
+    help = "Explains the main query of each view and fails if any reads a whole table or misses its index"
+
+    def add_arguments(self, parser):
+        parser.add_argument('queries', nargs='*', help=f'Queries to check (default all: {", ".join(VIEW_QUERIES)})')
+        parser.add_argument('--show-plans', action='store_true', help='Print every plan, not only the failing ones')
+
+    def handle(self, *args, **options):
+        unknown = [name for name in options['queries'] if name not in VIEW_QUERIES]
+        if unknown:
+            raise CommandError(f'Unknown query(s): {", ".join(unknown)}')
+
+        try:
+            results = list(check_query_plans(options['queries']))
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        failed = []
+        for name, plan, problems in results:
+            if problems:
+                failed.append(name)
+                self.stdout.write(self.style.ERROR(f'{name}: {"; ".join(problems)}'))
+            else:
+                self.stdout.write(f'{name}: ok')
+            if problems or options['show_plans']:
+                self.stdout.write(''.join(f'    {line}\n' for line in plan.splitlines()))
+        if failed:
+            raise CommandError(f'{len(failed)} of {len(results)} queries are not planned as intended')
+        self.stdout.write(self.style.SUCCESS(f'All {len(results)} queries use their indexes'))
@@ -1,29 +1,26 @@
+from django.contrib.auth.models import User
 from django.core.management.base import BaseCommand
-from timetable.models import TimeSlot
+from timetable.models import Faculty, TimeSlot, Timetable
+from timetable.persistence import snapshot_after_delete
+from timetable.week import WEEK
 
 class Command(BaseCommand):
     help = 'Creates the default time slots for the timetable'
 
     def handle(self, *args, **kwargs):
-        # Delete existing time slots
-        TimeSlot.objects.all().delete()
+        # Delete existing time slots, and with them every saved lesson
+        users = list(User.objects.filter(id__in=Timetable.objects.values('user_id')))
+        deleted = TimeSlot.objects.all().delete()
+        # The availability rows went with the slots, so nobody is free any more
+        Faculty.objects.update(availability_mask=0)
         
         # Create new time slots
-        slots = [
-            (1, '9:00 - 9:50'),
-            (2, '9:50 - 10:40'),
-            (3, '10:40 - 11:30'),
-            (4, '11:30 - 12:20'),
-            (5, '12:20 - 1:10'),
-            (6, '1:10 - 2:00'),
-            (7, '2:00 - 2:50'),
-            (8, '2:50 - 3:40'),
-            (9, '3:40 - 4:30'),
-            (10, '4:30 - 5:20'),
-        ]
-        
-        for slot_number, _ in slots:
+        for slot_number in WEEK.slot_numbers:
             TimeSlot.objects.create(slot_number=slot_number)
             self.stdout.write(self.style.SUCCESS(f'Created time slot {slot_number}'))
         
-        self.stdout.write(self.style.SUCCESS('Successfully created all time slots')) 
\ No newline at end of file
+        # The timetable views must not keep showing the deleted lessons
+        for user in users:
+            snapshot_after_delete(user, deleted)
+        
+        self.stdout.write(self.style.SUCCESS('Successfully created all time slots'))
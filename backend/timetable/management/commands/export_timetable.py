@@ -0,0 +1,52 @@
+import sys
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+from timetable.export import FORMATS, SCOPES, export_timetable
+
+class Command(BaseCommand):
+    help = "Streams a user's timetables to an iCalendar, CSV or PDF file"
+
+    def add_arguments(self, parser):
+        parser.add_argument('username')
+        parser.add_argument('--format', choices=sorted(FORMATS), default='csv')
+        parser.add_argument('--scope', choices=SCOPES, default='section',
+                            help='One timetable per section, or one schedule per faculty member')
+        parser.add_argument('--section', help='Only export this section')
+        parser.add_argument('--faculty', type=int, help='Only export the faculty member with this id')
+        parser.add_argument('--start', help='First day of the term (YYYY-MM-DD, iCalendar only)')
+        parser.add_argument('--end', help='Last day of the term (YYYY-MM-DD, iCalendar only)')
+        parser.add_argument('--output', help='File to write (default: the export file name; - for stdout)')
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options['username'])
+        except User.DoesNotExist:
+            raise CommandError(f"No user named {options['username']}")
+
+        term = []
+        for name in ('start', 'end'):
+            value = options[name]
+            try:
+                date = parse_date(value) if value else None
+            except ValueError:
+                date = None
+            if value and date is None:
+                raise CommandError(f'--{name} must be a date as YYYY-MM-DD')
+            term.append(date)
+
+        key = options['faculty'] if options['scope'] == 'faculty' else options['section']
+        _, filename, chunks = export_timetable(user, options['format'], options['scope'], key, *term)
+        output = options['output'] or filename
+        if output == '-':
+            for chunk in chunks:
+                sys.stdout.buffer.write(chunk)
+            return
+
+        size = 0
+        with open(output, 'wb') as f:
+            for chunk in chunks:
+                f.write(chunk)
+                size += len(chunk)
+        self.stdout.write(self.style.SUCCESS(f'Wrote {size} bytes to {output}'))
@@ -0,0 +1,35 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from timetable.roster import IMPORT_BATCH_SIZE, RosterError, import_students, read_roster
+
+class Command(BaseCommand):
+    help = "Adds the students listed in a CSV or .xlsx file to a user's roster"
+
+    def add_arguments(self, parser):
+        parser.add_argument('username')
+        parser.add_argument('path', help='CSV or .xlsx file with name, roll_number and (optionally) section columns')
+        parser.add_argument('--section', help='Section for rows that do not name one')
+        parser.add_argument('--batch-size', type=int, default=IMPORT_BATCH_SIZE,
+                            help='Rows validated and inserted together')
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options['username'])
+        except User.DoesNotExist:
+            raise CommandError(f"No user named {options['username']}")
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be at least 1')
+
+        try:
+            with open(options['path'], 'rb') as file:
+                created, errors = import_students(
+                    user, read_roster(file, options['path']), options['section'], options['batch_size']
+                )
+        except OSError as e:
+            raise CommandError(f'Could not read {options["path"]}: {e.strerror}')
+        except RosterError as e:
+            raise CommandError(str(e))
+
+        for line, roll_number, error in errors:
+            self.stderr.write(f'line {line} ({roll_number or "no roll number"}): {error}')
+        self.stdout.write(self.style.SUCCESS(f'Imported {created} students, skipped {len(errors)} rows'))
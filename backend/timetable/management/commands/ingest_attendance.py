@@ -0,0 +1,44 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from timetable.ingest import CHUNK_SIZE, IngestError, ingest_attendance, open_dump, read_dump
+
+class Command(BaseCommand):
+    help = "Saves the attendance readings in a device export (CSV, optionally gzipped) for a user's students"
+
+    def add_arguments(self, parser):
+        parser.add_argument('username')
+        parser.add_argument('path', help='CSV with roll_number, subject, date (or timestamp) and optional present columns')
+        parser.add_argument('--subject', help='Subject id or name for dumps without a subject column')
+        parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE, help='Rows read and saved together')
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options['username'])
+        except User.DoesNotExist:
+            raise CommandError(f"No user named {options['username']}")
+        if options['chunk_size'] < 1:
+            raise CommandError('--chunk-size must be at least 1')
+
+        def progress(report):
+            if options['verbosity'] >= 2:
+                self.stdout.write(f"{report['rows']} rows, {report['rows_per_second']:.0f} rows/s")
+
+        try:
+            with open_dump(options['path']) as file:
+                report = ingest_attendance(
+                    user, read_dump(file, options['subject']), options['chunk_size'], progress
+                )
+        except OSError as e:
+            raise CommandError(f'Could not read {options["path"]}: {e}')
+        except IngestError as e:
+            raise CommandError(str(e))
+
+        for line, error in report['errors']:
+            self.stderr.write(f'line {line}: {error}')
+        if report['skipped'] > len(report['errors']):
+            self.stderr.write(f"... and {report['skipped'] - len(report['errors'])} more skipped rows")
+        self.stdout.write(self.style.SUCCESS(
+            f"Read {report['rows']} rows in {report['seconds']:.2f}s ({report['rows_per_second']:.0f} rows/s): "
+            f"saved {report['saved']} new or changed attendance records in {report['classes']} classes, "
+            f"skipped {report['skipped']}"
+        ))
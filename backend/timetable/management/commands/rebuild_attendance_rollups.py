@@ -0,0 +1,38 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from timetable.attendance import rebuild_rollups, rollup_differences
+from timetable.models import Attendance, AttendanceRollup
+
+class Command(BaseCommand):
+    help = 'Recomputes the weekly attendance rollups from the attendance records, or checks them'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', help="Only this user's students")
+        parser.add_argument('--verify', action='store_true',
+                            help='Only report rollups that differ from the records; exits with an error if any do')
+
+    def handle(self, *args, **options):
+        attendance = Attendance.objects.all()
+        rollups = AttendanceRollup.objects.all()
+        if options['user']:
+            try:
+                user = User.objects.get(username=options['user'])
+            except User.DoesNotExist:
+                raise CommandError(f"No user named {options['user']}")
+            attendance = attendance.filter(student__user=user)
+            rollups = rollups.filter(student__user=user)
+
+        if options['verify']:
+            differences = rollup_differences(attendance, rollups)
+            for (student_id, subject_id, period), stored, expected in differences:
+                self.stdout.write(
+                    f'student {student_id} subject {subject_id} week of {period}: '
+                    f'stored {stored or (0, 0)}, expected {expected or (0, 0)} (total, present)'
+                )
+            if differences:
+                raise CommandError(f'{len(differences)} rollup(s) differ from the attendance records')
+            self.stdout.write(self.style.SUCCESS('All attendance rollups match the records'))
+            return
+
+        written = rebuild_rollups(attendance, rollups)
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {written} attendance rollups'))
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+from timetable.models import LectureContent
+from timetable.search import rebuild_search_index
+
+class Command(BaseCommand):
+    help = 'Recreates the lecture content full-text search index from the table'
+
+    def handle(self, *args, **options):
+        if not rebuild_search_index():
+            self.stdout.write(self.style.WARNING(
+                'This database has no full-text search index; lecture search reads the whole table'
+            ))
+            return
+        self.stdout.write(self.style.SUCCESS(
+            f'Rebuilt the search index for {LectureContent.objects.count()} lecture content entries'
+        ))
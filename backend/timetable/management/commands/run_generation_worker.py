@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+from timetable.jobs import STALE_AFTER, run_worker
+
+class Command(BaseCommand):
+    help = 'Runs queued timetable generation jobs'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--poll-interval', type=float, default=1.0,
+                            help='Seconds to wait between checks of an empty queue')
+        parser.add_argument('--once', action='store_true',
+                            help='Exit as soon as the queue is empty')
+        parser.add_argument('--stale-after', type=int, default=STALE_AFTER,
+                            help='Fail running jobs older than this many seconds (their worker died)')
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.SUCCESS('Generation worker started'))
+        try:
+            run_worker(
+                poll_interval=options['poll_interval'],
+                once=options['once'],
+                stale_after=options['stale_after']
+            )
+        except KeyboardInterrupt:
+            pass
+        self.stdout.write(self.style.SUCCESS('Generation worker stopped'))
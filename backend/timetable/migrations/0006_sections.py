@@ -0,0 +1,66 @@
+# Generated by Django 5.1.15 on 2026-10-18 06:49
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def create_default_sections(apps, schema_editor):
+    # Every existing account keeps the two sections that used to be hardcoded,
+    # plus any other section name already stored on its rows
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split('.'))
+    Section = apps.get_model('timetable', 'Section')
+    Timetable = apps.get_model('timetable', 'Timetable')
+    Student = apps.get_model('timetable', 'Student')
+    LectureContent = apps.get_model('timetable', 'LectureContent')
+    for user in User.objects.all():
+        names = {'A', 'B'}
+        names.update(Timetable.objects.filter(user=user).values_list('section', flat=True))
+        names.update(Student.objects.filter(user=user).values_list('section', flat=True))
+        names.update(LectureContent.objects.filter(subject__user=user).values_list('section', flat=True))
+        Section.objects.bulk_create([Section(user=user, name=name) for name in sorted(names)])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('timetable', '0005_generationjob_new_variant_cachedsolution'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='lecturecontent',
+            name='section',
+            field=models.CharField(max_length=10),
+        ),
+        migrations.AlterField(
+            model_name='student',
+            name='section',
+            field=models.CharField(max_length=10),
+        ),
+        migrations.AlterField(
+            model_name='timetable',
+            name='section',
+            field=models.CharField(max_length=10),
+        ),
+        migrations.CreateModel(
+            name='Section',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=10)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['name'],
+                'unique_together': {('user', 'name')},
+            },
+        ),
+        migrations.AddField(
+            model_name='subject',
+            name='sections',
+            field=models.ManyToManyField(blank=True, to='timetable.section'),
+        ),
+        migrations.RunPython(create_default_sections, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.15 on 2026-10-18 06:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('timetable', '0006_sections'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='generationjob',
+            name='optimize_seconds',
+            field=models.FloatField(blank=True, null=True),
+        ),
+    ]
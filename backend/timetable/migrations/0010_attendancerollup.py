@@ -0,0 +1,47 @@
+# Generated by Django 5.1.15 on 2026-10-18 07:10
+
+import datetime
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def backfill_rollups(apps, schema_editor):
+    # Roll up the attendance recorded so far, one week at a time
+    Attendance = apps.get_model('timetable', 'Attendance')
+    AttendanceRollup = apps.get_model('timetable', 'AttendanceRollup')
+    counts = {}
+    rows = Attendance.objects.values_list('student_id', 'subject_id', 'date', 'is_present').iterator(chunk_size=5000)
+    for student_id, subject_id, date, is_present in rows:
+        key = (student_id, subject_id, date - datetime.timedelta(days=date.weekday()))
+        total, present = counts.get(key, (0, 0))
+        counts[key] = (total + 1, present + is_present)
+    AttendanceRollup.objects.bulk_create([
+        AttendanceRollup(student_id=student_id, subject_id=subject_id, period=period, total=total, present=present)
+        for (student_id, subject_id, period), (total, present) in counts.items()
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('timetable', '0009_timetable_faculty_week'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AttendanceRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period', models.DateField()),
+                ('total', models.PositiveIntegerField(default=0)),
+                ('present', models.PositiveIntegerField(default=0)),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='attendance_rollups', to='timetable.student')),
+                ('subject', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='timetable.subject')),
+            ],
+            options={
+                'unique_together': {('student', 'subject', 'period')},
+            },
+        ),
+        migrations.RunPython(backfill_rollups, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,66 @@
+# Generated by Django 5.1.15 on 2026-10-18 07:16
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('timetable', '0010_attendancerollup'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        # The composite indexes first: they take over from the foreign key indexes
+        migrations.AddIndex(
+            model_name='attendance',
+            index=models.Index(fields=['subject', 'date'], name='attendance_subject_date'),
+        ),
+        migrations.AddIndex(
+            model_name='attendance',
+            index=models.Index(fields=['student', 'is_present'], name='attendance_student_present'),
+        ),
+        migrations.AddIndex(
+            model_name='availability',
+            index=models.Index(fields=['faculty', 'is_available', 'day'], name='availability_free_slots'),
+        ),
+        migrations.AddIndex(
+            model_name='lecturecontent',
+            index=models.Index(fields=['subject', 'section', '-date'], name='lecture_section_recent'),
+        ),
+        migrations.AddIndex(
+            model_name='student',
+            index=models.Index(fields=['user', 'section', 'roll_number'], name='student_section_roll'),
+        ),
+        migrations.AddIndex(
+            model_name='timetable',
+            index=models.Index(fields=['user', 'section', 'day'], name='timetable_section_week'),
+        ),
+        migrations.AlterField(
+            model_name='attendance',
+            name='student',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to='timetable.student'),
+        ),
+        migrations.AlterField(
+            model_name='availability',
+            name='faculty',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to='timetable.faculty'),
+        ),
+        migrations.AlterField(
+            model_name='lecturecontent',
+            name='subject',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to='timetable.subject'),
+        ),
+        migrations.AlterField(
+            model_name='student',
+            name='user',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AlterField(
+            model_name='timetable',
+            name='user',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL),
+        ),
+    ]
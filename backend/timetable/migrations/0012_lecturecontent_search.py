@@ -0,0 +1,73 @@
+from django.db import migrations
+
+# The index as it was at the time of this migration; later changes to
+# timetable/search.py do not alter what this migration does
+SQLITE_INSTALL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS timetable_lecturecontent_fts USING fts5("
+    "topic_covered, resources, remarks, content='timetable_lecturecontent', content_rowid='id', "
+    "tokenize='porter unicode61')",
+    "CREATE TRIGGER IF NOT EXISTS timetable_lecturecontent_fts_insert AFTER INSERT ON timetable_lecturecontent BEGIN "
+    "INSERT INTO timetable_lecturecontent_fts(rowid, topic_covered, resources, remarks) "
+    "VALUES (new.id, new.topic_covered, new.resources, new.remarks); END",
+    "CREATE TRIGGER IF NOT EXISTS timetable_lecturecontent_fts_delete AFTER DELETE ON timetable_lecturecontent BEGIN "
+    "INSERT INTO timetable_lecturecontent_fts(timetable_lecturecontent_fts, rowid, topic_covered, resources, remarks) "
+    "VALUES ('delete', old.id, old.topic_covered, old.resources, old.remarks); END",
+    "CREATE TRIGGER IF NOT EXISTS timetable_lecturecontent_fts_update AFTER UPDATE ON timetable_lecturecontent BEGIN "
+    "INSERT INTO timetable_lecturecontent_fts(timetable_lecturecontent_fts, rowid, topic_covered, resources, remarks) "
+    "VALUES ('delete', old.id, old.topic_covered, old.resources, old.remarks); "
+    "INSERT INTO timetable_lecturecontent_fts(rowid, topic_covered, resources, remarks) "
+    "VALUES (new.id, new.topic_covered, new.resources, new.remarks); END",
+    "INSERT INTO timetable_lecturecontent_fts(timetable_lecturecontent_fts) VALUES ('rebuild')",
+]
+SQLITE_REMOVE = [
+    'DROP TRIGGER IF EXISTS timetable_lecturecontent_fts_insert',
+    'DROP TRIGGER IF EXISTS timetable_lecturecontent_fts_delete',
+    'DROP TRIGGER IF EXISTS timetable_lecturecontent_fts_update',
+    'DROP TABLE IF EXISTS timetable_lecturecontent_fts',
+]
+POSTGRESQL_INSTALL = [
+    "CREATE INDEX IF NOT EXISTS lecture_content_search ON timetable_lecturecontent USING GIN (("
+    "setweight(to_tsvector('english', coalesce(topic_covered, '')), 'A') || "
+    "setweight(to_tsvector('english', coalesce(resources, '')), 'B') || "
+    "setweight(to_tsvector('english', coalesce(remarks, '')), 'C')))",
+]
+POSTGRESQL_REMOVE = ['DROP INDEX IF EXISTS lecture_content_search']
+
+
+def _execute(schema_editor, statements):
+    with schema_editor.connection.cursor() as cursor:
+        for statement in statements:
+            cursor.execute(statement)
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        with schema_editor.connection.cursor() as cursor:
+            cursor.execute("SELECT sqlite_compileoption_used('ENABLE_FTS5')")
+            if not cursor.fetchone()[0]:
+                return
+        _execute(schema_editor, SQLITE_INSTALL)
+    elif vendor == 'postgresql':
+        _execute(schema_editor, POSTGRESQL_INSTALL)
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        _execute(schema_editor, SQLITE_REMOVE)
+    elif vendor == 'postgresql':
+        _execute(schema_editor, POSTGRESQL_REMOVE)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('timetable', '0011_composite_indexes'),
+    ]
+
+    operations = [
+        # An FTS5 table on SQLite, a GIN index on PostgreSQL, nothing elsewhere
+        # (see timetable/search.py)
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,34 @@
+from django.db import migrations, models
+
+# The layout of timetable/availability.py at the time of this migration
+DAYS = ['MON', 'TUE', 'WED', 'THU', 'FRI']
+SLOTS = list(range(1, 11))
+
+
+def backfill_masks(apps, schema_editor):
+    Availability = apps.get_model('timetable', 'Availability')
+    Faculty = apps.get_model('timetable', 'Faculty')
+    masks = {}
+    rows = Availability.objects.filter(is_available=True).values_list('faculty_id', 'day', 'time_slot__slot_number')
+    for faculty_id, day, slot_number in rows.iterator(chunk_size=5000):
+        if day in DAYS and slot_number in SLOTS:
+            bit = 1 << (DAYS.index(day) * len(SLOTS) + SLOTS.index(slot_number))
+            masks[faculty_id] = masks.get(faculty_id, 0) | bit
+    for faculty_id, mask in masks.items():
+        Faculty.objects.filter(id=faculty_id).update(availability_mask=mask)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('timetable', '0012_lecturecontent_search'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='faculty',
+            name='availability_mask',
+            field=models.BigIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_masks, migrations.RunPython.noop),
+    ]
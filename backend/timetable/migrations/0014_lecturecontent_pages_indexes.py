@@ -0,0 +1,25 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('timetable', '0013_faculty_availability_mask'),
+    ]
+
+    # The new subject index goes in before the old one is dropped: MySQL
+    # needs an index leading with subject_id for the foreign key throughout
+    operations = [
+        migrations.AddIndex(
+            model_name='lecturecontent',
+            index=models.Index(fields=['subject', 'section', '-date', '-id'], name='lecture_subject_pages'),
+        ),
+        migrations.AddIndex(
+            model_name='lecturecontent',
+            index=models.Index(fields=['section', '-date', '-id'], name='lecture_section_pages'),
+        ),
+        migrations.RemoveIndex(
+            model_name='lecturecontent',
+            name='lecture_section_recent',
+        ),
+    ]
@@ -0,0 +1,24 @@
+from django.db import migrations
+
+
+def create_lecture_content_sections(apps, schema_editor):
+    # 0006 created sections from the timetable and student rows only; sections
+    # named only by lecture content are added now
+    Section = apps.get_model('timetable', 'Section')
+    LectureContent = apps.get_model('timetable', 'LectureContent')
+    used = set(LectureContent.objects.filter(subject__user__isnull=False).values_list('subject__user_id', 'section'))
+    existing = set(Section.objects.values_list('user_id', 'name'))
+    Section.objects.bulk_create([
+        Section(user_id=user_id, name=name) for user_id, name in sorted(used - existing)
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('timetable', '0014_lecturecontent_pages_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_lecture_content_sections, migrations.RunPython.noop),
+    ]
@@ -7,6 +7,9 @@ class Faculty(models.Model):
     name = models.CharField(max_length=100)
     email = models.EmailField()
     department = models.CharField(max_length=100)
+    # The Availability rows with is_available as one bit per (day, slot):
+    # bit day_index * len(TimeSlot.SLOTS) + slot_index (see availability.py)
+    availability_mask = models.BigIntegerField(default=0, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
 
     def __str__(self):
@@ -37,6 +40,18 @@ class TimeSlot(models.Model):
     class Meta:
         ordering = ['slot_number']
 
+class Section(models.Model):
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    name = models.CharField(max_length=10)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['name']
+        unique_together = ('user', 'name')
+
+    def __str__(self):
+        return f"Section {self.name}"
+
 class Subject(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, null=True, default=None)
     name = models.CharField(max_length=100)
@@ -44,6 +59,7 @@ class Subject(models.Model):
     credits = models.IntegerField()
     is_lab = models.BooleanField(default=False)
     classes_per_week = models.IntegerField(default=4)
+    sections = models.ManyToManyField(Section, blank=True)  # empty means taught to every section
     created_at = models.DateTimeField(auto_now_add=True)
 
     def __str__(self):
@@ -58,7 +74,8 @@ class Availability(models.Model):
         ('FRI', 'Friday')
     ]
     
-    faculty = models.ForeignKey(Faculty, on_delete=models.CASCADE)
+    faculty = models.ForeignKey(Faculty, on_delete=models.CASCADE,
+                                db_index=False)  # Covered by unique_together and availability_free_slots
     day = models.CharField(max_length=3, choices=DAYS)
     time_slot = models.ForeignKey(TimeSlot, on_delete=models.CASCADE)
     is_available = models.BooleanField(default=False)
@@ -66,21 +83,33 @@ class Availability(models.Model):
 
     class Meta:
         unique_together = ('faculty', 'day', 'time_slot')
+        indexes = [
+            # The slots a faculty member is free in (API filters, refresh_availability_masks)
+            models.Index(fields=['faculty', 'is_available', 'day'], name='availability_free_slots'),
+        ]
 
     def __str__(self):
         return f"{self.faculty.name} - {self.get_day_display()} - {self.time_slot}"
 
 class Timetable(models.Model):
-    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    user = models.ForeignKey(User, on_delete=models.CASCADE,
+                             db_index=False)  # Covered by timetable_section_week
     subject = models.ForeignKey(Subject, on_delete=models.CASCADE, null=True, blank=True)
-    faculty = models.ForeignKey(Faculty, on_delete=models.CASCADE, null=True, blank=True)
+    faculty = models.ForeignKey(Faculty, on_delete=models.CASCADE, null=True, blank=True,
+                                db_index=False)  # Covered by timetable_faculty_week
     day = models.CharField(max_length=3, choices=Availability.DAYS)
     time_slot = models.ForeignKey(TimeSlot, on_delete=models.CASCADE)
-    section = models.CharField(max_length=1, choices=[('A', 'A'), ('B', 'B')])
+    section = models.CharField(max_length=10)  # Section.name
     is_lunch_break = models.BooleanField(default=False)
 
     class Meta:
         unique_together = ('day', 'time_slot', 'section', 'user')
+        indexes = [
+            # A faculty member's week (see grid.build_faculty_grid)
+            models.Index(fields=['faculty', 'day', 'time_slot'], name='timetable_faculty_week'),
+            # A section's week (see grid.build_grid) and the user's whole timetable
+            models.Index(fields=['user', 'section', 'day'], name='timetable_section_week'),
+        ]
 
     def __str__(self):
         if self.is_lunch_break:
@@ -88,18 +117,26 @@ class Timetable(models.Model):
         return f"{self.subject.name} - {self.section} - {self.get_day_display()} - {self.time_slot}"
 
 class Student(models.Model):
-    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    user = models.ForeignKey(User, on_delete=models.CASCADE,
+                             db_index=False)  # Covered by student_section_roll
     name = models.CharField(max_length=100)
     roll_number = models.CharField(max_length=20, unique=True)
-    section = models.CharField(max_length=1, choices=[('A', 'Section A'), ('B', 'Section B')])
+    section = models.CharField(max_length=10)  # Section.name
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # A section's students in roll number order (student list, attendance)
+            models.Index(fields=['user', 'section', 'roll_number'], name='student_section_roll'),
+        ]
+
     def __str__(self):
         return f"{self.name} ({self.roll_number}) - Section {self.section}"
 
 class Attendance(models.Model):
     subject = models.ForeignKey(Subject, on_delete=models.CASCADE)
-    student = models.ForeignKey(Student, on_delete=models.CASCADE)
+    student = models.ForeignKey(Student, on_delete=models.CASCADE,
+                                db_index=False)  # Covered by attendance_student_present
     date = models.DateField()
     is_present = models.BooleanField(default=False)
     marked_by = models.ForeignKey(Faculty, on_delete=models.CASCADE)
@@ -108,14 +145,35 @@ class Attendance(models.Model):
 
     class Meta:
         unique_together = ['subject', 'student', 'date']
+        indexes = [
+            # A subject's classes by date, and a student's record across subjects
+            models.Index(fields=['subject', 'date'], name='attendance_subject_date'),
+            models.Index(fields=['student', 'is_present'], name='attendance_student_present'),
+        ]
 
     def __str__(self):
         return f"{self.student.name} - {self.subject.name} - {self.date}"
 
-class LectureContent(models.Model):
+class AttendanceRollup(models.Model):
+    # Attendance counts of a student in a subject for one week, kept up to
+    # date by timetable.attendance.save_attendance
+    student = models.ForeignKey(Student, on_delete=models.CASCADE, related_name='attendance_rollups')
     subject = models.ForeignKey(Subject, on_delete=models.CASCADE)
+    period = models.DateField()  # Monday of the week
+    total = models.PositiveIntegerField(default=0)
+    present = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = ('student', 'subject', 'period')
+
+    def __str__(self):
+        return f"{self.student.name} - {self.subject.name} - week of {self.period}: {self.present}/{self.total}"
+
+class LectureContent(models.Model):
+    subject = models.ForeignKey(Subject, on_delete=models.CASCADE,
+                                db_index=False)  # Covered by lecture_subject_pages
     faculty = models.ForeignKey(Faculty, on_delete=models.CASCADE)
-    section = models.CharField(max_length=1, choices=[('A', 'Section A'), ('B', 'Section B')])
+    section = models.CharField(max_length=10)  # Section.name
     date = models.DateField()
     topic_covered = models.TextField()
     resources = models.TextField(blank=True, null=True)  # URLs or references
@@ -123,5 +181,74 @@ class LectureContent(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            # A subject's lectures in a section, newest first (lecture content list)
+            models.Index(fields=['subject', 'section', '-date', '-id'], name='lecture_subject_pages'),
+            # All of a section's lectures, in the order of the list's pages
+            models.Index(fields=['section', '-date', '-id'], name='lecture_section_pages'),
+        ]
+
+    def __str__(self):
+        return f"{self.subject.name} - Section {self.section} - {self.date}" 
+
+class CachedSolution(models.Model):
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    fingerprint = models.CharField(max_length=64)  # Problem.fingerprint() of the generator inputs
+    variant = models.IntegerField(default=0)
+    grid = models.JSONField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    last_used_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('user', 'fingerprint', 'variant')
+
+    def __str__(self):
+        return f"{self.user.username} - {self.fingerprint[:12]} - variant {self.variant}"
+
+class TimetableSnapshot(models.Model):
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    version = models.PositiveIntegerField()
+    grid = models.JSONField()  # section -> day -> subject id, 'LUNCH' or None per slot
+    subjects = models.JSONField()  # subject id -> [subject name, faculty name]
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ('user', 'version')
+        ordering = ['-version']
+
     def __str__(self):
-        return f"{self.subject.name} - Section {self.section} - {self.date}" 
\ No newline at end of file
+        return f"{self.user.username} - timetable version {self.version}"
+
+class GenerationJob(models.Model):
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    SUCCEEDED = 'succeeded'
+    FAILED = 'failed'
+    STATUSES = [
+        (QUEUED, 'Queued'),
+        (RUNNING, 'Running'),
+        (SUCCEEDED, 'Succeeded'),
+        (FAILED, 'Failed'),
+    ]
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    status = models.CharField(max_length=10, choices=STATUSES, default=QUEUED)
+    new_variant = models.BooleanField(default=False)
+    optimize_seconds = models.FloatField(null=True, blank=True)  # None uses TIMETABLE_OPTIMIZE_SECONDS
+    progress = models.IntegerField(default=0)  # attempts or search nodes used so far
+    total = models.IntegerField(default=0)
+    message = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['created_at']
+
+    def __str__(self):
+        return f"Generation job {self.id} - {self.user.username} - {self.get_status_display()}"
+
+    @property
+    def is_finished(self):
+        return self.status in (self.SUCCEEDED, self.FAILED)
@@ -0,0 +1,110 @@
+"""
+Keyset (seek) pagination.
+
+A page is asked for by the sort key of the last row of the previous page,
+sent back as an opaque cursor: the next page is "the first N rows after
+this key", which an index on the sort columns finds directly, so page
+100 costs the same as page 1 (OFFSET would read and throw away every
+earlier row). The ordering must end in a unique column, e.g.
+('-date', '-id'), so that rows with equal dates are neither skipped nor
+repeated.
+"""
+import base64
+import binascii
+import json
+
+from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def _fields(queryset, ordering):
+    opts = queryset.model._meta
+    return [
+        (opts.pk if name.lstrip('-') == 'pk' else opts.get_field(name.lstrip('-')), name.startswith('-'))
+        for name in ordering
+    ]
+
+
+def encode_cursor(values):
+    text = json.dumps(values, cls=DjangoJSONEncoder, separators=(',', ':'))
+    return base64.urlsafe_b64encode(text.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor, fields):
+    """The sort key in cursor, as values of fields; raises InvalidCursor."""
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode())
+        if not isinstance(values, list) or len(values) != len(fields):
+            raise InvalidCursor('Invalid cursor')
+        return [field.to_python(value) for (field, _), value in zip(fields, values)]
+    except (binascii.Error, UnicodeDecodeError, ValueError, ValidationError):
+        raise InvalidCursor('Invalid cursor')
+
+
+def page_size(value, default=DEFAULT_PAGE_SIZE, maximum=MAX_PAGE_SIZE):
+    """The page size asked for (e.g. in ?per_page=), between 1 and maximum."""
+    try:
+        return max(1, min(int(value), maximum))
+    except (TypeError, ValueError):
+        return default
+
+
+def after(queryset, ordering, cursor=None):
+    """queryset sorted by ordering, starting after the row cursor points at."""
+    queryset = queryset.order_by(*ordering)
+    if not cursor:
+        return queryset
+    fields = _fields(queryset, ordering)
+    values = decode_cursor(cursor, fields)
+    # (a, b) > (x, y) is a > x OR (a = x AND b > y), and so on for more keys
+    seek = Q()
+    equal = {}
+    for (field, descending), value in zip(fields, values):
+        seek |= Q(**equal, **{f'{field.attname}__{"lt" if descending else "gt"}': value})
+        equal[field.attname] = value
+    # The redundant a >= x lets the database start the index range at the cursor
+    (first, descending), value = fields[0], values[0]
+    return queryset.filter(seek, **{f'{first.attname}__{"lte" if descending else "gte"}': value})
+
+
+def next_page(rows, ordering, limit):
+    """
+    Split limit + 1 rows fetched from after() into (page, next cursor or None).
+
+    The extra row only tells whether another page follows.
+    """
+    rows = list(rows)
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    last = rows[-1]
+    return rows, encode_cursor([
+        last.pk if name.lstrip('-') == 'pk' else getattr(last, name.lstrip('-')) for name in ordering
+    ])
+
+
+def page_query(params, cursor):
+    """The query string of params (e.g. request.GET) for the page at cursor (None for the first)."""
+    params = params.copy()
+    params.pop('after', None)
+    if cursor:
+        params['after'] = cursor
+    return params.urlencode()
+
+
+def page_rows(queryset, ordering, cursor=None, limit=DEFAULT_PAGE_SIZE):
+    """The query for the limit + 1 rows next_page needs."""
+    return after(queryset, ordering, cursor)[:limit + 1]
+
+
+def keyset_page(queryset, ordering, cursor=None, limit=DEFAULT_PAGE_SIZE):
+    """Return (objects, next cursor or None) for the page of queryset after cursor."""
+    return next_page(page_rows(queryset, ordering, cursor, limit), ordering, limit)
@@ -0,0 +1,155 @@
+"""
+Reading and writing generated timetables.
+
+Grids (see Problem.empty_grid) are written in one transaction with bulk
+queries, so a user never sees a half-written timetable and the number of
+queries does not depend on the number of cells. Subjects are resolved
+from the problem, never from the database. Every write that changes the
+timetable also stores an immutable TimetableSnapshot of the new grid.
+"""
+from django.conf import settings
+from django.db import transaction
+
+from .grid import invalidate_timetable
+from .models import Timetable, TimetableSnapshot
+from .solver import LUNCH, build_problem
+from .week import slot_ids
+
+
+def load_grid(user, problem):
+    """Read the user's saved timetable back into a grid, or None if there is none."""
+    grid = problem.empty_grid()
+    found = False
+    rows = Timetable.objects.filter(user=user).values_list(
+        'section', 'day', 'time_slot__slot_number', 'subject_id', 'is_lunch_break'
+    )
+    for section, day, slot_number, subject_id, is_lunch_break in rows:
+        found = True
+        if section not in grid or day not in grid[section] or slot_number not in problem.slots:
+            continue
+        grid[section][day][problem.slots.index(slot_number)] = LUNCH if is_lunch_break else subject_id
+    return grid if found else None
+
+
+def save_grid(user, problem, grid, diff=False):
+    """
+    Replace the user's saved timetable with grid and return how many cells changed.
+
+    By default every row is deleted and the grid is inserted again (two
+    queries). With diff=True the saved rows are read first and only the
+    cells that differ are inserted, updated or deleted, which keeps row ids
+    stable and writes little when the grids are alike (at most four
+    queries). Slot ids come from week.slot_ids, which only queries after
+    the time slots change. Storing the snapshot adds three more when anything changed.
+    """
+    time_slots = slot_ids()
+    cells = {}
+    for section, days in grid.items():
+        for day, entries in days.items():
+            for slot_index, entry in enumerate(entries):
+                if entry is not None:
+                    cells[(section, day, problem.slots[slot_index])] = entry
+
+    with transaction.atomic():
+        if not diff:
+            Timetable.objects.filter(user=user).delete()
+            Timetable.objects.bulk_create([
+                _row(user, problem, key, time_slots, entry) for key, entry in cells.items()
+            ])
+            take_snapshot(user, problem, grid)
+            return len(cells)
+
+        saved = Timetable.objects.filter(user=user).values_list(
+            'id', 'section', 'day', 'time_slot__slot_number', 'subject_id', 'is_lunch_break'
+        )
+        stale = []
+        updates = []
+        for row_id, section, day, slot_number, subject_id, is_lunch_break in saved:
+            key = (section, day, slot_number)
+            entry = cells.pop(key, None)
+            if entry is None:
+                stale.append(row_id)
+            elif entry != (LUNCH if is_lunch_break else subject_id):
+                row = _row(user, problem, key, time_slots, entry)
+                row.id = row_id
+                updates.append(row)
+        # Whatever is left in cells has no saved row yet
+
+        if stale:
+            Timetable.objects.filter(id__in=stale).delete()
+        if updates:
+            Timetable.objects.bulk_update(updates, ['subject', 'faculty', 'is_lunch_break'])
+        if cells:
+            Timetable.objects.bulk_create([
+                _row(user, problem, key, time_slots, entry) for key, entry in cells.items()
+            ])
+        changed = len(stale) + len(updates) + len(cells)
+        if changed:
+            take_snapshot(user, problem, grid)
+    return changed
+
+
+def take_snapshot(user, problem, grid):
+    """
+    Store grid as the user's next timetable version and invalidate cached views.
+
+    Only the newest TIMETABLE_SNAPSHOT_HISTORY snapshots are kept.
+    """
+    latest = TimetableSnapshot.objects.filter(user=user).values_list('version', flat=True).first()
+    version = (latest or 0) + 1
+    used = {entry for days in grid.values() for entries in days.values() for entry in entries}
+    snapshot = TimetableSnapshot.objects.create(
+        user=user,
+        version=version,
+        grid=grid,
+        subjects={
+            subject.id: [subject.name, subject.faculty_name]
+            for subject in problem.subjects.values() if subject.id in used
+        }
+    )
+    history = getattr(settings, 'TIMETABLE_SNAPSHOT_HISTORY', 10)
+    TimetableSnapshot.objects.filter(user=user, version__lte=version - history).delete()
+    invalidate_timetable(user.id)
+    return snapshot
+
+
+def snapshot_saved_timetable(user):
+    """Snapshot the rows as they are now, after they were edited directly (e.g. in the admin)."""
+    problem = build_problem(user)
+    return take_snapshot(user, problem, load_grid(user, problem) or problem.empty_grid())
+
+
+def snapshot_after_delete(user, deleted):
+    """
+    Snapshot the user's rows if a delete removed any of them; returns the snapshot or None.
+
+    deleted is what Model.delete() or QuerySet.delete() returned. Cascades
+    (deleting a subject, a faculty member or a time slot) remove saved rows
+    without going through save_grid, which would leave the snapshot the
+    timetable views serve showing the deleted lessons.
+    """
+    _, counts = deleted
+    if not counts.get(Timetable._meta.label):
+        return None
+    return snapshot_saved_timetable(user)
+
+
+def _row(user, problem, key, time_slots, entry):
+    section, day, slot_number = key
+    if entry == LUNCH:
+        return Timetable(
+            user=user,
+            section=section,
+            day=day,
+            time_slot_id=time_slots[slot_number],
+            is_lunch_break=True
+        )
+    subject = problem.subjects[entry]
+    return Timetable(
+        user=user,
+        section=section,
+        day=day,
+        time_slot_id=time_slots[slot_number],
+        subject_id=subject.id,
+        faculty_id=subject.faculty_id
+    )
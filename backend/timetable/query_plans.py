@@ -0,0 +1,149 @@
+"""
+Query plan checks for the main query of each view.
+
+VIEW_QUERIES builds the query each page depends on with the functions
+the views build it with (and placeholder ids, which the planner does not
+need to be real), and `manage.py check_query_plans` asks the database
+how it would run them, failing if any would read a whole table or would
+not use the composite index it was written for. The test suite runs it
+too; run it against PostgreSQL after changing a view's filters or the
+indexes.
+"""
+import datetime
+import re
+
+from django.apps import apps
+from django.db import connection, transaction
+from django.db.models import Count, Q, Sum
+
+from .attendance import annotate_attendance, marked_attendance, per_student, report_days, report_rollups
+from .attendance_views import (
+    LECTURE_ORDER, STUDENT_ORDER, lecture_contents, section_students, students_by_id
+)
+from .availability import availability_rows
+from .export import timetable_rows
+from .grid import faculty_entries, section_entries
+from .models import Attendance, Subject
+from .pagination import DEFAULT_PAGE_SIZE as PAGE, encode_cursor, page_rows
+from .solver.problem import availability_masks
+
+# Placeholder values for the filters
+ID = 1
+SECTION = 'A'
+START = datetime.date(2026, 1, 5)
+END = datetime.date(2026, 2, 4)
+# The whole weeks of START..END
+WEEKS = [START + datetime.timedelta(weeks=week) for week in range(4)]
+SUBJECTS = [Subject(id=ID), Subject(id=ID + 1)]
+
+
+# name -> (query, the index it should use or None where any index will do)
+VIEW_QUERIES = {
+    # grid.build_grid
+    'view_timetable': (lambda: section_entries(ID, SECTION), 'timetable_section_week'),
+    # grid.build_faculty_grid
+    'faculty_timetable': (lambda: faculty_entries(ID), 'timetable_faculty_week'),
+    # export.timetable_groups
+    'export_timetable': (lambda: timetable_rows(ID, 'section', SECTION), 'timetable_section_week'),
+    # availability.save_availability
+    'faculty_availability': (lambda: availability_rows(ID), None),
+    # solver.build_problem
+    'generation_availability': (lambda: availability_masks(ID), None),
+    # A later page of the student list, then attendance.with_attendance for it
+    'student_list': (
+        lambda: page_rows(section_students(ID, SECTION), STUDENT_ORDER, encode_cursor(['R001', ID]), PAGE),
+        'student_section_roll'
+    ),
+    'student_list_attendance': (lambda: annotate_attendance(students_by_id([ID, ID + 1])), None),
+    'student_list_breakdown': (lambda: annotate_attendance(students_by_id([ID, ID + 1]), SUBJECTS), None),
+    'mark_attendance': (lambda: section_students(ID, SECTION).order_by('roll_number'), 'student_section_roll'),
+    # attendance.save_attendance
+    'previous_attendance': (lambda: marked_attendance(ID, START, [ID, ID + 1]), None),
+    # attendance.attendance_report
+    'attendance_report_rollups': (lambda: per_student(
+        report_rollups(ID, section_students(ID, SECTION).values('id'), WEEKS),
+        {'present': Sum('present'), 'total': Sum('total')}
+    ), None),
+    'attendance_report_days': (lambda: per_student(
+        report_days(ID, section_students(ID, SECTION).values('id'), START, END, WEEKS),
+        {'present': Count('id', filter=Q(is_present=True)), 'total': Count('id')}
+    ), None),
+    # Not from a view: the lookups the other Attendance indexes are for
+    'class_attendance': (
+        lambda: Attendance.objects.filter(subject_id=ID, date__range=(START, END)), 'attendance_subject_date'
+    ),
+    'student_absences': (
+        lambda: Attendance.objects.filter(student_id=ID, is_present=False), 'attendance_student_present'
+    ),
+    # Later pages of the lecture content list
+    'lecture_contents': (lambda: page_rows(
+        lecture_contents(ID, SECTION), LECTURE_ORDER, encode_cursor([END, ID]), PAGE
+    ), 'lecture_section_pages'),
+    'subject_lecture_contents': (lambda: page_rows(
+        lecture_contents(ID, SECTION, ID), LECTURE_ORDER, encode_cursor([END, ID]), PAGE
+    ), 'lecture_subject_pages'),
+}
+
+
+def explain(queryset):
+    """The database's plan for queryset, as text."""
+    if connection.vendor == 'postgresql':
+        # PostgreSQL scans small tables even when an index would do; with
+        # sequential scans priced out it only does so when it has no choice
+        with transaction.atomic():
+            with connection.cursor() as cursor:
+                cursor.execute('SET LOCAL enable_seqscan = off')
+            return queryset.explain()
+    return queryset.explain()
+
+
+def full_scans(plan, vendor=None):
+    """The tables that plan reads from start to end, directly or through a whole index."""
+    vendor = vendor or connection.vendor
+    if vendor == 'sqlite':
+        # SEARCH t USING ... seeks; SCAN t reads every row, even USING [COVERING]
+        # INDEX i (which walks the whole index instead of the table)
+        scanned = re.findall(r'\bSCAN (?:TABLE )?(\w+)', plan)
+    elif vendor == 'postgresql':
+        scanned = re.findall(r'Seq Scan on (\w+)', plan) + _unbounded_index_scans(plan)
+    else:
+        raise ValueError(f'Query plans cannot be checked on {vendor}')
+    # Leaves out subqueries and constant rows, which are not tables
+    tables = {model._meta.db_table for model in apps.get_models()}
+    return sorted({table for table in scanned if table in tables})
+
+
+def _unbounded_index_scans(plan):
+    """PostgreSQL index scans with no Index Cond, which walk the whole index."""
+    lines = plan.splitlines()
+    tables = []
+    for number, line in enumerate(lines):
+        match = re.search(r'Index (?:Only )?Scan (?:Backward )?using \w+ on (\w+)', line)
+        if not match:
+            continue
+        depth = len(line) - len(line.lstrip())
+        details = []
+        for detail in lines[number + 1:]:
+            if len(detail) - len(detail.lstrip()) <= depth or '->' in detail:
+                break
+            details.append(detail)
+        if not any('Index Cond' in detail for detail in details):
+            tables.append(match.group(1))
+    return tables
+
+
+def check_query_plans(names=None):
+    """
+    Yield (name, plan, problems) for each query in VIEW_QUERIES (or just names).
+
+    Problems lists the tables the plan reads in full and, if it does not
+    use the index the query was written for, that index.
+    """
+    for name in names or VIEW_QUERIES:
+        query, index = VIEW_QUERIES[name]
+        plan = explain(query())
+        problems = [f'full scan of {table}' for table in full_scans(plan)]
+        # Both SQLite and PostgreSQL name the index they use
+        if index and not re.search(rf'\b{index}\b', plan):
+            problems.append(f'does not use {index}')
+        yield name, plan, problems
@@ -0,0 +1,178 @@
+"""
+Importing student rosters from CSV or Excel files.
+
+Files are read row by row, never whole, and rows are validated and
+inserted in batches: each batch checks its roll numbers with a single
+`roll_number__in` query and is written with bulk_create, all inside one
+transaction. Memory therefore depends on the batch size, not the file.
+Reading .xlsx files needs the optional openpyxl package.
+"""
+import csv
+import io
+
+from django.db import transaction
+
+from .models import Student
+from .sections import section_names
+
+IMPORT_BATCH_SIZE = 500
+COLUMNS = ('name', 'roll_number', 'section')
+# Other headings accepted for the columns
+ALIASES = {
+    'student_name': 'name',
+    'roll': 'roll_number',
+    'roll_no': 'roll_number',
+}
+
+
+class RosterError(Exception):
+    """The file as a whole cannot be imported (wrong format, missing columns)."""
+
+
+def _column(heading):
+    key = '_'.join(str(heading or '').strip().lower().replace('.', ' ').split())
+    return ALIASES.get(key, key)
+
+
+def _cell(value):
+    if value is None:
+        return ''
+    # Spreadsheets store roll numbers like 1001 as 1001.0
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return str(value).strip()
+
+
+def _records(headings, rows):
+    """Turn (line, values) rows into (line, {column: text}) for the known columns."""
+    columns = [_column(heading) for heading in headings]
+    missing = [column for column in ('name', 'roll_number') if column not in columns]
+    if missing:
+        raise RosterError(f'The file has no {" or ".join(missing)} column (found: {", ".join(map(str, headings))})')
+    for line, values in rows:
+        if not any(_cell(value) for value in values):
+            continue
+        yield line, {
+            column: _cell(value) for column, value in zip(columns, values) if column in COLUMNS
+        }
+
+
+def _csv_rows(file):
+    text = io.TextIOWrapper(file, encoding='utf-8-sig', newline='')
+    reader = csv.reader(text)
+    try:
+        headings = next(reader, None)
+        if headings is None:
+            raise RosterError('The file is empty')
+        # reader.line_num is where the row ends, which differs from where it
+        # starts only for quoted values spanning lines
+        yield from _records(headings, ((reader.line_num, values) for values in reader))
+    except UnicodeDecodeError:
+        raise RosterError('The file is not UTF-8 text; save it as "CSV UTF-8"')
+    except csv.Error as e:
+        raise RosterError(f'Line {reader.line_num}: {e}')
+    finally:
+        text.detach()
+
+
+def _xlsx_rows(file):
+    try:
+        import openpyxl
+    except ImportError:
+        raise RosterError('Reading Excel files needs openpyxl (pip install openpyxl); upload a CSV file instead')
+    try:
+        workbook = openpyxl.load_workbook(file, read_only=True, data_only=True)
+    except Exception as e:
+        raise RosterError(f'Could not open the workbook: {e}')
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        headings = next(rows, None)
+        if headings is None:
+            raise RosterError('The first sheet is empty')
+        yield from _records(headings, enumerate(rows, start=2))
+    finally:
+        workbook.close()
+
+
+def read_roster(file, filename):
+    """Yield (line number, {column: text}) for each row of a binary CSV or .xlsx file."""
+    if filename.lower().endswith('.xlsx'):
+        return _xlsx_rows(file)
+    if filename.lower().endswith(('.csv', '.txt')):
+        return _csv_rows(file)
+    raise RosterError('Upload a .csv or .xlsx file')
+
+
+def _batches(rows, size):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _validate(record, sections, default_section):
+    name = record.get('name', '')
+    roll_number = record.get('roll_number', '')
+    section = record.get('section') or default_section
+    if not name or not roll_number:
+        return 'Name and roll number are required'
+    if not section:
+        return 'No section given'
+    if section not in sections:
+        return f'Unknown section {section!r}'
+    if len(name) > Student._meta.get_field('name').max_length:
+        return 'Name is too long'
+    if len(roll_number) > Student._meta.get_field('roll_number').max_length:
+        return 'Roll number is too long'
+    return None
+
+
+def import_students(user, rows, default_section=None, batch_size=IMPORT_BATCH_SIZE):
+    """
+    Add the students in rows (from read_roster) to user's roster.
+
+    Rows without a section column value go to default_section. Rows that
+    are invalid or whose roll number is taken (by an existing student or
+    an earlier row) are skipped. Returns (number of students added, [(line,
+    roll number, error)]). Everything is written in one transaction, so a
+    RosterError raised part way through the file adds nobody.
+    """
+    sections = set(section_names(user))
+    created = 0
+    errors = []
+    with transaction.atomic():
+        for batch in _batches(rows, batch_size):
+            valid = []
+            for line, record in batch:
+                error = _validate(record, sections, default_section)
+                if error:
+                    errors.append((line, record.get('roll_number', ''), error))
+                else:
+                    valid.append((line, record))
+
+            # Earlier batches are already inserted, so this also catches
+            # roll numbers repeated further apart in the file
+            taken = set(Student.objects.filter(
+                roll_number__in=[record['roll_number'] for _, record in valid]
+            ).values_list('roll_number', flat=True))
+            students = []
+            for line, record in valid:
+                roll_number = record['roll_number']
+                if roll_number in taken:
+                    errors.append((line, roll_number, 'A student with this roll number already exists'))
+                    continue
+                taken.add(roll_number)
+                students.append(Student(
+                    user=user,
+                    name=record['name'],
+                    roll_number=roll_number,
+                    section=record.get('section') or default_section
+                ))
+            Student.objects.bulk_create(students, batch_size=batch_size)
+            created += len(students)
+    errors.sort()
+    return created, errors
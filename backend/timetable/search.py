@@ -0,0 +1,218 @@
+"""
+Full-text search over lecture content.
+
+The index depends on the database:
+
+* SQLite: an FTS5 table over topic_covered, resources and remarks, using
+  the lecture content table as its external content. Triggers keep it up
+  to date on every insert, update and delete, bulk writes included.
+* PostgreSQL: a GIN index on the weighted tsvector of the three columns.
+  Being an expression index, it never needs updating by hand.
+
+Anywhere else (or on an SQLite build without FTS5) search falls back to
+icontains, which reads the whole table. Results are ranked (topics
+weigh most, then resources, then remarks) and highlighted with <mark>.
+`manage.py rebuild_search_index` recreates the index from the table.
+"""
+import re
+
+from django.db import connection as default_connection
+from django.db.models import Q
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+from .models import LectureContent, Subject
+
+FIELDS = ('topic_covered', 'resources', 'remarks')
+SEARCH_RESULTS = 50
+
+TABLE = LectureContent._meta.db_table
+SUBJECT_TABLE = Subject._meta.db_table
+FTS_TABLE = f'{TABLE}_fts'
+PG_INDEX = 'lecture_content_search'
+PG_CONFIG = 'english'
+# The indexed expression; queries must repeat it exactly to use the index
+PG_VECTOR = ' || '.join(
+    f"setweight(to_tsvector('{PG_CONFIG}', coalesce({field}, '')), '{weight}')"
+    for field, weight in zip(FIELDS, 'ABC')
+)
+# bm25() column weights, in FIELDS order
+FTS_WEIGHTS = (10.0, 3.0, 1.0)
+
+# Highlights are marked with control characters and only turned into
+# <mark> after the text is escaped
+START, STOP = '\x02', '\x03'
+
+
+def _fts_statements():
+    columns = ', '.join(FIELDS)
+    new = ', '.join(f'new.{field}' for field in FIELDS)
+    old = ', '.join(f'old.{field}' for field in FIELDS)
+    insert = f'INSERT INTO {FTS_TABLE}(rowid, {columns}) VALUES (new.id, {new});'
+    delete = f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, {columns}) VALUES ('delete', old.id, {old});"
+    return [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5({columns}, "
+        f"content='{TABLE}', content_rowid='id', tokenize='porter unicode61')",
+        f'CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_insert AFTER INSERT ON {TABLE} BEGIN {insert} END',
+        f'CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_delete AFTER DELETE ON {TABLE} BEGIN {delete} END',
+        f'CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_update AFTER UPDATE ON {TABLE} BEGIN {delete} {insert} END',
+    ]
+
+
+def _has_fts5(connection):
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT sqlite_compileoption_used('ENABLE_FTS5')")
+        return bool(cursor.fetchone()[0])
+
+
+def search_index_installed(connection=default_connection):
+    """Whether lecture content in this database has a full-text index."""
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = %s", [FTS_TABLE])
+            return cursor.fetchone() is not None
+        if connection.vendor == 'postgresql':
+            cursor.execute('SELECT 1 FROM pg_indexes WHERE indexname = %s', [PG_INDEX])
+            return cursor.fetchone() is not None
+    return False
+
+
+def install_search_index(connection=default_connection):
+    """Create whatever of the index is missing; returns False where none can be built."""
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            if not _has_fts5(connection):
+                return False
+            for statement in _fts_statements():
+                cursor.execute(statement)
+            return True
+        if connection.vendor == 'postgresql':
+            cursor.execute(f'CREATE INDEX IF NOT EXISTS {PG_INDEX} ON {TABLE} USING GIN (({PG_VECTOR}))')
+            return True
+    return False
+
+
+def remove_search_index(connection=default_connection):
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            for action in ('insert', 'delete', 'update'):
+                cursor.execute(f'DROP TRIGGER IF EXISTS {FTS_TABLE}_{action}')
+            cursor.execute(f'DROP TABLE IF EXISTS {FTS_TABLE}')
+        elif connection.vendor == 'postgresql':
+            cursor.execute(f'DROP INDEX IF EXISTS {PG_INDEX}')
+
+
+def rebuild_search_index(connection=default_connection):
+    """Install the index if needed and rebuild it from the table; returns False where there is none."""
+    if not install_search_index(connection):
+        return False
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+        else:
+            cursor.execute(f'REINDEX INDEX {PG_INDEX}')
+    return True
+
+
+def highlight(text):
+    """Escape text marked with START/STOP, turning the marks into <mark>."""
+    text = escape(text or '')
+    return mark_safe(text.replace(START, '<mark>').replace(STOP, '</mark>'))
+
+
+def _terms(text):
+    # Letters and digits only, so user input cannot break the query syntax
+    return re.findall(r'[^\W_]+', text.lower())
+
+
+def _fts_search(terms, where, params, limit):
+    # Every term, each also matching as a prefix ("dijk" finds Dijkstra)
+    match = ' '.join(f'"{term}"*' for term in terms)
+    weights = ', '.join(str(weight) for weight in FTS_WEIGHTS)
+    columns = ', '.join(
+        f"highlight({FTS_TABLE}, {index}, %s, %s)" if field == 'topic_covered'
+        else f"snippet({FTS_TABLE}, {index}, %s, %s, '...', 24)"
+        for index, field in enumerate(FIELDS)
+    )
+    sql = (
+        f'SELECT lecture.id, bm25({FTS_TABLE}, {weights}) AS rank, {columns} '
+        f'FROM {FTS_TABLE} JOIN {TABLE} lecture ON lecture.id = {FTS_TABLE}.rowid '
+        f'JOIN {SUBJECT_TABLE} subject ON subject.id = lecture.subject_id '
+        f'WHERE {FTS_TABLE} MATCH %s AND {where} '
+        f'ORDER BY rank, lecture.date DESC, lecture.id DESC LIMIT %s'
+    )
+    with default_connection.cursor() as cursor:
+        cursor.execute(sql, [START, STOP] * len(FIELDS) + [match] + params + [limit])
+        # bm25() is lower for better matches
+        return [(row[0], -row[1], row[2:]) for row in cursor.fetchall()]
+
+
+def _pg_search(terms, where, params, limit):
+    query = ' & '.join(f'{term}:*' for term in terms)
+    options = f'StartSel="{START}", StopSel="{STOP}", MaxWords=35, MinWords=15'
+    columns = ', '.join(
+        f"ts_headline('{PG_CONFIG}', coalesce(lecture.{field}, ''), query, %s)" for field in FIELDS
+    )
+    sql = (
+        f'SELECT lecture.id, ts_rank({PG_VECTOR}, query) AS rank, {columns} '
+        f'FROM {TABLE} lecture JOIN {SUBJECT_TABLE} subject ON subject.id = lecture.subject_id, '
+        f"to_tsquery('{PG_CONFIG}', %s) query "
+        f'WHERE {PG_VECTOR} @@ query AND {where} '
+        f'ORDER BY rank DESC, lecture.date DESC, lecture.id DESC LIMIT %s'
+    )
+    with default_connection.cursor() as cursor:
+        cursor.execute(sql, [options] * len(FIELDS) + [query] + params + [limit])
+        return [(row[0], row[1], row[2:]) for row in cursor.fetchall()]
+
+
+def _scan_search(terms, lectures, limit):
+    """Without an index: every term in some field, newest first, unranked."""
+    for term in terms:
+        lectures = lectures.filter(
+            Q(topic_covered__icontains=term) | Q(resources__icontains=term) | Q(remarks__icontains=term)
+        )
+    pattern = re.compile('|'.join(re.escape(term) for term in terms), re.IGNORECASE)
+    results = []
+    for lecture in lectures.order_by('-date', '-id')[:limit]:
+        texts = [pattern.sub(lambda m: f'{START}{m.group(0)}{STOP}', getattr(lecture, field) or '') for field in FIELDS]
+        results.append((lecture.id, None, texts))
+    return results
+
+
+def search_lectures(user, text, section=None, subject_id=None, limit=SEARCH_RESULTS):
+    """
+    The user's lecture content matching every word of text, best first.
+
+    Each LectureContent returned has rank (None without an index) and
+    highlights, a dict of field -> HTML with the matches in <mark>.
+    """
+    terms = _terms(text)
+    if not terms:
+        return []
+    lectures = LectureContent.objects.filter(subject__user=user)
+    where = ['subject.user_id = %s']
+    params = [user.id]
+    if section:
+        lectures = lectures.filter(section=section)
+        where.append('lecture.section = %s')
+        params.append(section)
+    if subject_id:
+        lectures = lectures.filter(subject_id=subject_id)
+        where.append('lecture.subject_id = %s')
+        params.append(subject_id)
+
+    if not search_index_installed():
+        found = _scan_search(terms, lectures, limit)
+    elif default_connection.vendor == 'sqlite':
+        found = _fts_search(terms, ' AND '.join(where), params, limit)
+    else:
+        found = _pg_search(terms, ' AND '.join(where), params, limit)
+
+    objects = LectureContent.objects.select_related('subject', 'faculty').in_bulk([row[0] for row in found])
+    results = []
+    for lecture_id, rank, texts in found:
+        lecture = objects[lecture_id]
+        lecture.rank = rank
+        lecture.highlights = {field: highlight(text) for field, text in zip(FIELDS, texts)}
+        results.append(lecture)
+    return results
@@ -0,0 +1,46 @@
+"""
+Helpers for the per-user list of sections.
+
+Section names are what the section fields of Timetable, Student and
+LectureContent store.
+"""
+from .models import LectureContent, Section, Student
+
+# Sections created for accounts that have not set up their own yet
+DEFAULT_SECTIONS = ['A', 'B']
+
+
+def section_names(user):
+    """Return the user's section names, creating the default sections on first use."""
+    names = list(Section.objects.filter(user=user).values_list('name', flat=True))
+    if not names:
+        Section.objects.bulk_create([Section(user=user, name=name) for name in DEFAULT_SECTIONS])
+        names = list(DEFAULT_SECTIONS)
+    return names
+
+
+def ensure_default_sections(user):
+    """Create the default sections for a user who has none yet."""
+    section_names(user)
+
+
+def section_in_use(section):
+    """
+    Why section cannot be renamed or deleted, or None if it can.
+
+    Students and lecture content store the section's name, so they would
+    be left pointing at a section that no longer exists.
+    """
+    if Student.objects.filter(user_id=section.user_id, section=section.name).exists():
+        return f'Section {section.name} still has students. Move or delete them first.'
+    if LectureContent.objects.filter(subject__user_id=section.user_id, section=section.name).exists():
+        return f'Section {section.name} still has lecture content. Delete it first.'
+    return None
+
+
+def selected_section(request, names):
+    """The section named in ?section=, falling back to the user's first section."""
+    section = request.GET.get('section')
+    if section in names:
+        return section
+    return names[0] if names else None
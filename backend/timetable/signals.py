@@ -0,0 +1,47 @@
+"""
+Invalidate cached timetable grids when the data they display changes.
+
+Timetable rows are written in bulk (see persistence.py), which sends no
+signals; save_grid invalidates the cache itself. Changes to the time
+slots make every process read them again (see week.py). After
+migrations the lecture content search triggers are restored (see
+search.py). Availability masks are kept by the code that writes the
+rows (see availability.py), not by signals.
+"""
+from django.db import connections, transaction
+from django.db.models.signals import m2m_changed, post_delete, post_migrate, post_save
+from django.dispatch import receiver
+
+from .grid import invalidate_timetable
+from .models import Faculty, Section, Subject, TimeSlot
+from .search import install_search_index, search_index_installed
+from .week import invalidate_slots
+
+
+@receiver(post_save, sender=Faculty)
+@receiver(post_delete, sender=Faculty)
+@receiver(post_save, sender=Subject)
+@receiver(post_delete, sender=Subject)
+@receiver(post_save, sender=Section)
+@receiver(post_delete, sender=Section)
+@receiver(m2m_changed, sender=Subject.sections.through)
+def timetable_data_changed(sender, instance, **kwargs):
+    if instance.user_id is not None:
+        invalidate_timetable(instance.user_id)
+
+
+@receiver(post_save, sender=TimeSlot)
+@receiver(post_delete, sender=TimeSlot)
+def time_slots_changed(sender, **kwargs):
+    transaction.on_commit(invalidate_slots)
+
+
+@receiver(post_migrate)
+def timetable_migrated(sender, using, **kwargs):
+    if sender.name != 'timetable':
+        return
+    # flush also ends with post_migrate, and leaves no time slots behind
+    invalidate_slots()
+    # SQLite migrations that rebuild the lecture content table drop its triggers
+    if search_index_installed(connections[using]):
+        install_search_index(connections[using])
@@ -0,0 +1,72 @@
+"""
+Content-addressed cache of generated timetables.
+
+Solutions are stored per user under the fingerprint of the generator
+inputs (see Problem.fingerprint), with several variants per fingerprint.
+The most recently used variant of a fingerprint is the one currently in
+use; the oldest entries are evicted once a user has more than
+TIMETABLE_CACHE_SIZE of them.
+"""
+from django.conf import settings
+
+from .models import CachedSolution
+
+
+def cache_size():
+    return getattr(settings, 'TIMETABLE_CACHE_SIZE', 20)
+
+
+def max_variants():
+    return getattr(settings, 'TIMETABLE_CACHE_VARIANTS', 5)
+
+
+def _touch(entry):
+    entry.save(update_fields=['last_used_at'])
+    return entry
+
+
+def lookup(user, fingerprint):
+    """Return the variant last used for these inputs, or None."""
+    entry = CachedSolution.objects.filter(user=user, fingerprint=fingerprint).order_by('-last_used_at').first()
+    return _touch(entry) if entry is not None else None
+
+
+def next_variant(user, fingerprint):
+    """
+    Return the cached variant after the one in use, or None if a new variant
+    should be generated instead.
+
+    Cached variants are offered in order; after the last one a new variant is
+    requested until TIMETABLE_CACHE_VARIANTS exist, then the cycle restarts.
+    """
+    entries = list(CachedSolution.objects.filter(user=user, fingerprint=fingerprint).order_by('variant'))
+    if not entries:
+        return None
+    current = max(entries, key=lambda entry: entry.last_used_at)
+    later = [entry for entry in entries if entry.variant > current.variant]
+    if later:
+        return _touch(later[0])
+    if len(entries) < max_variants():
+        return None
+    return _touch(entries[0])
+
+
+def variant_count(user, fingerprint):
+    return CachedSolution.objects.filter(user=user, fingerprint=fingerprint).count()
+
+
+def store(user, fingerprint, grid):
+    """Cache a new variant for these inputs and evict the least recently used entries."""
+    last = CachedSolution.objects.filter(user=user, fingerprint=fingerprint).order_by('-variant').first()
+    entry = CachedSolution.objects.create(
+        user=user,
+        fingerprint=fingerprint,
+        variant=last.variant + 1 if last is not None else 0,
+        grid=grid
+    )
+    stale_ids = list(
+        CachedSolution.objects.filter(user=user).order_by('-last_used_at').values_list('id', flat=True)[cache_size():]
+    )
+    if stale_ids:
+        CachedSolution.objects.filter(id__in=stale_ids).delete()
+    return entry
@@ -0,0 +1,20 @@
+from . import heuristic
+from .engine import solve
+from .exceptions import Infeasible, RepairFailed, SearchLimitExceeded, SolverError
+from .optimize import DEFAULT_WEIGHTS, optimize, score
+from .portfolio import solve_portfolio
+from .problem import LUNCH, Problem, SubjectInfo, build_problem
+from .repair import repair
+
+# Generation engines selectable through settings.TIMETABLE_ENGINE
+ENGINES = {
+    'solver': solve,
+    'heuristic': heuristic.generate,
+}
+
+
+def get_engine(name):
+    try:
+        return ENGINES[name]
+    except KeyError:
+        raise SolverError(f'Unknown timetable engine: {name}')
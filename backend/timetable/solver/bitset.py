@@ -0,0 +1,23 @@
+"""
+Helpers for the week bitsets used by the generators.
+
+A week is encoded as an int with one bit per (day, slot) position, where
+position = day_index * slots_per_day + slot_index.
+"""
+
+
+def popcount(mask):
+    # int.bit_count() only exists from Python 3.10
+    return bin(mask).count('1')
+
+
+def iter_bits(mask):
+    """Yield the positions of the set bits in ascending order."""
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+def bits_to_list(mask):
+    return list(iter_bits(mask))
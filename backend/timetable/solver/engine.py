@@ -0,0 +1,411 @@
+"""
+Constraint solver for timetable generation.
+
+Every section, faculty member and lesson domain is a week bitset (see
+bitset.py). The search assigns one lesson at a time, always picking the
+most constrained lesson group first, and forward-checks every group that
+shares the section or faculty member of the placement. Capacity checks on
+sections and faculty members let it refute most infeasible inputs before
+any branching happens.
+
+A placement only changes the groups of one section and one faculty
+member, so selection keys live in a heap that is updated for those groups
+alone; the work per search node does not grow with the number of
+sections.
+"""
+import heapq
+import random
+
+from .bitset import iter_bits, popcount
+from .exceptions import Infeasible, SearchLimitExceeded
+from .problem import LUNCH
+
+DEFAULT_MAX_NODES = 200000
+
+# Node budget of the first search run (at least twice the number of
+# lessons to place); each restart doubles it
+RESTART_NODES = 500
+
+# Nodes between two progress reports within a run
+CHECK_NODES = 1000
+
+LAB = 'lab'
+THEORY = 'theory'
+LUNCH_BREAK = 'lunch'
+
+# Lunch breaks are only chosen once they are forced; they never need a faculty member
+_DEFERRED = 1 << 30
+
+
+class _Group:
+    """Interchangeable lessons of one subject in one section (or one lunch break)."""
+
+    __slots__ = ('index', 'kind', 'section', 'subject', 'faculty', 'day', 'length',
+                 'remaining', 'positions', 'excluded', 'domain', 'size', 'version')
+
+    def __init__(self, kind, section, subject=None, faculty=None, day=None, length=1, remaining=1):
+        self.index = None
+        self.kind = kind
+        self.section = section
+        self.subject = subject
+        self.faculty = faculty
+        self.day = day
+        self.length = length
+        self.remaining = remaining
+        self.positions = []
+        # Start positions already refuted for this group at an enclosing search node
+        self.excluded = 0
+        self.domain = 0
+        self.size = 0
+        # Bumped whenever the selection key changes; older heap entries are stale
+        self.version = 0
+
+
+class Solver:
+    def __init__(self, problem, rng=None, max_nodes=DEFAULT_MAX_NODES, check=None):
+        self.problem = problem
+        self.random = rng or random.Random()
+        self.max_nodes = max_nodes
+        self.nodes = 0
+        # Called with the nodes used every CHECK_NODES nodes; may raise to stop the search
+        self.check = check
+        self._build()
+
+    def _build(self):
+        problem = self.problem
+        per_day = problem.slots_per_day
+        self.full = (1 << problem.n_positions) - 1
+        self.day_masks = [((1 << per_day) - 1) << (d * per_day) for d in range(len(problem.days))]
+        self.lunch_masks = [
+            sum(1 << problem.position(d, s) for s in problem.lunch_slots)
+            for d in range(len(problem.days))
+        ]
+        # Labs take two consecutive slots on one day and never overlap the lunch period
+        self.lab_starts = 0
+        for d in range(len(problem.days)):
+            for s in range(per_day - 1):
+                if s not in problem.lunch_slots and s + 1 not in problem.lunch_slots:
+                    self.lab_starts |= 1 << problem.position(d, s)
+
+        self.section_busy = [0] * len(problem.sections)
+        self.section_need = [0] * len(problem.sections)
+        self.section_groups = [[] for _ in problem.sections]
+
+        faculty_ids = sorted({subject.faculty_id for subject in problem.subjects.values()})
+        self.faculty_index = {faculty_id: i for i, faculty_id in enumerate(faculty_ids)}
+        self.faculty_available = [problem.availability.get(faculty_id, 0) for faculty_id in faculty_ids]
+        self.faculty_busy = [0] * len(faculty_ids)
+        self.faculty_need = [0] * len(faculty_ids)
+        self.faculty_groups = [[] for _ in faculty_ids]
+
+        self.groups = []
+        for si, section in enumerate(problem.sections):
+            for subject in problem.curriculum(section):
+                fi = self.faculty_index[subject.faculty_id]
+                if subject.is_lab:
+                    group = _Group(LAB, si, subject, fi, length=2, remaining=1)
+                elif subject.credits > 0:
+                    group = _Group(THEORY, si, subject, fi, remaining=subject.credits)
+                else:
+                    continue
+                self.faculty_groups[fi].append(group)
+                self._add_group(group)
+            if problem.lunch_slots:
+                for d in range(len(problem.days)):
+                    self._add_group(_Group(LUNCH_BREAK, si, day=d))
+
+        for group in self.groups:
+            self._refresh(group)
+        self.faculty_slack = [
+            self._slack(groups, need)
+            for groups, need in zip(self.faculty_groups, self.faculty_need)
+        ]
+        self.heap = [(self._key(group), group.index, 0) for group in self.groups]
+        heapq.heapify(self.heap)
+
+    def _add_group(self, group):
+        group.index = len(self.groups)
+        self.groups.append(group)
+        self.section_groups[group.section].append(group)
+        self.section_need[group.section] += group.length * group.remaining
+        if group.faculty is not None:
+            self.faculty_need[group.faculty] += group.length * group.remaining
+
+    def _refresh(self, group):
+        free = self.full & ~self.section_busy[group.section]
+        if group.kind == LUNCH_BREAK:
+            free &= self.lunch_masks[group.day]
+        else:
+            free &= self.faculty_available[group.faculty] & ~self.faculty_busy[group.faculty]
+            if group.kind == LAB:
+                free &= (free >> 1) & self.lab_starts
+        group.domain = free & ~group.excluded
+        group.size = popcount(group.domain)
+
+    def _reach(self, group):
+        """Positions the group's remaining lessons could still cover."""
+        if group.kind == LAB:
+            return group.domain | (group.domain << 1)
+        return group.domain
+
+    def _slack(self, groups, need):
+        reach = 0
+        for group in groups:
+            if group.remaining:
+                reach |= self._reach(group)
+        return popcount(reach) - need
+
+    def _has_room(self, groups, need):
+        # The lessons of a section (or faculty member) can never share a
+        # position, so together their domains must cover enough positions
+        return self._slack(groups, need) >= 0
+
+    def _check_static(self):
+        problem = self.problem
+        for group in self.groups:
+            if group.kind == LAB and not group.domain:
+                raise Infeasible(
+                    f'{group.subject.name} lab has no two consecutive available slots '
+                    f'for {group.subject.faculty_name} outside the lunch period.'
+                )
+            if group.kind == THEORY and group.size < group.remaining:
+                raise Infeasible(
+                    f'{group.subject.faculty_name} is available for {group.size} slots '
+                    f'but {group.subject.name} needs {group.remaining} classes per section.'
+                )
+        names = {subject.faculty_id: subject.faculty_name for subject in problem.subjects.values()}
+        for faculty_id, fi in self.faculty_index.items():
+            capacity = popcount(self.faculty_available[fi])
+            if self.faculty_need[fi] > capacity:
+                raise Infeasible(
+                    f'{names[faculty_id]} has to teach {self.faculty_need[fi]} slots '
+                    f'but is only available for {capacity}.'
+                )
+        for si, section in enumerate(problem.sections):
+            if self.section_need[si] > problem.n_positions:
+                raise Infeasible(
+                    f'Section {section} needs {self.section_need[si]} slots '
+                    f'but the week only has {problem.n_positions}.'
+                )
+            if not self._has_room(self.section_groups[si], self.section_need[si]):
+                raise Infeasible(
+                    f'Section {section} needs {self.section_need[si]} slots including lunch breaks '
+                    f'but its faculty members are only available for fewer distinct slots.'
+                )
+
+    def _key(self, group):
+        # A group is as constrained as its tightest resource: its own domain
+        # or the faculty member who has to fit all of their lessons
+        slack = group.size - group.remaining
+        if group.kind == LUNCH_BREAK:
+            if slack > 0:
+                slack += _DEFERRED
+        else:
+            slack = min(slack, self.faculty_slack[group.faculty])
+        return (slack, group.size - group.remaining, -group.length)
+
+    def _touch(self, groups):
+        """Re-key the given groups after their domains changed, and every group of their faculty members."""
+        stale = {group.index: group for group in groups}
+        for fi in {group.faculty for group in groups if group.faculty is not None}:
+            self.faculty_slack[fi] = self._slack(self.faculty_groups[fi], self.faculty_need[fi])
+            for group in self.faculty_groups[fi]:
+                stale[group.index] = group
+        for group in stale.values():
+            group.version += 1
+            if group.remaining:
+                heapq.heappush(self.heap, (self._key(group), group.index, group.version))
+        # Drop stale entries once they outnumber the live ones
+        if len(self.heap) > 4 * len(self.groups):
+            self.heap = [entry for entry in self.heap if entry[2] == self.groups[entry[1]].version]
+            heapq.heapify(self.heap)
+
+    def _select(self):
+        heap = self.heap
+        while heap:
+            _, index, version = heap[0]
+            group = self.groups[index]
+            if version == group.version and group.remaining:
+                return group
+            heapq.heappop(heap)
+        return None
+
+    def _candidates(self, group):
+        # Prefer days the group does not use yet so a subject spreads over the week
+        used_days = 0
+        for position in group.positions:
+            used_days |= self.day_masks[position // self.problem.slots_per_day]
+        fresh = list(iter_bits(group.domain & ~used_days))
+        stale = list(iter_bits(group.domain & used_days))
+        self.random.shuffle(fresh)
+        self.random.shuffle(stale)
+        return fresh + stale
+
+    def _place(self, group, position):
+        """Place one lesson of the group; return an undo record, or None if it fails."""
+        self.nodes += 1
+        if self.nodes > self.max_nodes:
+            raise SearchLimitExceeded(f'Search stopped after {self.max_nodes} nodes.')
+        if self.check is not None and self.nodes % CHECK_NODES == 0:
+            self.check(self.nodes)
+
+        bits = ((1 << group.length) - 1) << position
+        si, fi = group.section, group.faculty
+        affected = self.section_groups[si]
+        if fi is not None:
+            affected = affected + self.faculty_groups[fi]
+        undo = (
+            group, si, fi,
+            self.section_busy[si],
+            self.faculty_busy[fi] if fi is not None else None,
+            [(other, other.domain, other.size) for other in affected],
+        )
+
+        self.section_busy[si] |= bits
+        self.section_need[si] -= group.length
+        if fi is not None:
+            self.faculty_busy[fi] |= bits
+            self.faculty_need[fi] -= group.length
+        group.remaining -= 1
+        group.positions.append(position)
+
+        ok = True
+        for other in affected:
+            self._refresh(other)
+            if other.size < other.remaining:
+                ok = False
+        if ok and not self._has_room(self.section_groups[si], self.section_need[si]):
+            ok = False
+        if ok and fi is not None and not self._has_room(self.faculty_groups[fi], self.faculty_need[fi]):
+            ok = False
+        if not ok:
+            self._undo(undo)
+            return None
+        self._touch(affected)
+        return undo
+
+    def _undo(self, undo):
+        group, si, fi, section_busy, faculty_busy, domains = undo
+        self.section_busy[si] = section_busy
+        self.section_need[si] += group.length
+        if fi is not None:
+            self.faculty_busy[fi] = faculty_busy
+            self.faculty_need[fi] += group.length
+        group.remaining += 1
+        group.positions.pop()
+        for other, domain, size in reversed(domains):
+            other.domain = domain
+            other.size = size
+        self._touch([other for other, _, _ in domains])
+
+    def _search(self):
+        # Each frame is [group, candidates, next index, undo record, excluded mask on entry]
+        frames = []
+        while True:
+            group = self._select()
+            if group is None:
+                return True
+            frames.append([group, self._candidates(group), 0, None, group.excluded])
+
+            while frames:
+                frame = frames[-1]
+                group, candidates = frame[0], frame[1]
+                if frame[3] is not None:
+                    self._undo(frame[3])
+                    frame[3] = None
+                    # Lessons of a group are interchangeable, so a refuted
+                    # position is refuted for every remaining lesson too
+                    group.excluded |= 1 << candidates[frame[2] - 1]
+                    self._refresh(group)
+                    self._touch([group])
+                undo = None
+                while frame[2] < len(candidates) and group.size >= group.remaining:
+                    position = candidates[frame[2]]
+                    frame[2] += 1
+                    if not (group.domain >> position) & 1:
+                        continue
+                    undo = self._place(group, position)
+                    if undo is not None:
+                        break
+                    group.excluded |= 1 << position
+                    self._refresh(group)
+                    self._touch([group])
+                if undo is not None:
+                    frame[3] = undo
+                    break
+                group.excluded = frame[4]
+                self._refresh(group)
+                self._touch([group])
+                frames.pop()
+            else:
+                return False
+
+    def solve(self):
+        self._check_static()
+        if not self._search():
+            raise Infeasible('No timetable satisfies the subject load and faculty availability.')
+        return self._grid()
+
+    def _grid(self):
+        problem = self.problem
+        grid = problem.empty_grid()
+        per_day = problem.slots_per_day
+        for group in self.groups:
+            cells = grid[problem.sections[group.section]]
+            for position in group.positions:
+                day = problem.days[position // per_day]
+                for offset in range(group.length):
+                    slot = position % per_day + offset
+                    cells[day][slot] = LUNCH if group.kind == LUNCH_BREAK else group.subject.id
+        return grid
+
+
+def solve(problem, seed=None, max_nodes=DEFAULT_MAX_NODES, progress=None, stats=None):
+    """
+    Return a complete timetable grid for the problem.
+
+    The search restarts with a fresh random value order and a doubled node
+    budget whenever a run gets stuck, which avoids the long tails a single
+    unlucky early choice can cause. A run that finishes within its budget
+    without a solution proves that none exists.
+
+    progress, if given, is called as progress(nodes_used, max_nodes) every
+    CHECK_NODES nodes and after every run; an exception it raises stops the
+    search (the portfolio cancels chunks that way). stats, if given, is a
+    dict that receives the number of runs started as 'attempts' (restarts
+    plus one), however the search ends. Raises Infeasible when no
+    timetable exists and SearchLimitExceeded when max_nodes runs out
+    first.
+    """
+    rng = random.Random(seed)
+    budget = max_nodes
+    cutoff = max(RESTART_NODES, 2 * _lesson_count(problem))
+
+    def check(nodes):
+        # Nodes of earlier runs plus those of the current one
+        progress(max_nodes - budget + nodes, max_nodes)
+
+    runs = 0
+    while True:
+        run = min(cutoff, budget)
+        runs += 1
+        if stats is not None:
+            stats['attempts'] = runs
+        try:
+            return Solver(problem, rng=rng, max_nodes=run, check=check if progress else None).solve()
+        except SearchLimitExceeded:
+            budget -= run
+            if progress is not None:
+                progress(max_nodes - budget, max_nodes)
+            if budget <= 0:
+                raise SearchLimitExceeded(f'Search stopped after {max_nodes} nodes.')
+            cutoff *= 2
+
+
+def _lesson_count(problem):
+    lessons = 0
+    for section in problem.sections:
+        lessons += sum(1 if subject.is_lab else subject.credits for subject in problem.curriculum(section))
+        if problem.lunch_slots:
+            lessons += len(problem.days)
+    return lessons
@@ -0,0 +1,14 @@
+class SolverError(Exception):
+    """Base class for timetable generation failures."""
+
+
+class Infeasible(SolverError):
+    """Raised when the constraints provably admit no complete timetable."""
+
+
+class SearchLimitExceeded(SolverError):
+    """Raised when a search gives up before finding or refuting a timetable."""
+
+
+class RepairFailed(SolverError):
+    """Raised when an existing timetable cannot be repaired locally."""
@@ -0,0 +1,120 @@
+"""
+The original random-restart generator, kept for comparison with the solver.
+
+Each attempt places labs, then theory classes, then lunch breaks at random,
+re-places whatever the lunch breaks displaced and accepts the result only
+if every section received its full load.
+"""
+import random
+
+from .exceptions import SearchLimitExceeded
+from .problem import LUNCH
+
+MAX_ATTEMPTS = 10000
+
+
+def generate(problem, seed=None, max_attempts=MAX_ATTEMPTS, progress=None, stats=None):
+    # stats, if given, receives the number of attempts made as 'attempts'
+    rng = random.Random(seed)
+    for attempt in range(max_attempts):
+        if stats is not None:
+            stats['attempts'] = attempt + 1
+        grid = _attempt(problem, rng)
+        if grid is not None:
+            return grid
+        if progress is not None:
+            progress(attempt + 1, max_attempts)
+    raise SearchLimitExceeded(f'No complete timetable found in {max_attempts} attempts.')
+
+
+def _attempt(problem, rng):
+    grid = problem.empty_grid()
+    per_day = problem.slots_per_day
+    # faculty_id -> positions still free for that faculty member in this attempt
+    faculty_free = dict(problem.availability)
+    leftovers = {section: [] for section in problem.sections}
+
+    def is_faculty_free(faculty_id, day_index, slot_index):
+        return (faculty_free.get(faculty_id, 0) >> problem.position(day_index, slot_index)) & 1
+
+    def book(faculty_id, day_index, slot_index):
+        faculty_free[faculty_id] &= ~(1 << problem.position(day_index, slot_index))
+
+    def release(faculty_id, day_index, slot_index):
+        faculty_free[faculty_id] |= 1 << problem.position(day_index, slot_index)
+
+    def assign_labs(section):
+        cells = grid[section]
+        starts = [(d, s) for d in range(len(problem.days)) for s in range(per_day - 1)
+                  if s not in problem.lunch_slots and s + 1 not in problem.lunch_slots]
+        for lab in problem.curriculum(section):
+            if not lab.is_lab:
+                continue
+            rng.shuffle(starts)
+            for d, s in starts:
+                row = cells[problem.days[d]]
+                if (row[s] is None and row[s + 1] is None and
+                        is_faculty_free(lab.faculty_id, d, s) and
+                        is_faculty_free(lab.faculty_id, d, s + 1)):
+                    row[s] = row[s + 1] = lab.id
+                    book(lab.faculty_id, d, s)
+                    book(lab.faculty_id, d, s + 1)
+                    break
+
+    def place_class(section, subject):
+        cells = grid[section]
+        available_slots = [(d, s) for d in range(len(problem.days)) for s in range(per_day)
+                           if cells[problem.days[d]][s] is None and
+                           is_faculty_free(subject.faculty_id, d, s)]
+        if not available_slots:
+            return False
+        d, s = rng.choice(available_slots)
+        cells[problem.days[d]][s] = subject.id
+        book(subject.faculty_id, d, s)
+        return True
+
+    def assign_classes(section):
+        for subject in problem.curriculum(section):
+            if subject.is_lab:
+                continue
+            for _ in range(subject.credits):
+                if not place_class(section, subject):
+                    leftovers[section].append(subject)
+
+    def reassign_classes(section):
+        for subject in leftovers[section]:
+            place_class(section, subject)
+        leftovers[section] = []
+
+    def assign_lunch_break():
+        if not problem.lunch_slots:
+            return
+        for section in problem.sections:
+            for d, day in enumerate(problem.days):
+                row = grid[section][day]
+                if any(row[s] == LUNCH for s in problem.lunch_slots):
+                    continue
+                free = [s for s in problem.lunch_slots if row[s] is None]
+                slot_index = free[0] if free else rng.choice(problem.lunch_slots)
+                displaced = row[slot_index]
+                if displaced is not None:
+                    subject = problem.subjects[displaced]
+                    release(subject.faculty_id, d, slot_index)
+                    leftovers[section].append(subject)
+                row[slot_index] = LUNCH
+
+    for section in problem.sections:
+        assign_labs(section)
+    for section in problem.sections:
+        assign_classes(section)
+    assign_lunch_break()
+    for section in problem.sections:
+        reassign_classes(section)
+    assign_lunch_break()
+
+    for section in problem.sections:
+        assigned = sum(1 for day in problem.days for cell in grid[section][day]
+                       if cell is not None and cell != LUNCH)
+        if assigned != problem.required_slots(section):
+            return None
+    return grid
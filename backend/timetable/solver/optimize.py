@@ -0,0 +1,357 @@
+"""
+Quality optimisation of a feasible timetable by simulated annealing.
+
+A timetable is scored with a weighted sum of penalties (lower is better):
+
+- spread: every extra class of a subject on a day that already has one,
+  per section;
+- gaps: free slots between a section's first and last class of a day
+  (lunch breaks count as occupied);
+- consecutive: every slot a faculty member teaches beyond
+  `max_consecutive` classes in a row.
+
+Moves shift one theory class to a free slot or swap it with another
+class or with the lunch break of that day; labs stay where they are. A
+move only changes two section-days and at most four faculty-days, so its
+score delta is computed from lookup tables over the bits of those days
+instead of rescoring the timetable.
+"""
+import math
+import random
+import time
+
+from .problem import LUNCH
+
+DEFAULT_WEIGHTS = {
+    'spread': 10,
+    'gaps': 3,
+    'consecutive': 5,
+}
+
+DEFAULT_MAX_CONSECUTIVE = 3
+
+FREE = 0
+THEORY = 1
+LUNCH_CELL = 2
+LAB = 3
+
+# Moves between two looks at the clock (or the move budget)
+_CHECK_EVERY = 1000
+
+
+def _tables(slots_per_day, max_consecutive):
+    """Gap and excess-run penalties for every possible set of busy slots in a day."""
+    gaps = []
+    runs = []
+    for bits in range(1 << slots_per_day):
+        count = bin(bits).count('1')
+        if bits:
+            low = (bits & -bits).bit_length() - 1
+            gaps.append(bits.bit_length() - low - count)
+        else:
+            gaps.append(0)
+        # Bits starting a window of max_consecutive + 1 busy slots
+        window = bits
+        for shift in range(1, max_consecutive + 1):
+            window &= bits >> shift
+        runs.append(bin(window).count('1'))
+    return gaps, runs
+
+
+class Optimizer:
+    def __init__(self, problem, grid, weights=None, max_consecutive=DEFAULT_MAX_CONSECUTIVE, rng=None):
+        self.problem = problem
+        self.random = rng or random.Random()
+        weights = dict(DEFAULT_WEIGHTS, **(weights or {}))
+        self.w_spread = weights['spread']
+        self.w_gaps = weights['gaps']
+        self.w_run = weights['consecutive']
+        self.per_day = problem.slots_per_day
+        self.day_mask = (1 << self.per_day) - 1
+        self.gap_table, self.run_table = _tables(self.per_day, max_consecutive)
+        self._load(grid)
+
+    def _load(self, grid):
+        problem = self.problem
+        per_day = self.per_day
+        n_days = len(problem.days)
+        faculty_ids = sorted({subject.faculty_id for subject in problem.subjects.values()})
+        self.faculty_index = {faculty_id: i for i, faculty_id in enumerate(faculty_ids)}
+        self.faculty_available = [problem.availability.get(faculty_id, 0) for faculty_id in faculty_ids]
+        self.faculty_busy = [0] * len(faculty_ids)
+
+        # Per section: cell value, cell kind and teaching faculty by position
+        self.cells = []
+        self.kinds = []
+        self.faculty = []
+        self.section_busy = []
+        # (section, subject id) -> classes per day
+        self.per_day_count = {}
+        # Movable cells as [section, position]; positions change as moves are made
+        self.movable = []
+        for si, section in enumerate(problem.sections):
+            cells = [None] * problem.n_positions
+            kinds = [FREE] * problem.n_positions
+            faculty = [None] * problem.n_positions
+            busy = 0
+            for d, day in enumerate(problem.days):
+                for s, value in enumerate(grid[section][day]):
+                    if value is None:
+                        continue
+                    position = d * per_day + s
+                    cells[position] = value
+                    busy |= 1 << position
+                    if value == LUNCH:
+                        kinds[position] = LUNCH_CELL
+                        self.movable.append([si, position])
+                        continue
+                    subject = problem.subjects[value]
+                    fi = self.faculty_index[subject.faculty_id]
+                    faculty[position] = fi
+                    self.faculty_busy[fi] |= 1 << position
+                    if subject.is_lab:
+                        kinds[position] = LAB
+                    else:
+                        kinds[position] = THEORY
+                        self.movable.append([si, position])
+                        counts = self.per_day_count.setdefault((si, value), [0] * n_days)
+                        counts[d] += 1
+            self.cells.append(cells)
+            self.kinds.append(kinds)
+            self.faculty.append(faculty)
+            self.section_busy.append(busy)
+        # Per section: position -> index into movable
+        self.owner = [{} for _ in problem.sections]
+        for i, (si, position) in enumerate(self.movable):
+            self.owner[si][position] = i
+
+    def score(self):
+        """Full weighted score of the current timetable; moves are scored by delta instead."""
+        per_day = self.per_day
+        n_days = len(self.problem.days)
+        gaps = sum(
+            self.gap_table[(busy >> (d * per_day)) & self.day_mask]
+            for busy in self.section_busy for d in range(n_days)
+        )
+        runs = sum(
+            self.run_table[(busy >> (d * per_day)) & self.day_mask]
+            for busy in self.faculty_busy for d in range(n_days)
+        )
+        spread = sum(count - 1 for counts in self.per_day_count.values() for count in counts if count > 1)
+        return self.w_spread * spread + self.w_gaps * gaps + self.w_run * runs
+
+    def grid(self):
+        problem = self.problem
+        grid = problem.empty_grid()
+        for si, section in enumerate(problem.sections):
+            cells = self.cells[si]
+            for d, day in enumerate(problem.days):
+                grid[section][day] = cells[d * self.per_day:(d + 1) * self.per_day]
+        return grid
+
+    def _propose(self):
+        """
+        Pick a random move; returns (section, position_a, position_b) or None if infeasible.
+
+        Position a never holds a free cell, and holds a theory class unless
+        a lunch break moves to a free slot.
+        """
+        si, a = self.movable[self.random.randrange(len(self.movable))]
+        kinds = self.kinds[si]
+        per_day = self.per_day
+        if kinds[a] == LUNCH_CELL:
+            lunch = self.problem.lunch_slots
+            if len(lunch) < 2:
+                return None
+            b = a - a % per_day + lunch[self.random.randrange(len(lunch))]
+            if b == a or kinds[b] == LAB:
+                return None
+            if kinds[b] == FREE:
+                return si, a, b
+            a, b = b, a
+        else:
+            b = self.random.randrange(self.problem.n_positions)
+            kind_b = kinds[b]
+            if b == a or kind_b == LAB:
+                return None
+            # The lunch break stays on its day and within the lunch period
+            if kind_b == LUNCH_CELL and (a // per_day != b // per_day or
+                                         a % per_day not in self.problem.lunch_slots):
+                return None
+        faculty = self.faculty[si]
+        fa = faculty[a]
+        fb = faculty[b]
+        bit_a = 1 << a
+        bit_b = 1 << b
+        if not self.faculty_available[fa] & bit_b:
+            return None
+        if self.faculty_busy[fa] & bit_b and fb != fa:
+            return None
+        if fb is not None and fb != fa:
+            if not self.faculty_available[fb] & bit_a or self.faculty_busy[fb] & bit_a:
+                return None
+        return si, a, b
+
+    def _delta(self, si, a, b):
+        """Score change of exchanging the contents of positions a and b of a section."""
+        per_day = self.per_day
+        day_mask = self.day_mask
+        gap_table = self.gap_table
+        run_table = self.run_table
+        cells = self.cells[si]
+        kinds = self.kinds[si]
+        da = a // per_day
+        db = b // per_day
+        bit_a = 1 << a
+        bit_b = 1 << b
+
+        delta = 0
+        if da != db:
+            busy = self.section_busy[si]
+            new_busy = busy
+            if kinds[b] == FREE:
+                new_busy = busy ^ bit_a ^ bit_b
+            delta += self.w_gaps * (
+                gap_table[(new_busy >> (da * per_day)) & day_mask] - gap_table[(busy >> (da * per_day)) & day_mask] +
+                gap_table[(new_busy >> (db * per_day)) & day_mask] - gap_table[(busy >> (db * per_day)) & day_mask]
+            )
+            # A class changing day changes the spread of its subject, unless
+            # it swaps with a class of the same subject
+            if cells[a] != cells[b]:
+                for position, old_day, new_day in ((a, da, db), (b, db, da)):
+                    if kinds[position] == THEORY:
+                        counts = self.per_day_count[(si, cells[position])]
+                        delta += self.w_spread * ((counts[new_day] >= 1) - (counts[old_day] >= 2))
+        elif kinds[b] == FREE:
+            busy = self.section_busy[si]
+            new_busy = busy ^ bit_a ^ bit_b
+            delta += self.w_gaps * (
+                gap_table[(new_busy >> (da * per_day)) & day_mask] - gap_table[(busy >> (da * per_day)) & day_mask]
+            )
+
+        faculty = self.faculty[si]
+        fa = faculty[a]
+        fb = faculty[b]
+        if fa != fb:
+            for fi, gone, came in ((fa, bit_a, bit_b), (fb, bit_b, bit_a)):
+                if fi is None:
+                    continue
+                busy = self.faculty_busy[fi]
+                new_busy = busy ^ gone ^ came
+                delta += self.w_run * (
+                    run_table[(new_busy >> (da * per_day)) & day_mask] - run_table[(busy >> (da * per_day)) & day_mask]
+                )
+                if db != da:
+                    delta += self.w_run * (
+                        run_table[(new_busy >> (db * per_day)) & day_mask] - run_table[(busy >> (db * per_day)) & day_mask]
+                    )
+        return delta
+
+    def _apply(self, si, a, b):
+        per_day = self.per_day
+        cells = self.cells[si]
+        kinds = self.kinds[si]
+        faculty = self.faculty[si]
+        bit_a = 1 << a
+        bit_b = 1 << b
+        da = a // per_day
+        db = b // per_day
+        for position, old_day, new_day in ((a, da, db), (b, db, da)):
+            if kinds[position] == THEORY and old_day != new_day:
+                counts = self.per_day_count[(si, cells[position])]
+                counts[old_day] -= 1
+                counts[new_day] += 1
+        fa = faculty[a]
+        fb = faculty[b]
+        if fa != fb:
+            if fa is not None:
+                self.faculty_busy[fa] ^= bit_a | bit_b
+            if fb is not None:
+                self.faculty_busy[fb] ^= bit_a | bit_b
+        if (kinds[a] == FREE) != (kinds[b] == FREE):
+            self.section_busy[si] ^= bit_a | bit_b
+        cells[a], cells[b] = cells[b], cells[a]
+        kinds[a], kinds[b] = kinds[b], kinds[a]
+        faculty[a], faculty[b] = fb, fa
+        owner = self.owner[si]
+        moved_a = owner.pop(a, None)
+        moved_b = owner.pop(b, None)
+        if moved_a is not None:
+            owner[b] = moved_a
+            self.movable[moved_a][1] = b
+        if moved_b is not None:
+            owner[a] = moved_b
+            self.movable[moved_b][1] = a
+
+    def anneal(self, seconds, progress=None, max_moves=None):
+        """
+        Improve the timetable for up to `seconds`; returns (best grid, best score, moves tried).
+
+        With max_moves the search instead stops after that many moves and
+        cools by moves rather than by time, so a seeded run gives the same
+        timetable on any machine; seconds is then ignored.
+        """
+        current = self.score()
+        best = current
+        best_grid = self.grid()
+        budget = max_moves if max_moves is not None else seconds
+        if not self.movable or budget <= 0 or current == 0:
+            return best_grid, best, 0
+
+        # Start hot enough to accept a typical penalty and cool geometrically
+        start_temperature = float(max(self.w_spread, self.w_gaps, self.w_run, 1))
+        end_temperature = start_temperature / 100
+        start = time.monotonic()
+        temperature = start_temperature
+        moves = 0
+        rand = self.random.random
+        while True:
+            moves += 1
+            if moves % _CHECK_EVERY == 0:
+                if max_moves is not None:
+                    if moves >= max_moves:
+                        break
+                    done = moves / max_moves
+                    if progress is not None:
+                        progress(moves, max_moves)
+                else:
+                    elapsed = time.monotonic() - start
+                    if elapsed >= seconds:
+                        break
+                    done = elapsed / seconds
+                    if progress is not None:
+                        progress(int(elapsed * 1000), int(seconds * 1000))
+                temperature = start_temperature * (end_temperature / start_temperature) ** done
+            move = self._propose()
+            if move is None:
+                continue
+            delta = self._delta(*move)
+            if delta <= 0 or rand() < math.exp(-delta / temperature):
+                self._apply(*move)
+                current += delta
+                if current < best:
+                    best = current
+                    best_grid = self.grid()
+                    if best == 0:
+                        break
+        return best_grid, best, moves
+
+
+def score(problem, grid, weights=None, max_consecutive=DEFAULT_MAX_CONSECUTIVE):
+    """Weighted penalty of a complete timetable (lower is better)."""
+    return Optimizer(problem, grid, weights, max_consecutive).score()
+
+
+def optimize(problem, grid, seconds, weights=None, max_consecutive=DEFAULT_MAX_CONSECUTIVE,
+             seed=None, progress=None, max_moves=None):
+    """
+    Return an improved copy of a feasible grid, found within `seconds`.
+
+    weights override entries of DEFAULT_WEIGHTS. progress, if given, is
+    called as progress(elapsed_ms, budget_ms) while the search runs. With
+    max_moves the search stops after that many moves instead (see
+    Optimizer.anneal) and progress gets (moves, max_moves).
+    """
+    optimizer = Optimizer(problem, grid, weights, max_consecutive, rng=random.Random(seed))
+    best_grid, _, _ = optimizer.anneal(seconds, progress=progress, max_moves=max_moves)
+    return best_grid
@@ -0,0 +1,137 @@
+"""
+Portfolio search: run an engine's independent randomised trials in parallel.
+
+The engine's budget (heuristic attempts or solver nodes) is split into a
+fixed number of chunks, each with its own seed derived from the base seed.
+Chunks run on a ProcessPoolExecutor and the successful chunk with the
+lowest index wins, so a given seed yields the same timetable for any
+number of workers. As soon as a chunk succeeds, every chunk after it is
+cancelled; only the (small) chunks before it are waited for. A running
+chunk notices the cancellation at its engine's next progress report:
+every CHECK_NODES search nodes for the solver, every attempt for the
+heuristic.
+"""
+import math
+import multiprocessing
+import random
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from . import heuristic
+from .engine import DEFAULT_MAX_NODES
+from .exceptions import Infeasible, SearchLimitExceeded, SolverError
+
+# engine name -> (budget keyword, total budget, budget per chunk)
+CHUNKING = {
+    'solver': ('max_nodes', DEFAULT_MAX_NODES, 20000),
+    'heuristic': ('max_attempts', heuristic.MAX_ATTEMPTS, 250),
+}
+
+OK = 'ok'
+INFEASIBLE = 'infeasible'
+EXHAUSTED = 'exhausted'
+CANCELLED = 'cancelled'
+
+
+class _Cancelled(Exception):
+    pass
+
+
+# Shared-memory index of the best successful chunk, set in each worker process
+_cutoff = None
+
+
+def _init_worker(cutoff):
+    global _cutoff
+    _cutoff = cutoff
+
+
+def chunk_seeds(seed, n_chunks):
+    if seed is None:
+        seed = random.SystemRandom().randrange(2 ** 32)
+    rng = random.Random(seed)
+    return [rng.randrange(2 ** 32) for _ in range(n_chunks)]
+
+
+def _run_chunk(engine_name, problem, index, seed, budget):
+    """Run one chunk; returns (status, grid or reason). Executed in worker processes."""
+    from . import ENGINES
+
+    def progress(done, total):
+        # Stop early once a chunk with a lower index has already succeeded
+        if _cutoff is not None and index > _cutoff.value:
+            raise _Cancelled()
+
+    try:
+        return OK, ENGINES[engine_name](problem, seed=seed, progress=progress, **budget)
+    except Infeasible as e:
+        return INFEASIBLE, str(e)
+    except SearchLimitExceeded:
+        return EXHAUSTED, None
+    except _Cancelled:
+        return CANCELLED, None
+
+
+def solve_portfolio(problem, engine_name, workers=1, seed=None, progress=None):
+    """
+    Return a timetable grid using up to `workers` processes.
+
+    With workers <= 1 the chunks run one after another in this process,
+    which gives exactly the result a parallel run with the same seed gives.
+    """
+    if engine_name not in CHUNKING:
+        raise SolverError(f'Unknown timetable engine: {engine_name}')
+    keyword, total, per_chunk = CHUNKING[engine_name]
+    n_chunks = math.ceil(total / per_chunk)
+    seeds = chunk_seeds(seed, n_chunks)
+    budget = {keyword: per_chunk}
+
+    if workers <= 1:
+        for index in range(n_chunks):
+            status, value = _run_chunk(engine_name, problem, index, seeds[index], budget)
+            if status == OK:
+                return value
+            if status == INFEASIBLE:
+                raise Infeasible(value)
+            if progress is not None:
+                progress((index + 1) * per_chunk, total)
+        raise SearchLimitExceeded(f'No complete timetable found within {total} {keyword[4:]}.')
+
+    # Spawned workers inherit no database connections or other Django state
+    context = multiprocessing.get_context('spawn')
+    cutoff = context.Value('i', n_chunks, lock=False)
+    pool = ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=context,
+        initializer=_init_worker,
+        initargs=(cutoff,)
+    )
+    try:
+        futures = {
+            pool.submit(_run_chunk, engine_name, problem, index, seeds[index], budget): index
+            for index in range(n_chunks)
+        }
+        results = {}
+        winner = None
+        for future in as_completed(futures):
+            if future.cancelled():
+                continue
+            index = futures[future]
+            status, value = future.result()
+            results[index] = (status, value)
+            if status == INFEASIBLE:
+                raise Infeasible(value)
+            if status == OK and (winner is None or index < winner):
+                winner = index
+                cutoff.value = index
+                for other, other_index in futures.items():
+                    if other_index > index:
+                        other.cancel()
+            if winner is not None and all(i in results for i in range(winner)):
+                return results[winner][1]
+            if progress is not None:
+                progress(len(results) * per_chunk, total)
+    finally:
+        # Whatever happened, stop every chunk that is still running
+        cutoff.value = -1
+        pool.shutdown(wait=True, cancel_futures=True)
+    raise SearchLimitExceeded(f'No complete timetable found within {total} {keyword[4:]}.')
@@ -0,0 +1,133 @@
+import hashlib
+import json
+from collections import namedtuple
+
+# Slot numbers that may hold the daily lunch break (12:20 - 1:10 and 1:10 - 2:00)
+LUNCH_SLOTS = (5, 6)
+
+# Grid cell marker for a lunch break; free cells are None and classes hold a subject id
+LUNCH = 'LUNCH'
+
+SubjectInfo = namedtuple('SubjectInfo', ['id', 'name', 'faculty_id', 'faculty_name', 'is_lab', 'credits'])
+
+
+class Problem:
+    """
+    Plain-data snapshot of everything the generators need.
+
+    Problems hold no model instances so they can be built once per request
+    and handed to any engine without touching the database again.
+    """
+
+    def __init__(self, days, slots, sections, subjects, availability, lunch_slots=LUNCH_SLOTS, curricula=None):
+        self.days = list(days)
+        self.slots = list(slots)
+        self.sections = list(sections)
+        self.subjects = {subject.id: subject for subject in subjects}
+        # faculty_id -> bitset of positions the faculty member is available for
+        self.availability = dict(availability)
+        self.lunch_slots = [self.slots.index(number) for number in lunch_slots if number in self.slots]
+        # section -> subject ids taught there; sections left out take every subject
+        everything = sorted(self.subjects.values(), key=lambda subject: subject.id)
+        curricula = curricula or {}
+        self._curricula = {
+            section: [self.subjects[i] for i in sorted(curricula[section])] if section in curricula else everything
+            for section in self.sections
+        }
+
+    @property
+    def slots_per_day(self):
+        return len(self.slots)
+
+    @property
+    def n_positions(self):
+        return len(self.days) * len(self.slots)
+
+    def position(self, day_index, slot_index):
+        return day_index * len(self.slots) + slot_index
+
+    def curriculum(self, section):
+        """Subjects taught to the given section, in a stable order."""
+        return self._curricula[section]
+
+    def required_slots(self, section):
+        """Number of class cells a complete timetable holds for the section."""
+        return sum(2 if subject.is_lab else subject.credits for subject in self.curriculum(section))
+
+    def fingerprint(self):
+        """
+        Stable hash of every input that affects which timetables are valid.
+
+        Subject names are left out on purpose: grids refer to subjects by id,
+        so renaming a subject keeps cached solutions valid.
+        """
+        data = {
+            'days': self.days,
+            'slots': self.slots,
+            'lunch_slots': self.lunch_slots,
+            'sections': {section: [subject.id for subject in self.curriculum(section)] for section in self.sections},
+            'subjects': sorted(
+                [subject.id, subject.faculty_id, subject.is_lab, subject.credits]
+                for subject in self.subjects.values()
+            ),
+            'availability': sorted(
+                [faculty_id, mask] for faculty_id, mask in self.availability.items() if mask
+            ),
+        }
+        encoded = json.dumps(data, sort_keys=True, separators=(',', ':'))
+        return hashlib.sha256(encoded.encode('utf-8')).hexdigest()
+
+    def empty_grid(self):
+        return {
+            section: {day: [None] * len(self.slots) for day in self.days}
+            for section in self.sections
+        }
+
+
+def availability_masks(user):
+    """(faculty id, mask) of the user's faculty members who are free at all."""
+    from ..models import Faculty
+    return Faculty.objects.filter(user=user).exclude(availability_mask=0).values_list('id', 'availability_mask')
+
+
+def build_problem(user):
+    """Load sections, subjects and availability for a user in four queries."""
+    # Imported here so the solver package stays importable without Django
+    # set up, e.g. in the worker processes of a parallel search
+    from ..models import Subject
+    from ..sections import section_names
+    from ..week import WEEK
+
+    days = WEEK.day_codes
+    slots = WEEK.slot_numbers
+    sections = section_names(user)
+
+    subjects = [
+        SubjectInfo(
+            id=subject.id,
+            name=subject.name,
+            faculty_id=subject.faculty_id,
+            faculty_name=subject.faculty.name,
+            is_lab=subject.is_lab,
+            credits=subject.credits,
+        )
+        for subject in Subject.objects.filter(user=user).select_related('faculty').order_by('id')
+    ]
+
+    # Subjects limited to some sections; all others are taught everywhere
+    limited = {}
+    links = Subject.sections.through.objects.filter(subject__user=user).values_list('subject_id', 'section__name')
+    for subject_id, section in links:
+        limited.setdefault(subject_id, set()).add(section)
+    curricula = {
+        section: [
+            subject.id for subject in subjects
+            if subject.id not in limited or section in limited[subject.id]
+        ]
+        for section in sections
+    }
+
+    # Faculty.availability_mask has the layout of Problem.position already
+    availability = dict(availability_masks(user))
+
+    return Problem(days, slots, sections, subjects, availability, curricula=curricula)
@@ -0,0 +1,235 @@
+"""
+Incremental repair of an existing timetable after a small input change.
+
+Cells that now break a constraint (the faculty member became unavailable,
+the subject was removed or needs fewer classes, two sections share a
+faculty member) are cleared and everything that is missing is placed
+again. A lesson goes into a free, feasible slot when one exists; otherwise
+up to `max_depth` levels of the lessons in its way are moved aside. All
+other cells keep their place.
+"""
+import copy
+import random
+
+from .exceptions import RepairFailed
+from .problem import LUNCH
+
+DEFAULT_MAX_DEPTH = 2
+
+
+class Repairer:
+    def __init__(self, problem, grid, max_depth=DEFAULT_MAX_DEPTH, seed=None):
+        self.problem = problem
+        self.grid = copy.deepcopy(grid)
+        self.max_depth = max_depth
+        self.random = random.Random(seed)
+        # (faculty_id, position) -> section teaching there
+        self.busy = {}
+        # Undo log of (section, day_index, slot_index, previous cell)
+        self.log = []
+
+    def _faculty(self, cell):
+        if cell is None or cell == LUNCH:
+            return None
+        return self.problem.subjects[cell].faculty_id
+
+    def _available(self, faculty_id, position):
+        return (self.problem.availability.get(faculty_id, 0) >> position) & 1
+
+    def _is_lab_start(self, slot_index):
+        lunch = self.problem.lunch_slots
+        return (slot_index + 1 < self.problem.slots_per_day and
+                slot_index not in lunch and slot_index + 1 not in lunch)
+
+    def _set(self, section, d, s, value):
+        row = self.grid[section][self.problem.days[d]]
+        old = row[s]
+        position = self.problem.position(d, s)
+        self.log.append((section, d, s, old))
+        old_faculty = self._faculty(old)
+        if old_faculty is not None:
+            del self.busy[(old_faculty, position)]
+        row[s] = value
+        new_faculty = self._faculty(value)
+        if new_faculty is not None:
+            self.busy[(new_faculty, position)] = section
+
+    def _rollback(self, mark):
+        while len(self.log) > mark:
+            section, d, s, old = self.log[-1]
+            self._set(section, d, s, old)
+            # _set logged the revert itself; drop both entries
+            self.log.pop()
+            self.log.pop()
+
+    def _invalidate(self):
+        """Clear invalid cells and return how many lessons each section still has."""
+        problem = self.problem
+        counts = {}
+        for section in problem.sections:
+            required = {subject.id: subject for subject in problem.curriculum(section)}
+            placed = counts.setdefault(section, {})
+            for d, day in enumerate(problem.days):
+                row = self.grid[section][day]
+                has_lunch = False
+                s = 0
+                while s < problem.slots_per_day:
+                    cell = row[s]
+                    if cell is None:
+                        s += 1
+                        continue
+                    if cell == LUNCH:
+                        if s in problem.lunch_slots and not has_lunch:
+                            has_lunch = True
+                        else:
+                            row[s] = None
+                        s += 1
+                        continue
+                    subject = required.get(cell)
+                    width = 2 if subject is not None and subject.is_lab else 1
+                    cells = range(s, s + width)
+                    valid = (
+                        subject is not None and
+                        placed.get(cell, 0) < (1 if subject.is_lab else subject.credits) and
+                        all(c < problem.slots_per_day and row[c] == cell for c in cells) and
+                        (not subject.is_lab or self._is_lab_start(s)) and
+                        all(self._available(subject.faculty_id, problem.position(d, c)) and
+                            (subject.faculty_id, problem.position(d, c)) not in self.busy
+                            for c in cells)
+                    )
+                    if not valid:
+                        row[s] = None
+                        s += 1
+                        continue
+                    for c in cells:
+                        self.busy[(subject.faculty_id, problem.position(d, c))] = section
+                    placed[cell] = placed.get(cell, 0) + 1
+                    s += width
+        return counts
+
+    def _missing(self, counts):
+        problem = self.problem
+        missing = []
+        for section in problem.sections:
+            for subject in problem.curriculum(section):
+                needed = 1 if subject.is_lab else subject.credits
+                missing.extend((section, subject.id, None) for _ in range(needed - counts[section].get(subject.id, 0)))
+            if problem.lunch_slots:
+                for d, day in enumerate(problem.days):
+                    if LUNCH not in self.grid[section][day]:
+                        missing.append((section, LUNCH, d))
+        # Labs are the least flexible, lunch breaks the most
+        missing.sort(key=lambda lesson: (
+            lesson[1] == LUNCH,
+            lesson[1] != LUNCH and not problem.subjects[lesson[1]].is_lab,
+        ))
+        return missing
+
+    def _candidates(self, lesson):
+        """Return (cells, on_used_day) for every slot the lesson could take."""
+        problem = self.problem
+        section, cell, day_index = lesson
+        if cell == LUNCH:
+            return [([(day_index, s)], 0) for s in problem.lunch_slots]
+        subject = problem.subjects[cell]
+        used_days = {
+            d for d, day in enumerate(problem.days)
+            if cell in self.grid[section][day]
+        }
+        candidates = []
+        for d in range(len(problem.days)):
+            for s in range(problem.slots_per_day):
+                if subject.is_lab and not self._is_lab_start(s):
+                    continue
+                cells = [(d, s), (d, s + 1)] if subject.is_lab else [(d, s)]
+                if all(self._available(subject.faculty_id, problem.position(cd, cs)) for cd, cs in cells):
+                    candidates.append((cells, d in used_days))
+        return candidates
+
+    def _blockers(self, lesson, cells):
+        """Lessons occupying the given cells, or None if one of them cannot move."""
+        problem = self.problem
+        section, cell, _ = lesson
+        faculty_id = self._faculty(cell)
+        blockers = []
+        for d, s in cells:
+            day = problem.days[d]
+            occupants = [(section, self.grid[section][day][s])]
+            if faculty_id is not None:
+                other = self.busy.get((faculty_id, problem.position(d, s)))
+                if other is not None and other != section:
+                    occupants.append((other, self.grid[other][day][s]))
+            for other_section, occupant in occupants:
+                if occupant is None:
+                    continue
+                if occupant == cell and other_section == section:
+                    return None
+                if occupant != LUNCH and problem.subjects[occupant].is_lab:
+                    return None
+                blocker = (other_section, occupant, d, s)
+                if blocker not in blockers:
+                    blockers.append(blocker)
+        return blockers
+
+    def _place(self, lesson, cells):
+        section, cell, _ = lesson
+        for d, s in cells:
+            self._set(section, d, s, cell)
+
+    def _insert(self, lesson, depth, frozen):
+        candidates = self._candidates(lesson)
+        self.random.shuffle(candidates)
+        candidates.sort(key=lambda candidate: candidate[1])
+
+        deferred = []
+        for cells, _ in candidates:
+            if any((lesson[0], d, s) in frozen for d, s in cells):
+                continue
+            blockers = self._blockers(lesson, cells)
+            if blockers == []:
+                self._place(lesson, cells)
+                return True
+            if blockers:
+                deferred.append((cells, blockers))
+        if depth == 0:
+            return False
+
+        # No free slot: move the lessons in the way, fewest first
+        deferred.sort(key=lambda item: len(item[1]))
+        for cells, blockers in deferred:
+            if any((section, d, s) in frozen for section, _, d, s in blockers):
+                continue
+            mark = len(self.log)
+            locked = set(frozen)
+            for section, _, d, s in blockers:
+                self._set(section, d, s, None)
+                locked.add((section, d, s))
+            self._place(lesson, cells)
+            locked.update((lesson[0], d, s) for d, s in cells)
+            moved = [
+                (section, occupant, d if occupant == LUNCH else None)
+                for section, occupant, d, _ in blockers
+            ]
+            if all(self._insert(blocker, depth - 1, locked) for blocker in moved):
+                return True
+            self._rollback(mark)
+        return False
+
+    def repair(self):
+        missing = self._missing(self._invalidate())
+        for lesson in missing:
+            if not self._insert(lesson, self.max_depth, frozenset()):
+                raise RepairFailed(self._describe(lesson))
+        return self.grid
+
+    def _describe(self, lesson):
+        section, cell, day_index = lesson
+        if cell == LUNCH:
+            return f'No lunch break fits section {section} on {self.problem.days[day_index]}.'
+        subject = self.problem.subjects[cell]
+        return f'No slot could be freed for {subject.name} in section {section}.'
+
+
+def repair(problem, grid, max_depth=DEFAULT_MAX_DEPTH, seed=None):
+    """Return a repaired copy of grid; raises RepairFailed if a lesson cannot be placed."""
+    return Repairer(problem, grid, max_depth=max_depth, seed=seed).repair()
@@ -0,0 +1,364 @@
+import datetime
+import io
+import json
+from unittest import skipUnless
+
+from django.contrib.admin.sites import site
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from .availability import mask_of, save_availability
+from .bench.instances import synthetic_problem
+from .bench.runner import run_engine
+from .generator import generate_timetable
+from .ingest import ingest_attendance, read_dump
+from .jobs import claim_next_job, enqueue_generation
+from .models import (
+    Attendance, AttendanceRollup, Availability, Faculty, GenerationJob, LectureContent, Section, Student, Subject,
+    TimetableSnapshot,
+)
+from .persistence import load_grid, save_grid
+from .query_plans import check_query_plans, full_scans
+from .solver import SolverError, build_problem, heuristic
+from .week import WEEK, invalidate_slots, slot_ids
+
+# Keep the grid caches of the tests out of the on-disk cache
+TEST_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+@override_settings(CACHES=TEST_CACHES, TIMETABLE_SEED=1, TIMETABLE_OPTIMIZE_SECONDS=0, TIMETABLE_BACKGROUND_JOBS=False)
+class TimetableTestCase(TestCase):
+    def setUp(self):
+        # Nothing cached by an earlier test's (rolled back) data survives
+        cache.clear()
+        invalidate_slots()
+        self.user = User.objects.create_user('teacher', password='secret')
+        for name in ('A', 'B'):
+            Section.objects.create(user=self.user, name=name)
+        self.faculty = Faculty.objects.create(
+            user=self.user, name='Ada', email='ada@example.com', department='CS'
+        )
+        self.subject = Subject.objects.create(
+            user=self.user, name='Algorithms', faculty=self.faculty, credits=4, is_lab=False
+        )
+
+    def generate(self):
+        """Make every faculty member available all week and generate the timetable."""
+        everything = (1 << len(WEEK.day_codes) * len(WEEK.slot_numbers)) - 1
+        for faculty in Faculty.objects.filter(user=self.user):
+            save_availability(faculty, everything)
+        generate_timetable(self.user)
+
+    def add_students(self, count, section='A', start=0):
+        return Student.objects.bulk_create([
+            Student(user=self.user, name=f'Student {i}', roll_number=f'R{i:04d}', section=section)
+            for i in range(start, start + count)
+        ])
+
+
+class IngestAttendanceTests(TimetableTestCase):
+    def test_result_does_not_depend_on_chunk_size(self):
+        self.add_students(3)
+        dump = '\n'.join([
+            'roll_number,subject,date,present',
+            # Present first, absent later: present wins
+            'R0000,Algorithms,2026-03-02,1',
+            'R0001,Algorithms,2026-03-02,0',
+            'R0000,Algorithms,2026-03-02,0',
+            # Absent first, present later
+            'R0001,Algorithms,2026-03-02,1',
+            'R0002,Algorithms,2026-03-02,0',
+            'R0002,Algorithms,2026-03-03,1',
+            'R0002,Algorithms,2026-03-03,0',
+        ])
+
+        results = []
+        for chunk_size in (1, 1000):
+            Attendance.objects.all().delete()
+            AttendanceRollup.objects.all().delete()
+            ingest_attendance(self.user, read_dump(io.StringIO(dump)), chunk_size=chunk_size)
+            results.append(sorted(Attendance.objects.values_list('student__roll_number', 'date', 'is_present')))
+
+        self.assertEqual(results[0], results[1])
+        self.assertEqual(results[0], [
+            ('R0000', datetime.date(2026, 3, 2), True),
+            ('R0000', datetime.date(2026, 3, 3), False),
+            ('R0001', datetime.date(2026, 3, 2), True),
+            ('R0001', datetime.date(2026, 3, 3), False),
+            ('R0002', datetime.date(2026, 3, 2), False),
+            ('R0002', datetime.date(2026, 3, 3), True),
+        ])
+
+    def test_students_without_a_reading_are_absent(self):
+        self.add_students(3)
+        self.add_students(2, section='B', start=3)
+        dump = 'roll_number,subject,timestamp\nR0000,Algorithms,2026-03-02T09:05\nR0000,Algorithms,2026-03-02T09:06\n'
+
+        report = ingest_attendance(self.user, read_dump(io.StringIO(dump)))
+
+        self.assertEqual(report['saved'], 3)
+        self.assertEqual(sorted(Attendance.objects.values_list('student__roll_number', 'is_present')), [
+            ('R0000', True), ('R0001', False), ('R0002', False),
+        ])
+        self.assertEqual(AttendanceRollup.objects.get(student__roll_number='R0001').total, 1)
+        # Nothing is written when the same dump comes again
+        self.assertEqual(ingest_attendance(self.user, read_dump(io.StringIO(dump)))['saved'], 0)
+
+
+class SaveGridQueryTests(TimetableTestCase):
+    def setUp(self):
+        super().setUp()
+        self.generate()
+        self.problem = build_problem(self.user)
+        self.grid = load_grid(self.user, self.problem)
+        # Slot ids are read once per change of the time slots, not per save
+        slot_ids()
+
+    def test_full_replace(self):
+        # Savepoint, delete, insert, two for the snapshot (no old versions to prune yet), release
+        with self.assertNumQueries(6):
+            cells = sum(entry is not None for days in self.grid.values() for entries in days.values() for entry in entries)
+            self.assertEqual(save_grid(self.user, self.problem, self.grid), cells)
+
+    def test_diff_without_changes_only_reads(self):
+        # Savepoint, select, release
+        with self.assertNumQueries(3):
+            self.assertEqual(save_grid(self.user, self.problem, self.grid, diff=True), 0)
+
+    def test_diff_writes_only_what_changed(self):
+        entries = self.grid['A']['MON']
+        moved = next(i for i, entry in enumerate(entries) if isinstance(entry, int))
+        free = entries.index(None)
+        entries[moved], entries[free] = None, entries[moved]
+        # Savepoint, select, delete, insert, two for the snapshot, release
+        with self.assertNumQueries(7):
+            self.assertEqual(save_grid(self.user, self.problem, self.grid, diff=True), 2)
+
+
+class ApiQueryTests(TimetableTestCase):
+    def setUp(self):
+        super().setUp()
+        section = Section.objects.get(user=self.user, name='A')
+        for i in range(5):
+            subject = Subject.objects.create(
+                user=self.user, name=f'Elective {i}', faculty=self.faculty, credits=2, is_lab=False
+            )
+            subject.sections.add(section)
+        self.client.login(username='teacher', password='secret')
+
+    def get(self, url, params, queries):
+        # The session and the user take two queries of their own
+        with self.assertNumQueries(2 + queries):
+            response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_list_loads_only_the_selected_fields(self):
+        url = reverse('api_list', args=['subjects'])
+        page = self.get(url, {'fields': 'id,name'}, 1)
+        self.assertEqual(set(page['results'][0]), {'id', 'name'})
+        # A join for faculty_name, a prefetch for sections
+        page = self.get(url, {'fields': 'name,faculty_name,sections'}, 2)
+        self.assertEqual(page['results'][1], {'name': 'Elective 0', 'faculty_name': 'Ada', 'sections': ['A']})
+
+    def test_pages_after_a_cursor_cost_the_same(self):
+        url = reverse('api_list', args=['subjects'])
+        params = {'fields': 'id,faculty_name,sections', 'limit': 2}
+        seen = []
+        while True:
+            page = self.get(url, params, 2)
+            seen.extend(result['id'] for result in page['results'])
+            if not page['next_cursor']:
+                break
+            params['cursor'] = page['next_cursor']
+        self.assertEqual(seen, list(Subject.objects.filter(user=self.user).order_by('id').values_list('id', flat=True)))
+
+    def test_detail_loads_only_the_selected_fields(self):
+        url = reverse('api_detail', args=['subjects', self.subject.id])
+        self.assertEqual(self.get(url, {'fields': 'name'}, 1), {'name': 'Algorithms'})
+        self.assertEqual(self.get(url, {'fields': 'name,sections'}, 2), {'name': 'Algorithms', 'sections': []})
+
+
+class StudentListQueryTests(TimetableTestCase):
+    def queries(self, params):
+        self.client.login(username='teacher', password='secret')
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('student_list'), params)
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def test_queries_do_not_grow_with_the_students(self):
+        for params in ({'section': 'A'}, {'section': 'A', 'breakdown': '1'}):
+            with self.subTest(**params):
+                Student.objects.all().delete()
+                self.add_students(2)
+                few = self.queries(params)
+                self.add_students(30, start=2)
+                self.assertEqual(self.queries(params), few)
+
+
+class ExportTests(TimetableTestCase):
+    def test_filename_is_safe_in_the_header(self):
+        self.generate()
+        self.client.login(username='teacher', password='secret')
+        response = self.client.get(reverse('export_timetable', args=['csv']), {'section': 'A"; x=1'})
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename="timetable-section-a-x1.csv"')
+
+
+class SnapshotTests(TimetableTestCase):
+    def setUp(self):
+        super().setUp()
+        other = Faculty.objects.create(user=self.user, name='Grace', email='grace@example.com', department='CS')
+        self.other_subject = Subject.objects.create(
+            user=self.user, name='Compilers', faculty=other, credits=3, is_lab=False
+        )
+        self.generate()
+        self.client.login(username='teacher', password='secret')
+
+    def assertGridMatchesRows(self):
+        saved = load_grid(self.user, build_problem(self.user))
+        for section in ('A', 'B'):
+            response = self.client.get(reverse('view_timetable_json'), {'section': section})
+            self.assertEqual(response.json()['grid'], json.loads(json.dumps(saved[section])))
+
+    def test_deleting_a_subject_updates_the_served_grid(self):
+        self.assertGridMatchesRows()
+        # Cached grids are invalidated once the transaction commits
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.get(reverse('delete_subject', args=[self.other_subject.id]))
+        self.assertGridMatchesRows()
+        subjects = self.client.get(reverse('view_timetable_json')).json()['subjects']
+        self.assertNotIn(str(self.other_subject.id), subjects)
+
+    def test_admin_bulk_deletes_snapshot_each_user_by_their_own_rows(self):
+        other = User.objects.create_user('other', password='secret')
+        Subject.objects.create(
+            user=other, credits=3, is_lab=False, name='Databases',
+            faculty=Faculty.objects.create(user=other, name='Edgar', email='edgar@example.com', department='CS')
+        )
+        request = RequestFactory().post('/')
+        request.user = User.objects.create_superuser('admin', password='secret')
+        versions = TimetableSnapshot.objects.filter(user=other).count()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            site._registry[Subject].delete_queryset(request, Subject.objects.filter(name__in=['Compilers', 'Databases']))
+
+        # The other user had no saved lessons, so gets no new snapshot
+        self.assertEqual(TimetableSnapshot.objects.filter(user=other).count(), versions)
+        self.assertGridMatchesRows()
+
+    def test_deleting_a_faculty_member_updates_the_served_grid(self):
+        self.assertGridMatchesRows()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.get(reverse('delete_faculty', args=[self.other_subject.faculty_id]))
+        self.assertGridMatchesRows()
+
+
+class AvailabilityMaskTests(TimetableTestCase):
+    def delete_queries(self, mask):
+        faculty = Faculty.objects.create(user=self.user, name='Alan', email='alan@example.com', department='CS')
+        save_availability(faculty, mask)
+        with CaptureQueriesContext(connection) as queries:
+            faculty.delete()
+        return len(queries)
+
+    def test_deleting_a_faculty_member_does_not_query_per_availability_row(self):
+        self.assertEqual(self.delete_queries(0b1), self.delete_queries((1 << 50) - 1))
+
+    def test_admin_deletes_recompute_the_mask(self):
+        save_availability(self.faculty, mask_of([('MON', 1), ('MON', 2), ('TUE', 1)]))
+        request = RequestFactory().post('/')
+        request.user = User.objects.create_superuser('admin', password='secret')
+        model_admin = site._registry[Availability]
+
+        model_admin.delete_model(request, Availability.objects.get(faculty=self.faculty, day='TUE'))
+        model_admin.delete_queryset(request, Availability.objects.filter(faculty=self.faculty, time_slot__slot_number=2))
+
+        self.faculty.refresh_from_db()
+        self.assertEqual(self.faculty.availability_mask, mask_of([('MON', 1)]))
+
+
+@skipUnless(connection.vendor in ('sqlite', 'postgresql'), 'Query plans are only checked on SQLite and PostgreSQL')
+class QueryPlanTests(TestCase):
+    def test_view_queries_use_their_indexes(self):
+        for name, plan, problems in check_query_plans():
+            with self.subTest(name):
+                self.assertEqual(problems, [], plan)
+
+    def test_walking_a_whole_index_is_a_full_scan(self):
+        plan = 'SCAN timetable_student USING COVERING INDEX student_section_roll\nSEARCH timetable_subject USING INTEGER PRIMARY KEY (rowid=?)'
+        self.assertEqual(full_scans(plan, 'sqlite'), ['timetable_student'])
+        plan = (
+            'Limit  (cost=0.15..8.17 rows=1 width=4)\n'
+            '  ->  Index Only Scan using student_section_roll on timetable_student  (cost=0.15..8.17 rows=1 width=4)\n'
+            '        Filter: (user_id = 1)\n'
+            '  ->  Index Scan using timetable_subject_pkey on timetable_subject  (cost=0.15..8.17 rows=1 width=4)\n'
+            '        Index Cond: (id = 1)'
+        )
+        self.assertEqual(full_scans(plan, 'postgresql'), ['timetable_student'])
+
+
+class BenchmarkTests(TestCase):
+    def test_attempts_are_the_engines_own_count(self):
+        # Nobody is ever available, so every attempt fails
+        stats = {}
+        with self.assertRaises(SolverError):
+            heuristic.generate(synthetic_problem(1, availability=0, seed=0), seed=0, max_attempts=3, stats=stats)
+        self.assertEqual(stats['attempts'], 3)
+
+        result = run_engine(synthetic_problem(4, seed=0), 'solver')
+        self.assertTrue(result['success'])
+        self.assertEqual(result['attempts'], 1)
+
+
+class SectionTests(TimetableTestCase):
+    def setUp(self):
+        super().setUp()
+        self.section = Section.objects.get(user=self.user, name='B')
+        self.client.login(username='teacher', password='secret')
+
+    def test_sections_in_use_are_not_deleted(self):
+        LectureContent.objects.create(
+            subject=self.subject, faculty=self.faculty, section='B', date=datetime.date(2026, 3, 2), topic_covered='Sorting'
+        )
+        self.client.get(reverse('delete_section', args=[self.section.id]))
+        self.assertTrue(Section.objects.filter(id=self.section.id).exists())
+
+        request = RequestFactory().get('/')
+        request.user = User.objects.create_superuser('admin', password='secret')
+        model_admin = site._registry[Section]
+        self.assertFalse(model_admin.has_delete_permission(request, self.section))
+        self.assertEqual(model_admin.get_readonly_fields(request, self.section), ('name',))
+
+        LectureContent.objects.all().delete()
+        self.assertTrue(model_admin.has_delete_permission(request, self.section))
+
+
+class GenerationJobTests(TimetableTestCase):
+    def test_requests_are_not_merged_into_a_different_running_job(self):
+        running = enqueue_generation(self.user)
+        self.assertEqual(claim_next_job(), running)
+        self.assertEqual(enqueue_generation(self.user), running)
+
+        queued = enqueue_generation(self.user, new_variant=True)
+        self.assertNotEqual(queued, running)
+        # Not claimed while the user's previous job runs
+        self.assertIsNone(claim_next_job())
+        # A later request updates the queued job
+        self.assertEqual(enqueue_generation(self.user, optimize_seconds=5), queued)
+        queued.refresh_from_db()
+        self.assertEqual((queued.new_variant, queued.optimize_seconds), (False, 5))
+
+    def test_stale_jobs_are_failed_when_claiming(self):
+        stale = enqueue_generation(self.user)
+        claim_next_job()
+        GenerationJob.objects.filter(id=stale.id).update(started_at=stale.created_at - datetime.timedelta(hours=1))
+        queued = enqueue_generation(self.user, new_variant=True)
+
+        self.assertEqual(claim_next_job(), queued)
+        stale.refresh_from_db()
+        self.assertEqual(stale.status, GenerationJob.FAILED)
@@ -1,6 +1,7 @@
 from django.urls import path
 from . import views
 from . import attendance_views
+from . import api_views
 
 urlpatterns = [
     path('', views.login_view, name='login'),
@@ -10,18 +11,31 @@ urlpatterns = [
     path('faculty/', views.faculty_list_view, name='faculty_list'),
     path('faculty/add/', views.add_faculty_view, name='add_faculty'),
     path('faculty/<int:faculty_id>/availability/', views.availability_view, name='faculty_availability'),
+    path('faculty/<int:faculty_id>/timetable/', views.faculty_timetable_view, name='faculty_timetable'),
+    path('faculty/<int:faculty_id>/timetable/json/', views.faculty_timetable_json_view, name='faculty_timetable_json'),
     path('faculty/delete/<int:faculty_id>/', views.delete_faculty_view, name='delete_faculty'),
     path('availability/', views.availability_view, name='availability'),
     path('add-subject/', views.add_subject_view, name='add_subject'),
     path('subject-list/', views.subject_list_view, name='subject_list'),
     path('delete-subject/<int:subject_id>/', views.delete_subject_view, name='delete_subject'),
+    path('section-list/', views.section_list_view, name='section_list'),
+    path('delete-section/<int:section_id>/', views.delete_section_view, name='delete_section'),
     path('generate-timetable/', views.generate_timetable_view, name='generate_timetable'),
     path('view-timetable/', views.view_timetable_view, name='view_timetable'),
+    path('view-timetable/json/', views.view_timetable_json_view, name='view_timetable_json'),
+    path('export-timetable/<str:fmt>/', views.export_timetable_view, name='export_timetable'),
+    path('repair-timetable/', views.repair_timetable_view, name='repair_timetable'),
+    path('generation-jobs/<int:job_id>/status/', views.generation_job_status_view, name='generation_job_status'),
     path('students/', attendance_views.student_list_view, name='student_list'),
     path('students/add/', attendance_views.add_student_view, name='add_student'),
+    path('students/import/', attendance_views.import_students_view, name='import_students'),
     path('students/delete/<int:student_id>/', attendance_views.delete_student_view, name='delete_student'),
     path('attendance/mark/', attendance_views.mark_attendance_view, name='mark_attendance'),
     path('attendance/report/<int:subject_id>/', attendance_views.attendance_report_view, name='attendance_report'),
     path('lecture/add/', attendance_views.add_lecture_content_view, name='add_lecture_content'),
     path('lecture/list/', attendance_views.lecture_content_list_view, name='lecture_content_list'),
+    path('lecture/search/', attendance_views.lecture_search_view, name='lecture_search'),
+    path('api/v1/', api_views.api_index_view, name='api_index'),
+    path('api/v1/<str:resource>/', api_views.api_list_view, name='api_list'),
+    path('api/v1/<str:resource>/<int:pk>/', api_views.api_detail_view, name='api_detail'),
 ] 
\ No newline at end of file
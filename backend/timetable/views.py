@@ -1,11 +1,26 @@
-from django.shortcuts import render, redirect
+from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth import login, authenticate, logout
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.models import User
 from django.contrib import messages
-from .models import Faculty, Subject, TimeSlot, Availability, Timetable
-import random
+from django.conf import settings
+from django.http import JsonResponse, StreamingHttpResponse
+from django.db.models import Count
+from .models import Faculty, Subject, Timetable, GenerationJob, Section
+from .availability import mask_of, matrix_of, save_availability
+from .generator import generate_timetable, optimize_budget, repair_timetable
+from .export import FORMATS, SCOPES, export_timetable
+from .jobs import enqueue_generation
+from .grid import cached_section_names, faculty_grid, latest_snapshot, section_grid, timetable_version
+from .sections import ensure_default_sections, section_in_use, selected_section
+from .persistence import snapshot_after_delete
+from .solver import Infeasible, SearchLimitExceeded, SolverError
+from .week import WEEK
 from django.utils import timezone
+from django.utils.dateparse import parse_date
+from django.utils.http import content_disposition_header
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition
 
 def home_view(request):
     """Handle the root URL - show login page for everyone"""
@@ -71,24 +86,6 @@ def faculty_list_view(request):
         'faculties': faculties
     })
 
-def initialize_time_slots():
-    # Create time slots if they don't exist
-    slots = [
-        (1, '9:00 - 9:50'),
-        (2, '9:50 - 10:40'),
-        (3, '10:40 - 11:30'),
-        (4, '11:30 - 12:20'),
-        (5, '12:20 - 1:10'),
-        (6, '1:10 - 2:00'),
-        (7, '2:00 - 2:50'),
-        (8, '2:50 - 3:40'),
-        (9, '3:40 - 4:30'),
-        (10, '4:30 - 5:20'),
-    ]
-    
-    for slot_number, _ in slots:
-        TimeSlot.objects.get_or_create(slot_number=slot_number)
-
 @login_required
 def availability_view(request, faculty_id=None):
     if not faculty_id:
@@ -101,78 +98,34 @@ def availability_view(request, faculty_id=None):
         messages.error(request, 'Faculty not found or you do not have permission to access it.')
         return redirect('faculty_list')
     
-    # Initialize time slots if they don't exist
-    initialize_time_slots()
-    
-    # Get time slots with display values
-    time_slots = []
-    slots = [
-        (1, '9:00 - 9:50'),
-        (2, '9:50 - 10:40'),
-        (3, '10:40 - 11:30'),
-        (4, '11:30 - 12:20'),
-        (5, '12:20 - 1:10'),
-        (6, '1:10 - 2:00'),
-        (7, '2:00 - 2:50'),
-        (8, '2:50 - 3:40'),
-        (9, '3:40 - 4:30'),
-        (10, '4:30 - 5:20'),
+    # Time slots with display values
+    time_slots = [
+        {'slot_number': slot_number, 'display': display_time} for slot_number, display_time in WEEK.slots
     ]
-    for slot_number, display_time in slots:
-        time_slots.append({
-            'slot_number': slot_number,
-            'display': display_time
-        })
     
     subjects = Subject.objects.filter(faculty=faculty, user=request.user)
-    days = [
-        ('MON', 'Monday'),
-        ('TUE', 'Tuesday'),
-        ('WED', 'Wednesday'),
-        ('THU', 'Thursday'),
-        ('FRI', 'Friday')
-    ]
+    days = WEEK.days
     
     if request.method == 'POST':
         try:
-            # Clear existing availability
-            Availability.objects.filter(faculty=faculty).delete()
-            
-            # Create new availability entries only for checked slots
-            for slot in time_slots:
-                for day, _ in days:
-                    is_available = request.POST.get(f'{day}_{slot["slot_number"]}') == 'on'
-                    if is_available:
-                        time_slot = TimeSlot.objects.get(slot_number=slot["slot_number"])
-                        Availability.objects.create(
-                            faculty=faculty,
-                            day=day,
-                            time_slot=time_slot,
-                            is_available=True
-                        )
+            # Only the slots that changed are written
+            mask = mask_of(
+                (day, slot['slot_number']) for slot in time_slots for day, _ in days
+                if request.POST.get(f'{day}_{slot["slot_number"]}') == 'on'
+            )
+            save_availability(faculty, mask)
             messages.success(request, f'Availability updated successfully for {faculty.name}.')
+            _repair_after_change(request)
             return redirect('faculty_list')
         except Exception as e:
             messages.error(request, f'Error updating availability: {str(e)}')
             return redirect('faculty_list')
     
-    # Initialize availability matrix
-    availability_matrix = {}
-    for day, _ in days:
-        availability_matrix[day] = {int(slot['slot_number']): False for slot in time_slots}
-    
-    # Get all available slots for this faculty
-    available_slots = Availability.objects.filter(
-        faculty=faculty,
-        is_available=True
-    ).values_list('day', 'time_slot__slot_number')
-    
-    # Fill the availability matrix
-    for day, slot_number in available_slots:
-        availability_matrix[day][int(slot_number)] = True
+    # Fill the availability matrix from the faculty member's mask
+    availability_matrix = matrix_of(faculty.availability_mask)
     
     # Calculate total available slots
-    total_available_slots = len(available_slots)
+    total_available_slots = bin(faculty.availability_mask).count('1')
     
     return render(request, 'availability.html', {
         'faculty': faculty,
@@ -191,11 +144,16 @@ def add_subject_view(request):
         credits = request.POST.get('credits')
         is_lab = request.POST.get('is_lab') == 'on'
         classes_per_week = request.POST.get('classes_per_week')
+        section_ids = request.POST.getlist('sections')
+        form_context = {
+            'faculties': Faculty.objects.filter(user=request.user),
+            'sections': Section.objects.filter(user=request.user)
+        }
         
         # Validate required fields
         if not name or not faculty_id or not credits or not classes_per_week:
             messages.error(request, 'All fields are required.')
-            return render(request, 'add_subject.html', {'faculties': Faculty.objects.filter(user=request.user)})
+            return render(request, 'add_subject.html', form_context)
         
         try:
             # Convert string inputs to integers
@@ -206,13 +164,13 @@ def add_subject_view(request):
             # Validate numeric fields
             if credits <= 0 or classes_per_week <= 0:
                 messages.error(request, 'Credits and classes per week must be positive numbers.')
-                return render(request, 'add_subject.html', {'faculties': Faculty.objects.filter(user=request.user)})
+                return render(request, 'add_subject.html', form_context)
             
             # Get faculty instance and verify ownership
             faculty = Faculty.objects.get(id=faculty_id, user=request.user)
             
             # Create subject
-            Subject.objects.create(
+            subject = Subject.objects.create(
                 user=request.user,
                 name=name,
                 faculty=faculty,
@@ -220,7 +178,10 @@ def add_subject_view(request):
                 is_lab=is_lab,
                 classes_per_week=classes_per_week
             )
+            # No sections selected means the subject is taught to every section
+            subject.sections.set(Section.objects.filter(id__in=section_ids, user=request.user))
             messages.success(request, f'Subject {name} added successfully.')
+            _repair_after_change(request)
             return redirect('subject_list')
         except Faculty.DoesNotExist:
             messages.error(request, 'Selected faculty not found or you do not have permission to use it.')
@@ -229,10 +190,12 @@ def add_subject_view(request):
         except Exception as e:
             messages.error(request, f'Failed to add subject: {str(e)}')
         
-        return render(request, 'add_subject.html', {'faculties': Faculty.objects.filter(user=request.user)})
+        return render(request, 'add_subject.html', form_context)
     
     faculties = Faculty.objects.filter(user=request.user)
-    return render(request, 'add_subject.html', {'faculties': faculties})
+    ensure_default_sections(request.user)
+    sections = Section.objects.filter(user=request.user)
+    return render(request, 'add_subject.html', {'faculties': faculties, 'sections': sections})
 
 @login_required
 def subject_list_view(request):
@@ -243,6 +206,7 @@ def subject_list_view(request):
     else:
         subjects = Subject.objects.filter(user=request.user)
         faculty = None
+    subjects = subjects.select_related('faculty').prefetch_related('sections')
     
     faculties = Faculty.objects.filter(user=request.user)
     return render(request, 'subject_list.html', {
@@ -251,364 +215,265 @@ def subject_list_view(request):
         'current_faculty': faculty
     })
 
+@login_required
+def section_list_view(request):
+    ensure_default_sections(request.user)
+    if request.method == 'POST':
+        name = (request.POST.get('name') or '').strip()
+        if not name:
+            messages.error(request, 'Section name is required.')
+        elif len(name) > Section._meta.get_field('name').max_length:
+            messages.error(request, 'Section names can be at most 10 characters long.')
+        elif Section.objects.filter(user=request.user, name=name).exists():
+            messages.error(request, f'Section {name} already exists.')
+        else:
+            Section.objects.create(user=request.user, name=name)
+            messages.success(request, f'Section {name} added successfully.')
+            _repair_after_change(request)
+        return redirect('section_list')
+
+    sections = Section.objects.filter(user=request.user)
+    return render(request, 'section_list.html', {'sections': sections})
+
+@login_required
+def delete_section_view(request, section_id):
+    try:
+        section = Section.objects.get(id=section_id, user=request.user)
+        # Subjects without sections are taught everywhere, so a subject limited
+        # to this section alone must not silently lose its only section
+        exclusive = list(
+            Subject.objects.filter(id__in=section.subject_set.values('id'))
+            .annotate(n_sections=Count('sections'))
+            .filter(n_sections=1)
+            .values_list('name', flat=True)
+        )
+        in_use = section_in_use(section)
+        if in_use:
+            messages.error(request, in_use)
+        elif exclusive:
+            messages.error(request, f'Only section {section.name} takes {", ".join(exclusive)}. Delete those subjects first.')
+        elif Section.objects.filter(user=request.user).count() == 1:
+            messages.error(request, 'At least one section is required.')
+        else:
+            deleted = Timetable.objects.filter(user=request.user, section=section.name).delete()
+            section.delete()
+            snapshot_after_delete(request.user, deleted)
+            messages.success(request, f'Section {section.name} deleted successfully.')
+            _repair_after_change(request)
+    except Section.DoesNotExist:
+        messages.error(request, 'Section not found or you do not have permission to delete it.')
+    return redirect('section_list')
+
 @login_required
 def generate_timetable_view(request):
     if not Subject.objects.filter(user=request.user).exists():
         messages.error(request, 'Please add subjects before generating timetable.')
         return redirect('subject_list')
     
-    if not Availability.objects.filter(faculty__user=request.user, is_available=True).exists():
+    if not Faculty.objects.filter(user=request.user).exclude(availability_mask=0).exists():
         messages.error(request, 'Please set faculty availability before generating timetable.')
         return redirect('faculty_list')
 
-    # Schedule constraints
-    DAYS = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday"]
-    SLOTS = ["9:00-9:50", "9:50-10:40", "10:40-11:30", "11:30-12:20", "12:20-1:10", "1:10-2:00", "2:00-2:50", "2:50-3:40", "3:40-4:30", "4:30-5:20"]
-    LUNCH_SLOTS = ["12:20-1:10", "1:10-2:00"]
-    BOOKED_SLOTS = {"A": set(), "B": set()}
-    
-    # Calculate dynamic class hours based on subject credits
-    theory_subjects = Subject.objects.filter(user=request.user, is_lab=False)
-    CLASSES_PER_SECTION = sum(subject.credits for subject in theory_subjects)
-    
-    # Calculate lab hours (2 slots per lab)
-    lab_subjects = Subject.objects.filter(user=request.user, is_lab=True)
-    LAB_HOURS_PER_SECTION = lab_subjects.count() * 2
-    
-    sub_classes_A = []
-    sub_classes_B = []
-
-    # Cache faculty availability
-    faculty_availability = {}
-    for faculty in Faculty.objects.filter(user=request.user):
-        faculty_availability[faculty.id] = {
-            day[:3].upper(): [slot.slot_number for slot in TimeSlot.objects.filter(
-                availability__faculty=faculty,
-                availability__day=day[:3].upper(),
-                availability__is_available=True
-            )]
-            for day in DAYS
-        }
+    # ?variant=next asks for a different timetable for the same inputs and
+    # ?optimize=<seconds> for a longer (or shorter) quality optimisation
+    new_variant = request.GET.get('variant') == 'next'
+    try:
+        optimize_seconds = float(request.GET['optimize'])
+    except (KeyError, ValueError):
+        optimize_seconds = None
 
-    def initialize_timetable():
-        return {
-            "A": {day: ["Free"] * len(SLOTS) for day in DAYS},
-            "B": {day: ["Free"] * len(SLOTS) for day in DAYS}
-        }
+    if getattr(settings, 'TIMETABLE_BACKGROUND_JOBS', False):
+        job = enqueue_generation(request.user, new_variant=new_variant, optimize_seconds=optimize_seconds)
+        return render(request, 'generate_timetable.html', {'job': job})
 
-    def is_slot_available(timetable, section, day, slot_index):
-        return timetable[section][day][slot_index] == "Free"
-
-    def is_lab(timetable, section, day, slot_index):
-        entry = timetable[section][day][slot_index]
-        return isinstance(entry, str) and "(Lab)" in entry
-
-    def is_faculty_available(faculty_id, day, slot_index):
-        return slot_index + 1 in faculty_availability[faculty_id][day[:3].upper()]
-
-    def are_consecutive_slots_free(timetable, section, day, slot_index):
-        return (is_slot_available(timetable, section, day, slot_index) and
-                is_slot_available(timetable, section, day, slot_index + 1))
-
-    def assign_labs(timetable, section):
-        assigned_labs = 0
-        available_slots = [(day, i) for day in DAYS for i in range(len(SLOTS) - 1)]
-        lab_subjects = Subject.objects.filter(user=request.user, is_lab=True)
-
-        for lab in lab_subjects:
-            faculty = lab.faculty
-            while assigned_labs < LAB_HOURS_PER_SECTION:
-                random.shuffle(available_slots)
-                for (day, slot_index) in available_slots:
-                    if SLOTS[slot_index] in LUNCH_SLOTS or SLOTS[slot_index + 1] in LUNCH_SLOTS:
-                        continue
-                    
-                    if (are_consecutive_slots_free(timetable, section, day, slot_index) and
-                        is_faculty_available(faculty.id, day[:3].upper(), slot_index) and
-                        is_faculty_available(faculty.id, day[:3].upper(), slot_index + 1)):
-                        
-                        if (timetable["A"][day][slot_index] != f"{lab.name} (Lab)" and 
-                            timetable["B"][day][slot_index] != f"{lab.name} (Lab)"):
-                            lab_name = f"{lab.name} (Lab)"
-                            timetable[section][day][slot_index] = lab_name
-                            timetable[section][day][slot_index + 1] = lab_name
-                            assigned_labs += 2
-                            BOOKED_SLOTS[section].add((day, slot_index, lab_name))
-                            
-                            # Update faculty availability
-                            if slot_index + 1 in faculty_availability[faculty.id][day[:3].upper()]:
-                                faculty_availability[faculty.id][day[:3].upper()].remove(slot_index + 1)
-                            if slot_index + 2 in faculty_availability[faculty.id][day[:3].upper()]:
-                                faculty_availability[faculty.id][day[:3].upper()].remove(slot_index + 2)
-                            break
-                else:
-                    continue
-                break
-
-    def assign_classes(timetable, section):
-        theory_subjects = Subject.objects.filter(user=request.user, is_lab=False)
-        for subject in theory_subjects:
-            faculty = subject.faculty
-            num_classes = subject.credits  # Use credits as number of classes
-            allotted = 0
-            
-            for _ in range(num_classes):
-                if section == "A":
-                    available_slots = [(day, i) for day in DAYS for i in range(len(SLOTS)) 
-                                    if (is_slot_available(timetable, "A", day, i) and 
-                                        is_slot_available(timetable, "B", day, i) and
-                                        is_faculty_available(faculty.id, day[:3].upper(), i))]
-                else:
-                    available_slots = [(day, i) for day in DAYS for i in range(len(SLOTS)) 
-                                    if ((is_slot_available(timetable, "A", day, i) and 
-                                         is_slot_available(timetable, "B", day, i)) and
-                                        is_faculty_available(faculty.id, day[:3].upper(), i)) or 
-                                       ((is_lab(timetable, "A", day, i) and
-                                         is_faculty_available(faculty.id, day[:3].upper(), i)) and 
-                                        is_slot_available(timetable, "B", day, i))]
-                
-                if available_slots:
-                    day, slot_index = random.choice(available_slots)
-                    timetable[section][day][slot_index] = subject.name
-                    BOOKED_SLOTS[section].add((day, slot_index, subject.name))
-                    allotted += 1
-                    
-                    # Update faculty availability
-                    if slot_index + 1 in faculty_availability[faculty.id][day[:3].upper()]:
-                        faculty_availability[faculty.id][day[:3].upper()].remove(slot_index + 1)
-            
-            left_classes = num_classes - allotted
-            if left_classes:
-                for _ in range(left_classes):
-                    if section == "A":
-                        sub_classes_A.append(subject.name)
-                    else:
-                        sub_classes_B.append(subject.name)
-
-    def reassign_classes_A(timetable):
-        for subject_name in sub_classes_A[:]:
-            subject = Subject.objects.get(name=subject_name)
-            faculty = subject.faculty
-            available_slots = [(day, i) for day in DAYS for i in range(len(SLOTS)) 
-                                if ((is_slot_available(timetable, "A", day, i) and 
-                                     is_slot_available(timetable, "B", day, i)) and
-                                    is_faculty_available(faculty.id, day[:3].upper(), i)) or 
-                                is_lab(timetable, "B", day, i)]
-            
-            for day in DAYS:
-                if (timetable["A"][day][4] in ["Free", "Lunch Break"] and 
-                    timetable["A"][day][5] in ["Free", "Lunch Break"] and 
-                    timetable["B"][day][4] in ["Free", "Lunch Break"] and 
-                    timetable["B"][day][5] in ["Free", "Lunch Break"]):
-                    available_slots.extend([(day, 4), (day, 5)])
-                elif (timetable["A"][day][4] in ["Free", "Lunch Break"] and 
-                      timetable["A"][day][5] in ["Free", "Lunch Break"] and 
-                      timetable["B"][day][4] in ["Free", "Lunch Break"]):
-                    available_slots.append((day, 4))
-                elif (timetable["A"][day][4] in ["Free", "Lunch Break"] and 
-                      timetable["A"][day][5] in ["Free", "Lunch Break"] and 
-                      timetable["B"][day][5] in ["Free", "Lunch Break"]):
-                    available_slots.append((day, 5))
-            
-            if available_slots:
-                day, slot_index = random.choice(available_slots)
-                timetable["A"][day][slot_index] = subject_name
-                BOOKED_SLOTS["A"].add((day, slot_index, subject_name))
-                sub_classes_A.remove(subject_name)
-        
-        sub_classes_A.clear()
-
-    def reassign_classes_B(timetable):
-        for subject_name in sub_classes_B[:]:
-            subject = Subject.objects.get(name=subject_name)
-            faculty = subject.faculty
-            available_slots = [(day, i) for day in DAYS for i in range(len(SLOTS)) 
-                                if ((is_slot_available(timetable, "A", day, i) and 
-                                     is_slot_available(timetable, "B", day, i)) and
-                                    is_faculty_available(faculty.id, day[:3].upper(), i)) or 
-                                ((is_lab(timetable, "A", day, i) and
-                                  is_faculty_available(faculty.id, day[:3].upper(), i)) and 
-                                 is_slot_available(timetable, "B", day, i))]
-            
-            for day in DAYS:
-                if (timetable["B"][day][4] in ["Free", "Lunch Break"] and 
-                    timetable["B"][day][5] in ["Free", "Lunch Break"] and 
-                    timetable["A"][day][4] in ["Free", "Lunch Break"] and 
-                    timetable["A"][day][5] in ["Free", "Lunch Break"]):
-                    available_slots.extend([(day, 4), (day, 5)])
-                elif (timetable["B"][day][4] in ["Free", "Lunch Break"] and 
-                      timetable["B"][day][5] in ["Free", "Lunch Break"] and 
-                      timetable["A"][day][4] in ["Free", "Lunch Break"]):
-                    available_slots.append((day, 4))
-                elif (timetable["B"][day][4] in ["Free", "Lunch Break"] and 
-                      timetable["B"][day][5] in ["Free", "Lunch Break"] and 
-                      timetable["A"][day][5] in ["Free", "Lunch Break"]):
-                    available_slots.append((day, 5))
-            
-            if available_slots:
-                day, slot_index = random.choice(available_slots)
-                timetable["B"][day][slot_index] = subject_name
-                BOOKED_SLOTS["B"].add((day, slot_index, subject_name))
-                sub_classes_B.remove(subject_name)
-        
-        sub_classes_B.clear()
-
-    def assign_lunch_break(timetable):
-        for section in ["A", "B"]:
-            for day in DAYS:
-                if timetable[section][day][4] == "Lunch Break" or timetable[section][day][5] == "Lunch Break":
-                    continue
-                # Get lab subjects
-                lab_entries = [entry for entry in timetable[section][day] if isinstance(entry, str) and "(Lab)" in entry]
-                # Check if lab slots are in lunch period
-                if not any("(Lab)" in str(timetable[section][day][i]) for i in [4, 5]):
-                    lunch_slot = random.choice(LUNCH_SLOTS)
-                elif "(Lab)" in str(timetable[section][day][4]):
-                    lunch_slot = LUNCH_SLOTS[1]
-                elif "(Lab)" in str(timetable[section][day][5]):
-                    lunch_slot = LUNCH_SLOTS[0]
-                
-                for recess in LUNCH_SLOTS:
-                    if timetable[section][day][SLOTS.index(recess)] == "Free":
-                        lunch_slot = recess
-                
-                slot_index = SLOTS.index(lunch_slot)
-                if section == "A":
-                    if timetable[section][day][slot_index] != "Free":
-                        sub_classes_A.append(timetable[section][day][slot_index])
-                else:
-                    if timetable[section][day][slot_index] != "Free":
-                        sub_classes_B.append(timetable[section][day][slot_index])
-                timetable[section][day][slot_index] = "Lunch Break"
-
-    # Main generation loop
-    max_attempts = 10000
-    for attempt in range(max_attempts):
-        timetable = initialize_timetable()
-        
-        # Assign labs
-        assign_labs(timetable, "A")
-        assign_labs(timetable, "B")
-        
-        # Assign classes
-        assign_classes(timetable, "A")
-        assign_classes(timetable, "B")
-        
-        # Assign lunch breaks
-        assign_lunch_break(timetable)
-        
-        # Reassign classes
-        reassign_classes_A(timetable)
-        reassign_classes_B(timetable)
-        
-        # Reassign lunch breaks
-        assign_lunch_break(timetable)
-        
-        # Calculate totals
-        total_assigned_A = sum(1 for day in DAYS for slot in timetable["A"][day] 
-                             if slot != "Free" and slot != "Lunch Break")
-        total_assigned_B = sum(1 for day in DAYS for slot in timetable["B"][day] 
-                             if slot != "Free" and slot != "Lunch Break")
-        
-        if total_assigned_A == (LAB_HOURS_PER_SECTION + CLASSES_PER_SECTION) and \
-           total_assigned_B == (LAB_HOURS_PER_SECTION + CLASSES_PER_SECTION):
-            print(f"Success on attempt {attempt + 1}")
-            
-            # Save to database
-            Timetable.objects.filter(user=request.user).delete()
-            time_slots = TimeSlot.objects.all().order_by('slot_number')
-            
-            for section in ["A", "B"]:
-                for day in DAYS:
-                    for slot_idx, entry in enumerate(timetable[section][day]):
-                        if entry != "Free":
-                            time_slot = time_slots[slot_idx]
-                            if entry == "Lunch Break":
-                                Timetable.objects.create(
-                                    user=request.user,
-                                    section=section,
-                                    day=day[:3].upper(),
-                                    time_slot=time_slot,
-                                    is_lunch_break=True
-                                )
-                            else:
-                                subject_name = entry.replace(" (Lab)", "")
-                                try:
-                                    subject = Subject.objects.get(name=subject_name)
-                                    Timetable.objects.create(
-                                        user=request.user,
-                                        section=section,
-                                        day=day[:3].upper(),
-                                        time_slot=time_slot,
-                                        subject=subject,
-                                        faculty=subject.faculty
-                                    )
-                                except Subject.DoesNotExist:
-                                    continue
-            
-            messages.success(request, 'Timetable generated successfully.')
-            return redirect('view_timetable')
-    
-    messages.error(request, 'Failed to generate a complete timetable. Please check faculty availability and try again.')
+    try:
+        generate_timetable(request.user, new_variant=new_variant, optimize_seconds=optimize_seconds)
+    except Infeasible as e:
+        messages.error(request, f'No valid timetable exists for the current data: {str(e)}')
+        return redirect('view_timetable')
+    except SearchLimitExceeded:
+        messages.error(request, 'Failed to generate a complete timetable. Please check faculty availability and try again.')
+        return redirect('view_timetable')
+
+    messages.success(request, 'Timetable generated successfully.')
     return redirect('view_timetable')
 
 @login_required
+def repair_timetable_view(request):
+    try:
+        changed = repair_timetable(request.user)
+    except SolverError as e:
+        messages.error(request, f'The timetable could not be repaired: {str(e)} Please regenerate it.')
+        return redirect('view_timetable')
+
+    if changed is None:
+        messages.error(request, 'There is no timetable to repair yet. Please generate one first.')
+    elif changed:
+        messages.success(request, f'Timetable repaired: {changed} slot(s) changed.')
+    else:
+        messages.success(request, 'The timetable is already up to date.')
+    return redirect('view_timetable')
+
+def _repair_after_change(request):
+    """Patch the saved timetable after an input change instead of regenerating it."""
+    if not getattr(settings, 'TIMETABLE_AUTO_REPAIR', True):
+        return
+    try:
+        changed = repair_timetable(request.user)
+    except SolverError as e:
+        messages.warning(request, f'The timetable could not be updated automatically: {str(e)} Please regenerate it.')
+        return
+    if changed:
+        messages.info(request, f'Timetable updated: {changed} slot(s) changed.')
+
+@login_required
+def generation_job_status_view(request, job_id):
+    job = get_object_or_404(GenerationJob, id=job_id, user=request.user)
+    return JsonResponse({
+        'id': job.id,
+        'status': job.status,
+        'progress': job.progress,
+        'total': job.total,
+        'message': job.message,
+        'finished': job.is_finished,
+    })
+
+EXPORT_FORMATS = [
+    ('ics', 'Calendar (.ics)'),
+    ('csv', 'Spreadsheet (.csv)'),
+    ('pdf', 'Printable (.pdf)'),
+]
+
+def _timetable_etag(request, *args, **kwargs):
+    # A 304 response would swallow pending flash messages
+    if len(messages.get_messages(request)):
+        return None
+    version = timetable_version(request.user)
+    snapshot = latest_snapshot(request.user, version)
+    section = selected_section(request, cached_section_names(request.user, version))
+    return f"{request.path}:{snapshot['version'] if snapshot else 0}:{version}:{section}"
+
+def _timetable_last_modified(request, *args, **kwargs):
+    snapshot = latest_snapshot(request.user)
+    return snapshot['created_at'] if snapshot else None
+
+@login_required
+@cache_control(private=True, no_cache=True)
+@condition(etag_func=_timetable_etag, last_modified_func=_timetable_last_modified)
 def view_timetable_view(request):
-    # Get current section (default to 'A')
-    current_section = request.GET.get('section', 'A')
+    # Get current section (default to the first one)
+    version = timetable_version(request.user)
+    sections = cached_section_names(request.user, version)
+    current_section = selected_section(request, sections)
     
-    # Define days
-    days = [
-        ('MON', 'Monday'),
-        ('TUE', 'Tuesday'),
-        ('WED', 'Wednesday'),
-        ('THU', 'Thursday'),
-        ('FRI', 'Friday')
-    ]
+    days = WEEK.days
     
-    # Get time slots with display values
-    time_slots = [
-        {'slot_number': num, 'display': time}
-        for num, time in [
-            (1, '9:00 - 9:50'),
-            (2, '9:50 - 10:40'),
-            (3, '10:40 - 11:30'),
-            (4, '11:30 - 12:20'),
-            (5, '12:20 - 1:10'),
-            (6, '1:10 - 2:00'),
-            (7, '2:00 - 2:50'),
-            (8, '2:50 - 3:40'),
-            (9, '3:40 - 4:30'),
-            (10, '4:30 - 5:20')
-        ]
-    ]
-    
-    # Get timetable entries for the current section
-    timetable_entries = Timetable.objects.filter(section=current_section).select_related('subject', 'faculty')
-    
-    # Create a list of cells for each time slot and day
-    timetable_cells = []
-    for slot in time_slots:
-        row = {'time': slot['display'], 'cells': []}
-        for day_code, _ in days:
-            # Find entry for this day and slot
-            entry = timetable_entries.filter(day=day_code, time_slot__slot_number=slot['slot_number']).first()
-            if entry:
-                if entry.is_lunch_break:
-                    cell = {'type': 'lunch', 'content': 'Lunch Break'}
-                else:
-                    cell = {'type': 'class', 'content': f"{entry.subject.name}\n{entry.faculty.name}"}
-            else:
-                cell = {'type': 'free', 'content': 'Free'}
-            row['cells'].append(cell)
-        timetable_cells.append(row)
+    # Rows of cells for each time slot, cached until the timetable changes
+    timetable_cells = section_grid(request.user, current_section, version)
     
     return render(request, 'view_timetable.html', {
         'days': days,
         'timetable_cells': timetable_cells,
-        'current_section': current_section
+        'sections': sections,
+        'current_section': current_section,
+        'optimize_seconds': optimize_budget(),
+        'max_optimize_seconds': optimize_budget(float('inf')),
+        'export_formats': EXPORT_FORMATS
+    })
+
+@login_required
+@cache_control(private=True, no_cache=True)
+@condition(etag_func=_timetable_etag, last_modified_func=_timetable_last_modified)
+def view_timetable_json_view(request):
+    version = timetable_version(request.user)
+    sections = cached_section_names(request.user, version)
+    section = selected_section(request, sections)
+    snapshot = latest_snapshot(request.user, version)
+    if snapshot is None:
+        return JsonResponse({'error': 'No timetable has been generated yet.'}, status=404)
+
+    grid = snapshot['grid'].get(section, {})
+    used = {str(entry) for entries in grid.values() for entry in entries}
+    return JsonResponse({
+        'version': snapshot['version'],
+        'created_at': snapshot['created_at'].isoformat(),
+        'section': section,
+        'sections': sections,
+        'days': WEEK.day_codes,
+        'slots': [{'number': number, 'time': time} for number, time in WEEK.slots],
+        'grid': grid,
+        'subjects': {
+            subject_id: {'name': name, 'faculty': faculty}
+            for subject_id, (name, faculty) in snapshot['subjects'].items() if subject_id in used
+        },
+    })
+
+@login_required
+def faculty_timetable_view(request, faculty_id):
+    faculty = get_object_or_404(Faculty, id=faculty_id, user=request.user)
+    days = WEEK.days
+
+    # Rows of cells for each time slot, cached until the timetable changes
+    timetable_cells = faculty_grid(request.user, faculty)
+    classes = sum(len(cell.get('classes', ())) for row in timetable_cells for cell in row['cells'])
+
+    return render(request, 'faculty_timetable.html', {
+        'faculty': faculty,
+        'days': days,
+        'timetable_cells': timetable_cells,
+        'classes': classes,
+        'export_formats': EXPORT_FORMATS
+    })
+
+@login_required
+def faculty_timetable_json_view(request, faculty_id):
+    faculty = get_object_or_404(Faculty, id=faculty_id, user=request.user)
+    timetable_cells = faculty_grid(request.user, faculty)
+    days = WEEK.day_codes
+    return JsonResponse({
+        'faculty': {'id': faculty.id, 'name': faculty.name},
+        'days': days,
+        'slots': [{'number': number, 'time': time} for number, time in WEEK.slots],
+        'classes': [
+            dict(item, day=day, slot=row['slot'], time=row['time'])
+            for row in timetable_cells
+            for day, cell in zip(days, row['cells'])
+            for item in cell.get('classes', ())
+        ],
     })
 
+@login_required
+def export_timetable_view(request, fmt):
+    # ?scope=section|faculty, optionally narrowed to one ?section= or ?faculty=
+    scope = request.GET.get('scope', 'section')
+    if fmt not in FORMATS or scope not in SCOPES:
+        messages.error(request, 'Unknown export format.')
+        return redirect('view_timetable')
+
+    key = None
+    if scope == 'faculty' and request.GET.get('faculty'):
+        key = get_object_or_404(Faculty, id=request.GET['faculty'], user=request.user).id
+    elif scope == 'section' and request.GET.get('section'):
+        key = request.GET['section']
+
+    # Optional ?start= and ?end= term dates for calendars
+    term = []
+    for name in ('start', 'end'):
+        value = request.GET.get(name)
+        try:
+            date = parse_date(value) if value else None
+        except ValueError:
+            date = None
+        if value and date is None:
+            messages.error(request, 'Term dates must be given as YYYY-MM-DD.')
+            return redirect('view_timetable')
+        term.append(date)
+
+    content_type, filename, chunks = export_timetable(request.user, fmt, scope, key, *term)
+    response = StreamingHttpResponse(chunks, content_type=content_type)
+    response['Content-Disposition'] = content_disposition_header(True, filename)
+    return response
+
 @login_required
 def logout_view(request):
     logout(request)
@@ -620,8 +485,9 @@ def delete_subject_view(request, subject_id):
     try:
         subject = Subject.objects.get(id=subject_id, user=request.user)
         faculty_name = subject.faculty.name
-        subject.delete()
+        snapshot_after_delete(request.user, subject.delete())
         messages.success(request, f'Subject deleted successfully from {faculty_name}.')
+        _repair_after_change(request)
     except Subject.DoesNotExist:
         messages.error(request, 'Subject not found or you do not have permission to delete it.')
     return redirect('subject_list')
@@ -663,8 +529,10 @@ def delete_faculty_view(request, faculty_id):
     try:
         faculty = Faculty.objects.get(id=faculty_id, user=request.user)
         faculty_name = faculty.name
-        faculty.delete()
+        # Deletes the faculty member's subjects and their lessons too
+        snapshot_after_delete(request.user, faculty.delete())
         messages.success(request, f'Faculty {faculty_name} deleted successfully.')
+        _repair_after_change(request)
     except Faculty.DoesNotExist:
         messages.error(request, 'Faculty not found or you do not have permission to delete it.')
     return redirect('faculty_list') 
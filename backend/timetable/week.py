@@ -0,0 +1,96 @@
+"""
+The days and time slots of the week, kept in memory per process.
+
+Availability.DAYS and TimeSlot.SLOTS define the week; WEEK holds them in
+the shapes the views, the grids and the solver use, and is checked once
+when the app starts (TimetableConfig.ready). The TimeSlot rows only give
+each slot its database id: slot_ids() reads them the first time it is
+needed, creating any that are missing, and keeps them. Saving or deleting
+a TimeSlot clears them (see signals.py) through a token in the shared
+cache, so every process, the generation worker included, reads them again
+and no request queries for slots otherwise.
+"""
+import re
+import threading
+import uuid
+
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+
+from .models import Availability, TimeSlot
+
+# Availability masks are stored in a signed 64-bit column
+MAX_POSITIONS = 63
+_TIME = re.compile(r'^\d{1,2}:\d{2} - \d{1,2}:\d{2}$')
+_VERSION_KEY = 'timetable:timeslots:version'
+
+
+class Week:
+    def __init__(self, days, slots):
+        # [(code, name)] and [(number, 'h:mm - h:mm')], in order
+        self.days = list(days)
+        self.slots = list(slots)
+        self.day_codes = [code for code, _ in self.days]
+        self.slot_numbers = [number for number, _ in self.slots]
+        self.slot_times = dict(self.slots)
+
+    def check(self):
+        """Raise ImproperlyConfigured if the week cannot be used."""
+        if not self.days or not self.slots:
+            raise ImproperlyConfigured('The week needs at least one day and one time slot')
+        if len(set(self.day_codes)) != len(self.days):
+            raise ImproperlyConfigured(f'Repeated day codes in {self.day_codes}')
+        if len(set(self.slot_numbers)) != len(self.slots):
+            raise ImproperlyConfigured(f'Repeated slot numbers in {self.slot_numbers}')
+        if len(self.days) * len(self.slots) > MAX_POSITIONS:
+            raise ImproperlyConfigured(
+                f'{len(self.days)} days of {len(self.slots)} slots do not fit an availability mask '
+                f'({MAX_POSITIONS} slots at most)'
+            )
+        for number, time in self.slots:
+            if not isinstance(number, int) or number < 1:
+                raise ImproperlyConfigured(f'Slot number {number!r} is not a positive integer')
+            if not _TIME.match(time):
+                raise ImproperlyConfigured(f'Slot {number} time {time!r} is not like "9:00 - 9:50"')
+
+
+WEEK = Week(Availability.DAYS, TimeSlot.SLOTS)
+
+_lock = threading.Lock()
+# (cache token, slot number -> TimeSlot id) as last read by this process
+_loaded = (None, None)
+
+
+def _read_slot_ids():
+    """Return (slot number -> id, whether missing rows had to be created)."""
+    ids = dict(TimeSlot.objects.values_list('slot_number', 'id'))
+    missing = [number for number in WEEK.slot_numbers if number not in ids]
+    if missing:
+        TimeSlot.objects.bulk_create([TimeSlot(slot_number=number) for number in missing], ignore_conflicts=True)
+        ids = dict(TimeSlot.objects.values_list('slot_number', 'id'))
+    return ids, bool(missing)
+
+
+def slot_ids():
+    """Slot number -> TimeSlot id, read from the database only after the slots change."""
+    global _loaded
+    token = cache.get(_VERSION_KEY)
+    loaded_token, ids = _loaded
+    if token is None or token != loaded_token:
+        with _lock:
+            if token is None:
+                cache.add(_VERSION_KEY, uuid.uuid4().hex, None)
+                token = cache.get(_VERSION_KEY)
+            ids, created = _read_slot_ids()
+            # Rows created here may still be rolled back with the caller's
+            # transaction, so they are only kept once read back later
+            if not created:
+                _loaded = (token, ids)
+    return ids
+
+
+def invalidate_slots():
+    """Make every process read the TimeSlot rows again."""
+    global _loaded
+    _loaded = (None, None)
+    cache.delete(_VERSION_KEY)